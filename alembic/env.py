@@ -63,19 +63,19 @@ def run_migrations_offline():
 
 def run_migrations_online():
     """Run migrations in 'online' mode."""
-    # Establishes an engine from existing SQLAlchemy engine
-    connectable = db.engine
+    # Wrapping the migration in the Flask application context (db.engine is only available inside it)
+    with flask_app.app_context():
+        # Establishes an engine from existing SQLAlchemy engine
+        connectable = db.engine
 
-    with connectable.connect() as connection:
-        with context.begin_transaction():
+        with connectable.connect() as connection:
             # Configure the context with connection and metadata
             context.configure(
                 connection=connection,
                 target_metadata=target_metadata
             )
 
-            # Wrapping the migration in the Flask application context
-            with flask_app.app_context():
+            with context.begin_transaction():
                 context.run_migrations()
 
 
@@ -0,0 +1,64 @@
+"""impact totals tables
+
+Revision ID: 3c9e1f7b2d4a
+Revises: a7118b966946
+Create Date: 2026-10-19 09:12:40.518233
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3c9e1f7b2d4a'
+down_revision: Union[str, None] = 'a7118b966946'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def impact_total_columns():
+    return [
+        sa.Column('impact_score', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('water_saved', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('plastic_waste_reduced', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('co2_emissions_prevented', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('money_saved', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('recycled_bottles', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('single_use_bottles', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('refillable_bottles', sa.Integer(), nullable=False, server_default='0'),
+    ]
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with db.create_all() may already have these tables
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'impact_totals' not in existing_tables:
+        op.create_table(
+            'impact_totals',
+            sa.Column('id', sa.Integer(), nullable=False),
+            *impact_total_columns(),
+            sa.PrimaryKeyConstraint('id')
+        )
+
+    # The single global row (see GLOBAL_IMPACT_TOTALS_ID), so writers only ever update it
+    if not op.get_bind().execute(sa.text('SELECT 1 FROM impact_totals WHERE id = 1')).first():
+        # Every column is given: tables created by db.create_all() have no server defaults
+        columns = ['id'] + [column.name for column in impact_total_columns()]
+        op.execute(f"INSERT INTO impact_totals ({', '.join(columns)}) VALUES (1{', 0' * (len(columns) - 1)})")
+
+    if 'community_challenge_impact_totals' not in existing_tables:
+        op.create_table(
+            'community_challenge_impact_totals',
+            sa.Column('community_challenge_id', sa.Integer(), nullable=False),
+            *impact_total_columns(),
+            sa.ForeignKeyConstraint(['community_challenge_id'], ['community_challenge.id']),
+            sa.PrimaryKeyConstraint('community_challenge_id')
+        )
+
+
+def downgrade() -> None:
+    op.drop_table('community_challenge_impact_totals')
+    op.drop_table('impact_totals')
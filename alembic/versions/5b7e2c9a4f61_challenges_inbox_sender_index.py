@@ -0,0 +1,42 @@
+"""challenges inbox sender index
+
+Revision ID: 5b7e2c9a4f61
+Revises: 8d2a4b6c0e13
+Create Date: 2026-10-19 11:02:44.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5b7e2c9a4f61'
+down_revision: Union[str, None] = '8d2a4b6c0e13'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Serves the direction=sent filter of /challenge_inbox
+INDEX_NAME = 'ix_challenges_inbox_sender_status'
+TABLE = 'challenges_inbox'
+COLUMNS = ['sender_id', 'status']
+
+
+def index_exists():
+    return INDEX_NAME in {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(TABLE)}
+
+
+def upgrade() -> None:
+    if index_exists():
+        return
+
+    if op.get_bind().dialect.name == 'mysql':
+        op.execute(f"CREATE INDEX {INDEX_NAME} ON {TABLE} ({', '.join(COLUMNS)}) ALGORITHM=INPLACE LOCK=NONE")
+    else:
+        op.create_index(INDEX_NAME, TABLE, COLUMNS)
+
+
+def downgrade() -> None:
+    if index_exists():
+        op.drop_index(INDEX_NAME, table_name=TABLE)
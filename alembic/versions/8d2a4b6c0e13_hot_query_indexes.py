@@ -0,0 +1,57 @@
+"""hot query indexes
+
+Revision ID: 8d2a4b6c0e13
+Revises: 3c9e1f7b2d4a
+Create Date: 2026-10-19 09:31:05.207114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8d2a4b6c0e13'
+down_revision: Union[str, None] = '3c9e1f7b2d4a'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns) for the filters used by the views
+INDEXES = [
+    ('ix_personal_challenge_participant_user_challenge_end', 'personal_challenge_participant',
+     ['user_id', 'challenge_id', 'end_date']),
+    ('ix_environmental_impact_user_personal_challenge', 'environmental_impact', ['user_id', 'personal_challenge_id']),
+    ('ix_environmental_impact_user_community_challenge', 'environmental_impact',
+     ['user_id', 'community_challenge_id']),
+    ('ix_messages_inbox_sender_id', 'messages_inbox', ['sender_id']),
+    ('ix_messages_inbox_user_timestamp', 'messages_inbox', ['user_id', 'timestamp']),
+    ('ix_challenges_inbox_user_status', 'challenges_inbox', ['user_id', 'status']),
+    ('ix_post_user_created_at', 'post', ['user_id', 'created_at']),
+    ('ix_notification_user_is_read', 'notification', ['user_id', 'is_read']),
+]
+
+
+def existing_indexes(table):
+    return {index['name'] for index in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    is_mysql = op.get_bind().dialect.name == 'mysql'
+
+    for name, table, columns in INDEXES:
+        # Skip indexes that db.create_all() already created from the model definitions
+        if name in existing_indexes(table):
+            continue
+
+        if is_mysql:
+            # Online DDL: the table stays readable and writable while the index is built
+            op.execute(f"CREATE INDEX {name} ON {table} ({', '.join(columns)}) ALGORITHM=INPLACE LOCK=NONE")
+        else:
+            op.create_index(name, table, columns)
+
+
+def downgrade() -> None:
+    for name, table, _ in reversed(INDEXES):
+        if name in existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,75 @@
+"""archive tables
+
+Revision ID: b4e8f2a61c95
+Revises: 5b7e2c9a4f61
+Create Date: 2026-10-19 11:40:18.337052
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b4e8f2a61c95'
+down_revision: Union[str, None] = '5b7e2c9a4f61'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Databases bootstrapped with db.create_all() may already have these tables
+    existing_tables = sa.inspect(op.get_bind()).get_table_names()
+
+    if 'notification_archive' not in existing_tables:
+        op.create_table(
+            'notification_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('is_read', sa.Boolean(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_notification_archive_user_timestamp', 'notification_archive', ['user_id', 'timestamp'])
+
+    if 'messages_inbox_archive' not in existing_tables:
+        op.create_table(
+            'messages_inbox_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('sender_id', sa.Integer(), nullable=False),
+            sa.Column('content', sa.Text(), nullable=False),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('is_read', sa.Boolean(), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_messages_inbox_archive_user_timestamp', 'messages_inbox_archive',
+                        ['user_id', 'timestamp'])
+        op.create_index('ix_messages_inbox_archive_sender_id', 'messages_inbox_archive', ['sender_id'])
+
+    if 'challenges_inbox_archive' not in existing_tables:
+        op.create_table(
+            'challenges_inbox_archive',
+            sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('sender_id', sa.Integer(), nullable=False),
+            sa.Column('challenge_id', sa.Integer(), nullable=True),
+            sa.Column('community_challenge_id', sa.Integer(), nullable=True),
+            sa.Column('timestamp', sa.DateTime(), nullable=True),
+            sa.Column('status', sa.String(length=20), nullable=True),
+            sa.Column('archived_at', sa.DateTime(), nullable=False),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_challenges_inbox_archive_user_status', 'challenges_inbox_archive', ['user_id', 'status'])
+        op.create_index('ix_challenges_inbox_archive_sender_status', 'challenges_inbox_archive',
+                        ['sender_id', 'status'])
+
+
+def downgrade() -> None:
+    op.drop_table('challenges_inbox_archive')
+    op.drop_table('messages_inbox_archive')
+    op.drop_table('notification_archive')
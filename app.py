@@ -1,13 +1,12 @@
 import os
 import logging
 from flask import Flask
-from extensions import db
+from extensions import db, replica_binds, STICKY_HEADER
 from sqlalchemy import text
 from seed import seed_challenges
 from flask_cors import CORS
 
-# Initialize logging
-logging.basicConfig(format='%(asctime)s %(levelname)s: %(message)s', level=logging.DEBUG, datefmt='%Y-%m-%d %H:%M:%S')
+from logging_config import configure_logging
 
 # Determine if the app is running on Heroku
 IS_HEROKU = 'DYNO' in os.environ
@@ -18,13 +17,17 @@ if not IS_HEROKU:
 
     load_dotenv()
 
+# Initialize logging (queued JSON logging at INFO on Heroku, synchronous DEBUG logging locally)
+configure_logging()
+
 # Import the create_app function from your views package
 from views import create_app
 
 # Call create_app to initialize your Flask application and register routes
 app = create_app()
 
-CORS(app, resources={r"/*": {"origins": "*"}})
+# STICKY_HEADER is exposed so the frontend can read it after a write and send it back (see init_read_routing)
+CORS(app, resources={r"/*": {"origins": "*"}}, expose_headers=[STICKY_HEADER])
 
 # Configure the SQLAlchemy database URI
 if IS_HEROKU:
@@ -43,6 +46,9 @@ else:
     # When running locally, take the database URI from the .env file
     app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('DATABASE_URI')
 
+# Optional read replicas for GET requests, comma-separated URIs (see extensions.RoutingSession)
+app.config['SQLALCHEMY_BINDS'] = replica_binds(os.getenv('DATABASE_REPLICA_URIS'))
+
 # Prevent SQLAlchemy from tracking modifications
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
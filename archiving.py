@@ -0,0 +1,91 @@
+# archiving.py
+# Moves cold rows out of the hot notification and inbox tables into their archive tables
+# (models/archive_models.py), so the hot tables and their indexes only hold recent history.
+#
+#   ARCHIVE_AFTER_DAYS    rows older than this are archived (default 180)
+#   ARCHIVE_BATCH_SIZE    rows moved per transaction (default 500)
+#   ARCHIVE_MAX_BATCHES   batches per table per run (default 200), bounds the length of one run
+#   ARCHIVE_BATCH_PAUSE   seconds to sleep between batches (default 0.1)
+#
+# Each batch is a short transaction that locks a fixed set of primary keys (skipping rows another
+# transaction holds), copies them into the archive table and deletes them from the hot table, so a failed
+# batch leaves both tables untouched and nothing is ever copied twice.
+
+import logging
+import os
+import time
+from collections import namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import delete, exists, insert, literal, select
+
+from extensions import db
+from models import Notification, MessagesInbox, ChallengesInbox, NotificationArchive, MessagesInboxArchive, \
+    ChallengesInboxArchive
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 180))
+ARCHIVE_BATCH_SIZE = int(os.getenv('ARCHIVE_BATCH_SIZE', 500))
+ARCHIVE_MAX_BATCHES = int(os.getenv('ARCHIVE_MAX_BATCHES', 200))
+ARCHIVE_BATCH_PAUSE = float(os.getenv('ARCHIVE_BATCH_PAUSE', 0.1))
+
+ArchiveSpec = namedtuple('ArchiveSpec', 'name model archive_model filters')
+
+ARCHIVE_SPECS = [
+    ArchiveSpec('notifications', Notification, NotificationArchive, ()),
+    ArchiveSpec('messages', MessagesInbox, MessagesInboxArchive, ()),
+    # Pending invites can still be accepted, so only answered ones are archived
+    ArchiveSpec('challenge_invites', ChallengesInbox, ChallengesInboxArchive, (ChallengesInbox.status != 'pending',)),
+]
+
+
+def include_archived(args):
+    """True when a read endpoint was asked to also return archived rows (?include_archived=true)."""
+    return args.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
+
+def archive_batch(spec, cutoff, batch_size):
+    """Moves up to batch_size rows older than cutoff and returns how many were moved."""
+    hot_table = spec.model.__table__
+    archived_table = spec.archive_model.__table__
+    # A reused id that is already archived would fail the whole batch, so such rows stay where they are
+    already_archived = exists().where(archived_table.c.id == spec.model.id)
+    ids = [row_id for (row_id,) in db.session.query(spec.model.id)
+           .filter(spec.model.timestamp < cutoff, ~already_archived, *spec.filters)
+           .order_by(spec.model.id)
+           .limit(batch_size)
+           .with_for_update(skip_locked=True)]
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    columns = [column.name for column in hot_table.columns]
+    rows = select(*hot_table.columns, literal(datetime.now(timezone.utc), db.DateTime)).where(hot_table.c.id.in_(ids))
+    db.session.execute(insert(archived_table).from_select(columns + ['archived_at'], rows))
+    db.session.execute(delete(hot_table).where(hot_table.c.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_table(spec, cutoff, batch_size=ARCHIVE_BATCH_SIZE, max_batches=ARCHIVE_MAX_BATCHES,
+                  pause=ARCHIVE_BATCH_PAUSE):
+    moved = 0
+    started = time.perf_counter()
+    for _ in range(max_batches):
+        count = archive_batch(spec, cutoff, batch_size)
+        moved += count
+        if count < batch_size:
+            break
+        time.sleep(pause)  # leave room for the app's own writes between batches
+
+    elapsed = time.perf_counter() - started
+    logger.info("Archived %d %s rows in %.1fs (%.0f rows/s)", moved, spec.name, elapsed,
+                moved / elapsed if elapsed else 0)
+    return moved
+
+
+def archive_cold_rows(max_age_days=ARCHIVE_AFTER_DAYS, **options):
+    """Archives every table in ARCHIVE_SPECS and returns {table name: rows moved}."""
+    cutoff = datetime.now(timezone.utc) - timedelta(days=max_age_days)
+    return {spec.name: archive_table(spec, cutoff, **options) for spec in ARCHIVE_SPECS}
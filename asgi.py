@@ -0,0 +1,164 @@
+# asgi.py
+# Optional async deployment mode. The heaviest read-only endpoints are served by asyncio handlers on an
+# async SQLAlchemy engine, so one worker can keep many requests in flight while they wait on MySQL; every
+# other route falls through to the regular Flask app (run in a thread pool by asgiref).
+#
+# The /events/<user_id> stream is served here as well: an idle connection is then a suspended coroutine
+# instead of a blocked thread, so one worker can hold thousands of them.
+#
+# The async handlers do not go through the Flask before/after_request hooks. They apply the two that matter
+# to them themselves: the X-Request-ID header and log request id, and the request/DB metrics under the same
+# route labels as the Flask routes. Rate limiting only covers write endpoints, so it has nothing to check
+# here, and the handlers always read from the primary database: replica routing is not applied, so a
+# client never reads its own writes stale through this path. They only read the hot tables, so requests
+# asking for archived rows (?include_archived=true) are handed to the Flask routes.
+#
+# Run with: gunicorn asgi:app -k uvicorn.workers.UvicornWorker
+
+import asyncio
+import json
+import os
+import re
+import uuid
+from urllib.parse import parse_qsl
+
+from asgiref.wsgi import WsgiToAsgi
+
+from app import app as flask_app
+from archiving import include_archived
+from events import event_bus, format_sse
+from logging_config import REQUEST_ID_HEADER, async_request_context
+from metrics import start_async_request, record_async_request
+from views.async_views import AsyncReadHandlers, make_async_engine
+from views.event_views import SSE_HEARTBEAT_SECONDS, SSE_RETRY_MS, SSE_QUEUE_SIZE, SSE_HEADERS
+
+# (path pattern, handler, Flask rule of the same route, used as the metrics and log label)
+ASYNC_ROUTES = [
+    (re.compile(r'^/user_challenge_status/(\d+)$'), 'user_challenge_status', '/user_challenge_status/<int:user_id>'),
+    (re.compile(r'^/get_friendships/(\d+)$'), 'friendships', '/get_friendships/<int:user_id>'),
+    (re.compile(r'^/received_messages/(\d+)$'), 'received_messages', '/received_messages/<int:user_id>'),
+    (re.compile(r'^/leaderboards$'), 'leaderboards', '/leaderboards'),
+]
+
+EVENTS_ROUTE = re.compile(r'^/events/(\d+)$')
+
+
+class AsyncReadApp:
+    def __init__(self, wsgi_app, database_uri):
+        self.fallback = WsgiToAsgi(wsgi_app)
+        self.database_uri = database_uri
+        self.handlers = None
+
+    def _get_handlers(self):
+        # The engine is created lazily so each forked worker gets its own event loop bound pool
+        if self.handlers is None:
+            pool_size = int(os.getenv('ASYNC_DB_POOL_SIZE', 10))
+            self.handlers = AsyncReadHandlers(make_async_engine(self.database_uri, pool_size))
+        return self.handlers
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            return await self._lifespan(receive, send)
+
+        if scope['type'] == 'http' and scope['method'] == 'GET':
+            match = EVENTS_ROUTE.match(scope['path'])
+            if match:
+                return await self._stream_events(receive, send, int(match.group(1)))
+
+            query = dict(parse_qsl(scope.get('query_string', b'').decode('latin-1')))
+            for pattern, handler_name, route in ASYNC_ROUTES:
+                match = pattern.match(scope['path'])
+                if match and not include_archived(query):
+                    handler = getattr(self._get_handlers(), handler_name)
+                    return await self._handle(scope, send, route, handler, (int(group) for group in match.groups()))
+
+        await self.fallback(scope, receive, send)
+
+    async def _handle(self, scope, send, route, handler, args):
+        # Same request id and metrics as the Flask hooks in logging_config.py and metrics.py
+        header = REQUEST_ID_HEADER.lower().encode()
+        request_id = dict(scope['headers']).get(header, b'').decode('latin-1') or uuid.uuid4().hex
+        async_request_context.set((request_id, route))
+        started = start_async_request()
+        status = 500  # recorded as such when the handler raises
+        try:
+            payload, status = await handler(*args)
+        finally:
+            record_async_request(scope['method'], route, status, started)
+        await self._send_json(send, payload, status, [(header, request_id.encode('latin-1'))])
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                if self.handlers is not None:
+                    await self.handlers.engine.dispose()
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _stream_events(self, receive, send, user_id):
+        # Same stream as views/event_views.py
+        if not await self._get_handlers().user_exists(user_id):
+            return await self._send_json(send, {'error': 'User not found'}, 404)
+
+        loop = asyncio.get_running_loop()
+        events = asyncio.Queue(maxsize=SSE_QUEUE_SIZE)
+
+        def enqueue(event_data):
+            # Called on whichever thread committed the change (or the Redis listener thread)
+            loop.call_soon_threadsafe(lambda: events.full() or events.put_nowait(event_data))
+
+        async def wait_for_disconnect():
+            while (await receive())['type'] != 'http.disconnect':
+                pass
+
+        token = event_bus.subscribe(user_id, enqueue)
+        disconnected = asyncio.ensure_future(wait_for_disconnect())
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': 200,
+                'headers': [(b'content-type', b'text/event-stream; charset=utf-8')] +
+                           [(name.lower().encode(), value.encode()) for name, value in SSE_HEADERS.items()],
+            })
+            await send({'type': 'http.response.body', 'body': f"retry: {SSE_RETRY_MS}\n\n".encode(),
+                        'more_body': True})
+            while not disconnected.done():
+                next_event = asyncio.ensure_future(events.get())
+                await asyncio.wait([next_event, disconnected], timeout=SSE_HEARTBEAT_SECONDS,
+                                   return_when=asyncio.FIRST_COMPLETED)
+                if next_event.done():
+                    chunk = format_sse(next_event.result())
+                else:
+                    next_event.cancel()
+                    if disconnected.done():
+                        break
+                    chunk = ": keepalive\n\n"
+                await send({'type': 'http.response.body', 'body': chunk.encode(), 'more_body': True})
+        except OSError:
+            # Client went away between the disconnect check and the write
+            pass
+        finally:
+            event_bus.unsubscribe(user_id, token)
+            disconnected.cancel()
+
+    @staticmethod
+    async def _send_json(send, payload, status, headers=()):
+        # Same encoding as Flask's jsonify outside debug mode
+        body = (json.dumps(payload, sort_keys=True, separators=(',', ':')) + '\n').encode('utf-8')
+        await send({
+            'type': 'http.response.start',
+            'status': status,
+            'headers': [
+                (b'content-type', b'application/json'),
+                (b'content-length', str(len(body)).encode()),
+                (b'access-control-allow-origin', b'*'),
+                *headers,
+            ],
+        })
+        await send({'type': 'http.response.body', 'body': body})
+
+
+app = AsyncReadApp(flask_app, flask_app.config['SQLALCHEMY_DATABASE_URI'])
@@ -0,0 +1,83 @@
+# archiving.py
+# Archive throughput and the hot queries before and after archiving: [rows] notifications and as many inbox
+# messages (default 500k each), ARCHIVED_SHARE of them older than ARCHIVE_AFTER_DAYS, are timed on
+# GET /get_notifications and GET /received_messages, archived with archive_cold_rows (no pause between
+# batches) and timed again.
+#
+#   python benchmarks/archiving.py [rows]
+
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from common import make_app, measure, report
+
+from archiving import archive_cold_rows
+from extensions import db
+from models import User, Notification, MessagesInbox
+
+USERS = 1000
+ARCHIVED_SHARE = 0.9
+INSERT_BATCH = 50000
+
+
+def populate(rows):
+    rng = random.Random(1)
+    now = datetime.now()
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com'}
+        for user_id in range(1, USERS + 1)])
+
+    def timestamp(n):
+        # Rows are inserted oldest first, like they accumulate in production
+        if n < rows * ARCHIVED_SHARE:
+            return now - timedelta(days=900) + timedelta(minutes=n)
+        return now - timedelta(days=30) + timedelta(seconds=n - rows * ARCHIVED_SHARE)
+
+    for start in range(0, rows, INSERT_BATCH):
+        batch = range(start, min(rows, start + INSERT_BATCH))
+        db.session.execute(Notification.__table__.insert(), [{
+            'user_id': rng.randint(1, USERS), 'content': f'Notification {n}', 'is_read': True,
+            'timestamp': timestamp(n)} for n in batch])
+        db.session.execute(MessagesInbox.__table__.insert(), [{
+            'user_id': rng.randint(1, USERS), 'sender_id': rng.randint(1, USERS), 'content': f'Message {n}',
+            'is_read': True, 'timestamp': timestamp(n)} for n in batch])
+        db.session.commit()
+
+
+def time_hot_queries(client, when):
+    rng = random.Random(2)
+    for path in ('/get_notifications/{user}', '/received_messages/{user}'):
+        report(f'GET {path} {when}',
+               measure(lambda: client.get(path.format(user=rng.randint(1, USERS))), 500))
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(rows)
+
+    time_hot_queries(client, 'before archiving')
+    with app.app_context():
+        # One run moves at most ARCHIVE_MAX_BATCHES batches per table, the nightly task catches up over
+        # several nights; here runs are repeated until nothing is left to archive
+        started = time.perf_counter()
+        total = runs = 0
+        while True:
+            moved = sum(archive_cold_rows(pause=0).values())
+            if not moved:
+                break
+            total += moved
+            runs += 1
+        elapsed = time.perf_counter() - started
+        hot = Notification.query.count() + MessagesInbox.query.count()
+    print(f'archived {total:,} rows in {runs} runs and {elapsed:.1f}s, {total / elapsed:,.0f} rows/s, '
+          f'{hot:,} rows left in the hot tables')
+    time_hot_queries(client, 'after archiving')
+
+
+if __name__ == '__main__':
+    main()
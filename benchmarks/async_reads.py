@@ -0,0 +1,108 @@
+# async_reads.py
+# Throughput of the read endpoints served by asgi.py's asyncio handlers against the same Flask routes run on
+# a pool of threads (as gunicorn's gthread workers would), at the same number of requests in flight. On the
+# default SQLite database queries barely wait, so this mostly compares per-request overhead; point
+# BENCHMARK_DATABASE_URI at MySQL to see the effect of waiting on the network.
+#
+#   python benchmarks/async_reads.py [requests] [concurrency]
+
+import asyncio
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from common import make_app
+
+from extensions import db
+from models import User, Friendship, MessagesInbox
+
+USERS = 1000
+PATHS = ['/received_messages/{user}', '/get_friendships/{user}', '/user_challenge_status/{user}', '/leaderboards']
+
+
+def populate():
+    now = datetime(2026, 1, 1)
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'eco_points': user_id}
+        for user_id in range(1, USERS + 1)])
+    db.session.execute(Friendship.__table__.insert(), [{
+        'user_id': user_id, 'friend_id': user_id % USERS + offset, 'status': 'accepted', 'created_at': now,
+        'updated_at': now} for user_id in range(1, USERS + 1) for offset in (1, 2, 3) if user_id % USERS + offset <= USERS])
+    db.session.execute(MessagesInbox.__table__.insert(), [{
+        'user_id': user_id, 'sender_id': user_id % USERS + 1, 'content': f'Message {n}',
+        'timestamp': now + timedelta(minutes=n), 'is_read': False}
+        for user_id in range(1, USERS + 1) for n in range(20)])
+    db.session.commit()
+
+
+def request_paths(count):
+    return [PATHS[n % len(PATHS)].format(user=n % USERS + 1) for n in range(count)]
+
+
+def run_sync(app, paths, concurrency):
+    client = app.test_client()
+
+    def get(path):
+        assert client.get(path).status_code == 200
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        started = time.perf_counter()
+        list(pool.map(get, paths))
+        return time.perf_counter() - started
+
+
+def run_async(asgi_app, paths, concurrency):
+    async def get(path, slots):
+        async with slots:
+            statuses = []
+
+            async def receive():
+                return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+
+            await asgi_app({'type': 'http', 'method': 'GET', 'path': path, 'query_string': b'', 'headers': []},
+                           receive, send)
+            assert statuses == [200]
+
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+        started = time.perf_counter()
+        await asyncio.gather(*(get(path, slots) for path in paths))
+        elapsed = time.perf_counter() - started
+        await asgi_app.handlers.engine.dispose()
+        asgi_app.handlers = None
+        return elapsed
+
+    return asyncio.run(run())
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    app = make_app()
+    with app.app_context():
+        populate()
+
+    # asgi builds its module-level app from DATABASE_URI; the benchmark wraps its own app instead
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    os.environ['DATABASE_URI'] = app.config['SQLALCHEMY_DATABASE_URI']
+    from asgi import AsyncReadApp
+    asgi_app = AsyncReadApp(app, app.config['SQLALCHEMY_DATABASE_URI'])
+
+    paths = request_paths(requests)
+    # Warm up connections, caches and the async engine
+    run_sync(app, paths[:200], concurrency)
+    run_async(asgi_app, paths[:200], concurrency)
+
+    for label, elapsed in (('Flask routes, thread pool', run_sync(app, paths, concurrency)),
+                           ('asyncio handlers (asgi.py)', run_async(asgi_app, paths, concurrency))):
+        print(f"{label:<56} {requests / elapsed:9.0f} req/s   concurrency={concurrency} n={requests}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# autocomplete.py
+# Username autocomplete on an index of many users (default 1 million): the time to (re)load the index,
+# including the precomputed top lists of the prefixes with long ranges, then by prefix length the latency of
+# username_index.complete() itself, checked against the p99 < 1 ms target, and of the full GET /autocomplete
+# round trip through the Flask test client, next to the same ranking done with an ILIKE query.
+#
+#   python benchmarks/autocomplete.py [users]
+
+import random
+import string
+import sys
+import time
+
+from common import make_app, measure, percentile, report
+
+from extensions import db
+from models import User
+from username_index import username_index
+
+
+TARGET_P99 = 0.001  # seconds
+INSERT_BATCH = 50000
+
+
+def populate(users):
+    rng = random.Random(1)
+    for start in range(1, users + 1, INSERT_BATCH):
+        db.session.execute(User.__table__.insert(), [{
+            'id': user_id, 'email': f'user{user_id}@example.com', 'eco_points': rng.randint(0, 10_000),
+            'username': ''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 10))) + str(user_id)}
+            for user_id in range(start, min(users, start + INSERT_BATCH - 1) + 1)])
+        db.session.commit()
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(users)
+        started = time.perf_counter()
+        username_index._reload()
+        print(f'index of {users} users loaded in {time.perf_counter() - started:.2f}s, '
+              f'{len(username_index._top)} prefixes with precomputed top lists')
+
+    rng = random.Random(2)
+    prefixes = {length: [''.join(rng.choice(string.ascii_lowercase) for _ in range(length)) for _ in range(50)]
+                for length in (1, 2, 3, 5)}
+    for length, choices in prefixes.items():
+        timings = measure(lambda: username_index.complete(rng.choice(choices), 10), 10000)
+        met = 'met' if percentile(timings, 0.99) < TARGET_P99 else 'MISSED'
+        report(f'username_index.complete(), {length}-letter prefix', timings)
+        print(f'  p99 < {TARGET_P99 * 1000:.0f} ms target {met}')
+    for length, choices in prefixes.items():
+        report(f'GET /autocomplete (HTTP round trip), {length}-letter prefix',
+               measure(lambda: client.get(f'/autocomplete?q={rng.choice(choices)}&limit=10'), 1000))
+
+    def ilike_query():
+        with app.app_context():
+            return User.query.filter(User.username.ilike('abc%')) \
+                .order_by(User.eco_points.desc(), User.username).limit(10).all()
+
+    report('ILIKE prefix query, 3-letter prefix', measure(ilike_query, 50))
+
+
+if __name__ == '__main__':
+    main()
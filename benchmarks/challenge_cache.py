@@ -0,0 +1,72 @@
+# challenge_cache.py
+# The challenge-heavy endpoints with the Challenge/CommunityChallenge read-through cache warm, against the
+# same requests with the cache emptied before each one, and the hit rates seen during the warm run.
+#
+#   python benchmarks/challenge_cache.py [challenges]
+
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import make_app, measure, report
+
+from challenge_cache import challenge_cache, community_challenge_cache, cache_stats, invalidate_all_challenges
+from extensions import db
+from models import User, Challenge, CommunityChallenge, CommunityChallengeParticipant, PersonalChallengeParticipant
+
+USERS = 200
+
+
+def populate(challenges):
+    rng = random.Random(1)
+    start = datetime(2026, 1, 1)
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'eco_points': 0}
+        for user_id in range(1, USERS + 1)])
+    db.session.execute(Challenge.__table__.insert(), [{
+        'id': challenge_id, 'name': f'Challenge {challenge_id}', 'description': 'Refill instead of buying',
+        'eco_points': 10, 'start_date': start, 'end_date': start + timedelta(days=30)}
+        for challenge_id in range(1, challenges + 1)])
+    db.session.execute(CommunityChallenge.__table__.insert(), [{
+        'id': challenge_id, 'challenge_id': challenge_id, 'created_by': rng.randint(1, USERS)}
+        for challenge_id in range(1, challenges + 1)])
+    db.session.execute(CommunityChallengeParticipant.__table__.insert(), [{
+        'community_challenge_id': challenge_id, 'participant_id': user_id, 'status': 'active', 'start_date': start}
+        for user_id in range(1, USERS + 1) for challenge_id in rng.sample(range(1, challenges + 1), 10)])
+    db.session.execute(PersonalChallengeParticipant.__table__.insert(), [{
+        'user_id': user_id, 'challenge_id': challenge_id, 'start_date': start}
+        for user_id in range(1, USERS + 1) for challenge_id in rng.sample(range(1, challenges + 1), 10)])
+    db.session.commit()
+
+
+def main():
+    challenges = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(challenges)
+
+    rng = random.Random(2)
+    endpoints = [
+        ('/get_community_challenges', lambda: '/get_community_challenges'),
+        ('/community_challenge_details/<id>', lambda: f'/community_challenge_details/{rng.randint(1, challenges)}'),
+        ('/user_challenge_status/<id>', lambda: f'/user_challenge_status/{rng.randint(1, USERS)}'),
+    ]
+    for label, path in endpoints:
+        def cold():
+            invalidate_all_challenges()
+            client.get(path())
+
+        report(f'{label} cold (cache emptied)', measure(cold, 200))
+
+        measure(lambda: client.get(path()), 200)
+        for cache in (challenge_cache, community_challenge_cache):
+            cache.hits = cache.misses = 0
+        report(f'{label} warm', measure(lambda: client.get(path()), 500))
+        stats = cache_stats()
+        print(f"    hit rate: challenges {stats['challenges']['hit_rate']:.1%}, "
+              f"community challenges {stats['community_challenges']['hit_rate']:.1%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# common.py
+# Shared set-up for the benchmark scripts. Run them from the repository root, e.g.
+#
+#   python benchmarks/community_ranking.py
+#
+# They build the full application on a throwaway SQLite database, or on BENCHMARK_DATABASE_URI (for
+# example a MySQL schema) when it is set, and print latency percentiles.
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+
+
+def make_app(**config):
+    """The application on a fresh database, with `config` applied before the database is set up."""
+    from extensions import db
+    from views import create_app
+
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.getenv('BENCHMARK_DATABASE_URI') or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    app.config.update(config)
+    db.init_app(app)
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+    return app
+
+
+def measure(function, repeat):
+    """Calls function `repeat` times and returns the sorted durations in seconds."""
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)
+
+
+def percentile(timings, fraction):
+    return timings[min(len(timings) - 1, int(len(timings) * fraction))]
+
+
+def report(label, timings):
+    print(f"{label:<56} p50 {percentile(timings, 0.5) * 1000:9.3f} ms   "
+          f"p99 {percentile(timings, 0.99) * 1000:9.3f} ms   n={len(timings)}")
@@ -0,0 +1,91 @@
+# community_ranking.py
+# /community_challenge_ranking on a challenge with many participants (default 100k): building the cached
+# participant ordering, then first and deep pages served from it (also right after a write, which moves
+# the participant in the cached ordering), against the grouped OFFSET query every page used to run.
+#
+#   python benchmarks/community_ranking.py [participants]
+
+import random
+import sys
+from datetime import datetime
+
+from common import make_app, measure, report
+
+from caching import community_ranking_cache
+from extensions import db
+from models import User, Challenge, CommunityChallenge, CommunityChallengeParticipant, EnvironmentalImpact
+from views.challenge_views import ranking_cursor
+
+
+def populate(participants):
+    rng = random.Random(1)
+    db.session.execute(Challenge.__table__.insert(), [{
+        'id': 1, 'name': 'Refill month', 'eco_points': 10, 'start_date': datetime(2026, 1, 1),
+        'end_date': datetime(2026, 2, 1)}])
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'eco_points': 0}
+        for user_id in range(1, participants + 1)])
+    db.session.execute(CommunityChallenge.__table__.insert(), [{'id': 1, 'challenge_id': 1, 'created_by': 1}])
+    db.session.execute(CommunityChallengeParticipant.__table__.insert(), [{
+        'community_challenge_id': 1, 'participant_id': user_id, 'status': 'active',
+        'start_date': datetime(2026, 1, 1)} for user_id in range(1, participants + 1)])
+    # Most participants have logged something, a few have not
+    db.session.execute(EnvironmentalImpact.__table__.insert(), [{
+        'user_id': user_id, 'community_challenge_id': 1, 'impact_score': float(rng.randint(0, 5000))}
+        for user_id in range(1, participants + 1) if rng.random() < 0.9])
+    db.session.commit()
+
+
+def main():
+    participants = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(participants)
+        # Cursor of the page halfway down the ranking
+        rows = client.get('/community_challenge_ranking/1?per_page=100').json
+        deep_rank = participants // 2
+        impact_score = db.func.coalesce(db.func.sum(EnvironmentalImpact.impact_score), 0)
+        score, user_id = db.session.query(impact_score, User.id) \
+            .select_from(CommunityChallengeParticipant) \
+            .join(User, User.id == CommunityChallengeParticipant.participant_id) \
+            .outerjoin(EnvironmentalImpact, (EnvironmentalImpact.user_id == User.id) &
+                       (EnvironmentalImpact.community_challenge_id == 1)) \
+            .group_by(User.id).order_by(impact_score.desc(), User.id).offset(deep_rank - 1).limit(1).one()
+        deep_cursor = ranking_cursor(score, user_id)
+
+        def uncached(path):
+            def request():
+                community_ranking_cache.clear()
+                assert client.get(path).status_code == 200
+            return request
+
+        def offset_page():
+            db.session.query(User.id, impact_score) \
+                .select_from(CommunityChallengeParticipant) \
+                .join(User, User.id == CommunityChallengeParticipant.participant_id) \
+                .outerjoin(EnvironmentalImpact, (EnvironmentalImpact.user_id == User.id) &
+                           (EnvironmentalImpact.community_challenge_id == 1)) \
+                .filter(CommunityChallengeParticipant.community_challenge_id == 1) \
+                .group_by(User.id).order_by(impact_score.desc(), User.id) \
+                .offset(deep_rank).limit(21).all()
+
+        print(f"{participants} participants, {len(rows['participants'])} rows on the first 100-row page")
+        report("first page, ordering not cached", measure(uncached('/community_challenge_ranking/1'), 20))
+        report(f"grouped OFFSET query for rank {deep_rank} (previous scheme)", measure(offset_page, 20))
+        client.get('/community_challenge_ranking/1')
+        report("first page", measure(lambda: client.get('/community_challenge_ranking/1'), 200))
+        report(f"page after rank {deep_rank}",
+               measure(lambda: client.get(f'/community_challenge_ranking/1?after={deep_cursor}'), 200))
+
+        def log_and_read():
+            client.post('/log_water_usage', json={'user_id': rng.randint(1, participants), 'bottle_type': 'refillable',
+                                                  'challenge_type': 'community', 'challenge_id': 1})
+            client.get('/community_challenge_ranking/1')
+
+        rng = random.Random(2)
+        report("log_water_usage, then first page", measure(log_and_read, 200))
+
+
+if __name__ == '__main__':
+    main()
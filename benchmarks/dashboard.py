@@ -0,0 +1,109 @@
+# dashboard.py
+# GET /dashboard against the six calls it replaces (/view_profile, /get_eco_points, /get_badges,
+# /user_challenge_status, /get_notifications and /leaderboards), with the section cache emptied before
+# every dashboard and with it warm, plus the SQL statements each variant runs.
+#
+#   python benchmarks/dashboard.py [users]
+
+import random
+import sys
+from datetime import datetime, timedelta
+
+from common import make_app, measure, report
+
+from sqlalchemy import event
+
+from challenge_cache import invalidate_all_challenges
+from extensions import db
+from models import User, UserPreference, Badge, Challenge, PersonalChallengeParticipant, EnvironmentalImpact, \
+    Notification
+from models.challenge_models import user_badges
+from views.dashboard_views import dashboard_cache
+
+CHALLENGES = 200
+PER_USER = 10  # badges, challenges and notifications of every user
+
+
+def populate(users):
+    rng = random.Random(1)
+    start = datetime(2026, 1, 1)
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+        'eco_points': rng.randint(0, 5000)} for user_id in range(1, users + 1)])
+    db.session.execute(UserPreference.__table__.insert(), [{
+        'user_id': user_id, 'receive_notifications': True, 'privacy_settings': 'Public'}
+        for user_id in range(1, users + 1)])
+    db.session.execute(Badge.__table__.insert(), [{
+        'id': badge_id, 'name': f'Badge {badge_id}', 'eco_points_required': badge_id * 100}
+        for badge_id in range(1, PER_USER * 2 + 1)])
+    db.session.execute(Challenge.__table__.insert(), [{
+        'id': challenge_id, 'name': f'Challenge {challenge_id}', 'eco_points': 10, 'start_date': start,
+        'end_date': start + timedelta(days=30)} for challenge_id in range(1, CHALLENGES + 1)])
+    for user_id in range(1, users + 1):
+        db.session.execute(user_badges.insert(), [{'user_id': user_id, 'badge_id': badge_id}
+                                                  for badge_id in rng.sample(range(1, PER_USER * 2 + 1), PER_USER)])
+        db.session.execute(PersonalChallengeParticipant.__table__.insert(), [{
+            'user_id': user_id, 'challenge_id': challenge_id, 'start_date': start}
+            for challenge_id in rng.sample(range(1, CHALLENGES + 1), PER_USER)])
+    db.session.execute(EnvironmentalImpact.__table__.insert(), [{
+        'user_id': participant.user_id, 'impact_score': 1.5, 'personal_challenge_id': participant.id}
+        for participant in PersonalChallengeParticipant.query.all()])
+    db.session.execute(Notification.__table__.insert(), [{
+        'user_id': user_id, 'content': f'Notification {n}', 'timestamp': start + timedelta(hours=n)}
+        for user_id in range(1, users + 1) for n in range(PER_USER)])
+    db.session.commit()
+
+
+def six_calls(client, user_id):
+    for path in (f'/view_profile/{user_id}', f'/get_eco_points/{user_id}', f'/get_badges/{user_id}',
+                 f'/user_challenge_status/{user_id}', f'/get_notifications/{user_id}', '/leaderboards'):
+        assert client.get(path).status_code == 200
+
+
+def cold_dashboard(client, user_id):
+    dashboard_cache.clear()
+    invalidate_all_challenges()
+    assert client.get(f'/dashboard/{user_id}').status_code == 200
+
+
+def count_statements(app, function):
+    statements = []
+
+    def listener(*args):
+        statements.append(args[2])
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        function()
+        event.remove(db.engine, 'before_cursor_execute', listener)
+    return len(statements)
+
+
+def main():
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(users)
+
+    rng = random.Random(2)
+
+    def six_calls_cold():
+        invalidate_all_challenges()
+        six_calls(client, rng.randint(1, users))
+
+    variants = [
+        ('six separate calls', six_calls_cold),
+        ('GET /dashboard, cache emptied', lambda: cold_dashboard(client, rng.randint(1, users))),
+        ('GET /dashboard, warm cache', lambda: client.get('/dashboard/1')),
+    ]
+    client.get('/dashboard/1')
+    for label, function in variants:
+        report(label, measure(function, 500))
+    for label, function in variants:
+        function()  # the cold variants empty the caches themselves, the warm one must find them filled
+        print(f'{label:<56} {count_statements(app, function)} SQL statements')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,80 @@
+# export.py
+# Throughput and peak memory of the streamed impact export: one user with [rows] impact records (default
+# 10 million) is exported as CSV, NDJSON and gzipped CSV to /dev/null through generate_export, the code
+# behind both /export/<user_id>/impacts and `flask export-data`. Every format runs in its own process, so
+# its peak RSS (ru_maxrss) is not inflated by the data load or by the format before it, and the growth
+# over the process's RSS before the export shows whether memory stays flat.
+#
+#   python benchmarks/export.py [rows]
+
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import make_app
+
+from extensions import db
+from models import EnvironmentalImpact, User
+
+FORMATS = [('csv', False), ('ndjson', False), ('csv', True)]
+INSERT_BATCH = 50000
+
+
+def populate(rows):
+    db.session.execute(User.__table__.insert(), {'id': 1, 'username': 'ana', 'email': 'ana@example.com'})
+    for start in range(0, rows, INSERT_BATCH):
+        db.session.execute(EnvironmentalImpact.__table__.insert(), [{
+            'user_id': 1, 'impact_score': n * 0.5, 'water_saved': n % 50, 'plastic_waste_reduced': 0.25,
+            'co2_emissions_prevented': 0.1, 'money_saved': 1.5, 'refillable_bottles': 1}
+            for n in range(start, min(rows, start + INSERT_BATCH))])
+        db.session.commit()
+
+
+def export(database_uri, export_format, compress, rows):
+    """Runs in a child process: exports user 1 and prints one result line."""
+    from views import create_app
+    from views.export_views import generate_export
+
+    app = create_app()
+    app.config['SQLALCHEMY_DATABASE_URI'] = database_uri
+    db.init_app(app)
+    with app.app_context(), open(os.devnull, 'wb') as sink:
+        db.session.execute(db.select(User.id)).all()  # connect before the baseline is taken
+        baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        written = 0
+        started = time.perf_counter()
+        for chunk in generate_export('impacts', export_format, 1, compress):
+            written += len(chunk)
+            sink.write(chunk)
+        elapsed = time.perf_counter() - started
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    label = export_format + (' + gzip' if compress else '')
+    print(f'{label:<14} {rows / elapsed:>12,.0f} rows/s   {elapsed:8.1f} s   {written / 2 ** 20:9.1f} MiB written   '
+          f'peak RSS {peak / 1024:7.1f} MiB ({(peak - baseline) / 1024:+.1f} MiB during the export)')
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    if os.getenv('BENCHMARK_DATABASE_URI') is None:
+        os.environ['BENCHMARK_DATABASE_URI'] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'export.db')}"
+    database_uri = os.environ['BENCHMARK_DATABASE_URI']
+
+    app = make_app()
+    started = time.perf_counter()
+    with app.app_context():
+        populate(rows)
+    print(f'{rows:,} impact records inserted in {time.perf_counter() - started:.0f}s')
+
+    for export_format, compress in FORMATS:
+        subprocess.run([sys.executable, __file__, '--export', database_uri, export_format, str(int(compress)),
+                        str(rows)], check=True)
+
+
+if __name__ == '__main__':
+    if sys.argv[1:2] == ['--export']:
+        export(sys.argv[2], sys.argv[3], sys.argv[4] == '1', int(sys.argv[5]))
+    else:
+        main()
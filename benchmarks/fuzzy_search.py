@@ -0,0 +1,53 @@
+# fuzzy_search.py
+# Typo-tolerant username search: BKTree.search against comparing the query with every username (what
+# fuzzy_search does until the tree is built), at edit distances 1 and 2, plus the time to build the tree.
+# Random usernames are close to the worst case for a BK-tree; real ones cluster more and prune better.
+#
+#   python benchmarks/fuzzy_search.py [usernames]
+
+import random
+import string
+import sys
+import time
+
+import jellyfish
+
+from common import measure, report
+
+from username_index import BKTree
+
+
+def brute_force(words, query, max_distance):
+    matches = []
+    for word in words:
+        distance = jellyfish.damerau_levenshtein_distance(query, word)
+        if distance <= max_distance:
+            matches.append((distance, word))
+    return matches
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    rng = random.Random(1)
+    words = list({''.join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 12)))
+                  for _ in range(count)})
+
+    started = time.perf_counter()
+    tree = BKTree()
+    for word in words:
+        tree.add(word)
+    print(f'BK-tree over {len(words)} usernames built in {time.perf_counter() - started:.2f}s')
+
+    # Queries are usernames with one typo, so every search has at least one match
+    queries = [word[:1] + word[2:] for word in rng.sample(words, 20)]
+    for max_distance in (1, 2):
+        assert all(sorted(tree.search(query, max_distance)) == sorted(brute_force(words, query, max_distance))
+                   for query in queries[:3])
+        report(f'BK-tree search, distance {max_distance}',
+               measure(lambda: tree.search(rng.choice(queries), max_distance), 20))
+        report(f'brute force, distance {max_distance}',
+               measure(lambda: brute_force(words, rng.choice(queries), max_distance), 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,60 @@
+# logging_overhead.py
+# Cost of a log call on the request thread under each logging configuration (output discarded): below
+# LOG_LEVEL, synchronous text, synchronous JSON and queued JSON, then /leaderboards requests logging one
+# INFO record each with logging on and off.
+#
+#   python benchmarks/logging_overhead.py [calls]
+
+import logging
+import os
+import sys
+
+from common import make_app, measure, report
+
+import logging_config
+
+CONFIGURATIONS = [
+    ('below LOG_LEVEL (logging off)', {'LOG_LEVEL': 'WARNING', 'LOG_MODE': 'sync', 'LOG_FORMAT': 'text'}),
+    ('sync, text', {'LOG_LEVEL': 'INFO', 'LOG_MODE': 'sync', 'LOG_FORMAT': 'text'}),
+    ('sync, json', {'LOG_LEVEL': 'INFO', 'LOG_MODE': 'sync', 'LOG_FORMAT': 'json'}),
+    ('queue, json', {'LOG_LEVEL': 'INFO', 'LOG_MODE': 'queue', 'LOG_FORMAT': 'json'}),
+]
+
+devnull = open(os.devnull, 'w')
+
+
+def configure(settings):
+    logging_config._stop_listener()
+    logging_config._listener = None
+    os.environ.update(settings)
+    logging_config.configure_logging()
+    # Discard the output so the terminal is not part of the measurement
+    handlers = logging_config._listener.handlers if logging_config._listener else logging.getLogger().handlers
+    for handler in handlers:
+        handler.setStream(devnull)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    logger = logging.getLogger('benchmark')
+    app = make_app()
+
+    @app.route('/benchmark_logged')
+    def logged():
+        logger.info("Leaderboard served to %s", 'user42')
+        return {'ok': True}
+
+    client = app.test_client()
+    for label, settings in CONFIGURATIONS:
+        configure(settings)
+        report(f'logger.info, {label}', measure(lambda: logger.info("Refill logged for %s", 'user42'), calls))
+        with app.test_request_context('/leaderboards'):
+            app.preprocess_request()
+            report(f'logger.info in a request, {label}',
+                   measure(lambda: logger.info("Refill logged for %s", 'user42'), calls))
+        report(f'GET logging one record, {label}', measure(lambda: client.get('/benchmark_logged'), calls // 10))
+    logging_config._stop_listener()
+
+
+if __name__ == '__main__':
+    main()
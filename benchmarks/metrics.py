@@ -0,0 +1,54 @@
+# metrics.py
+# Per-request cost of the Prometheus instrumentation: /get_eco_points (one query) and /leaderboards with the
+# request hooks and SQL statement listeners installed, against the same app with both removed.
+#
+#   python benchmarks/metrics.py [requests]
+
+import sys
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from common import make_app, measure, report
+
+import metrics
+from extensions import db
+from models import User
+
+LISTENERS = [('before_cursor_execute', metrics._before_cursor_execute),
+             ('after_cursor_execute', metrics._after_cursor_execute),
+             ('handle_error', metrics._on_statement_error)]
+
+
+def remove_metrics(app):
+    app.before_request_funcs[None].remove(metrics._start_request_timer)
+    app.after_request_funcs[None].remove(metrics._record_request)
+    for name, listener in LISTENERS:
+        event.remove(Engine, name, listener)
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    app = make_app()
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [{
+            'username': f'user{n}', 'email': f'user{n}@example.com', 'eco_points': n} for n in range(100)])
+        db.session.commit()
+    client = app.test_client()
+    paths = ['/get_eco_points/1', '/leaderboards']
+
+    results = {}
+    for label in ('with metrics', 'without metrics'):
+        if label == 'without metrics':
+            remove_metrics(app)
+        for path in paths:
+            measure(lambda: client.get(path), 100)
+            results[path, label] = measure(lambda: client.get(path), requests)
+
+    for path in paths:
+        for label in ('with metrics', 'without metrics'):
+            report(f'GET {path} {label}', results[path, label])
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,50 @@
+# profiling.py
+# Per-request cost of the route profiler on a cheap endpoint (/leaderboards): disabled (no hooks installed),
+# installed but not sampling this request, sampled at 1%, and every request profiled.
+#
+#   python benchmarks/profiling.py [requests]
+
+import os
+import sys
+import tempfile
+
+from common import make_app, measure, report
+
+from extensions import db
+from models import User
+
+PROFILE_SETTINGS = ('PROFILE_ROUTES', 'PROFILE_SAMPLE_RATE', 'PROFILE_TOKEN', 'PROFILE_DIR', 'PROFILE_ALLOCATIONS')
+
+
+def make_profiled_app(**settings):
+    for name in PROFILE_SETTINGS:
+        os.environ.pop(name, None)
+    os.environ.update(settings)
+    app = make_app()
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [{
+            'username': f'user{n}', 'email': f'user{n}@example.com', 'eco_points': n} for n in range(100)])
+        db.session.commit()
+    return app
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    directory = tempfile.mkdtemp()
+    cases = [
+        ('profiling disabled', {}, {}),
+        ('token set, request not profiled', {'PROFILE_TOKEN': 'secret'}, {}),
+        ('PROFILE_ROUTES=1, 1% sampled', {'PROFILE_ROUTES': '1', 'PROFILE_SAMPLE_RATE': '0.01'}, {}),
+        ('every request profiled (cProfile only)', {'PROFILE_TOKEN': 'secret', 'PROFILE_ALLOCATIONS': '0'},
+         {'X-Profile-Token': 'secret'}),
+        ('every request profiled (cProfile + tracemalloc)', {'PROFILE_TOKEN': 'secret'},
+         {'X-Profile-Token': 'secret'}),
+    ]
+    for label, settings, headers in cases:
+        client = make_profiled_app(PROFILE_DIR=directory, **settings).test_client()
+        measure(lambda: client.get('/leaderboards', headers=headers), 50)
+        report(label, measure(lambda: client.get('/leaderboards', headers=headers), requests))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+# rate_limiting.py
+# Cost of admission control: one acquire() on the in-process limiter and on the Redis limiter (a fakeredis
+# stand-in by default, so network round trips are not included; set BENCHMARK_REDIS_URL to use a real
+# server), then POST /log_water_usage with no limiter, each limiter admitting, and the in-process limiter
+# rejecting with 429.
+#
+#   python benchmarks/rate_limiting.py [requests]
+
+import os
+import sys
+
+from common import make_app, measure, report
+
+import rate_limiting
+from extensions import db
+from models import User
+from rate_limiting import InProcessLimiter, RedisLimiter, init_rate_limiting
+
+
+def redis_client():
+    if os.getenv('BENCHMARK_REDIS_URL'):
+        import redis
+        return redis.Redis.from_url(os.environ['BENCHMARK_REDIS_URL'])
+    import fakeredis
+    return fakeredis.FakeRedis()
+
+
+def limited_client(limiter):
+    app = make_app()
+    if limiter is not None:
+        init_rate_limiting(app, limiter)
+    with app.app_context():
+        db.session.add(User(username='ana', email='ana@example.com', password_hash='unused'))
+        db.session.commit()
+    return app.test_client()
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    limits = [('log_water_usage:client:10.0.0.1', 1e9, 1e9), ('log_water_usage:route', 1e9, 1e9)]
+    limiters = [('in-process', InProcessLimiter()), ('redis', RedisLimiter(redis_client()))]
+    for label, limiter in limiters:
+        report(f'acquire(), {label}', measure(lambda: limiter.acquire(limits), requests * 10))
+
+    payload = {'user_id': 1, 'bottle_type': 'refillable'}
+    rate_limiting.RATE_LIMITS['log_water_usage'] = (1e9, 1e9, 1e9, 1e9)
+    for label, limiter in [('no limiter', None)] + limiters:
+        client = limited_client(limiter)
+        report(f'POST /log_water_usage admitted, {label}',
+               measure(lambda: client.post('/log_water_usage', json=payload), requests))
+
+    rate_limiting.RATE_LIMITS['log_water_usage'] = (1e-9, 1, 1e9, 1e9)
+    client = limited_client(InProcessLimiter())
+    report('POST /log_water_usage rejected (429), in-process',
+           measure(lambda: client.post('/log_water_usage', json=payload), requests))
+
+
+if __name__ == '__main__':
+    main()
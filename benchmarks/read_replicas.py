@@ -0,0 +1,125 @@
+# read_replicas.py
+# Load moved off the primary by read routing, and the cost of the routing itself. CLIENTS clients send a
+# mix of profile, leaderboard and friendship reads with WRITE_SHARE profile updates, and echo the
+# X-DB-Primary-Until header of their last write like the app does. The primary is the app's SQLite file,
+# the replica a second one (or BENCHMARK_REPLICA_URI) with the same data; a before_cursor_execute listener
+# on each engine counts the statements it runs, so the split shows how much of the query load each serves.
+#
+#   python benchmarks/read_replicas.py [requests]
+
+import os
+import random
+import sys
+import tempfile
+import time
+
+from common import make_app, measure, report
+
+from sqlalchemy import event
+
+import extensions
+from extensions import STICKY_HEADER, STICKY_SECONDS, db
+from models import User, Friendship
+
+USERS = 500
+CLIENTS = 100
+WRITE_SHARE = 0.1
+# Simulated seconds between two requests of the whole mix, so a client's sticky window covers the few
+# requests it sends right after a write and then runs out
+REQUEST_INTERVAL = 0.01
+
+
+def populate(engine):
+    with engine.begin() as connection:
+        connection.execute(User.__table__.insert(), [{
+            'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com',
+            'eco_points': user_id} for user_id in range(1, USERS + 1)])
+        connection.execute(Friendship.__table__.insert(), [{
+            'user_id': user_id, 'friend_id': user_id % USERS + 1, 'status': 'accepted'}
+            for user_id in range(1, USERS + 1)])
+
+
+class SimulatedClock:
+    """Stands in for the time module of extensions, so sticky windows last STICKY_SECONDS of simulated time
+    whatever the speed of the machine."""
+
+    def __init__(self):
+        self.now = time.time()
+
+    def time(self):
+        return self.now
+
+
+def count_statements(engine, counts, name):
+    def listener(*args):
+        counts[name] += 1
+
+    event.listen(engine, 'before_cursor_execute', listener)
+
+
+def run_mix(client, requests):
+    """Sends the request mix and returns how many of the reads carried a sticky window that was still open."""
+    rng = random.Random(1)
+    sticky = {}  # client -> X-DB-Primary-Until of its last write
+    pinned = 0
+    for n in range(requests):
+        extensions.time.now += REQUEST_INTERVAL
+        client_id = rng.randrange(CLIENTS)
+        user_id = client_id + 1
+        headers = {STICKY_HEADER: sticky[client_id]} if client_id in sticky else {}
+        if rng.random() < WRITE_SHARE:
+            response = client.put(f'/update_user_profile/{user_id}', json={'profile_picture': f'{n}.png'},
+                                  headers=headers)
+            if STICKY_HEADER in response.headers:
+                sticky[client_id] = response.headers[STICKY_HEADER]
+            continue
+        if headers and float(headers[STICKY_HEADER]) >= extensions.time.now:
+            pinned += 1
+        path = rng.choice([f'/view_profile/{user_id}', '/leaderboards', f'/get_friendships/{user_id}'])
+        assert client.get(path, headers=headers).status_code == 200
+    return pinned
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    replica_uri = os.getenv('BENCHMARK_REPLICA_URI') or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'replica.db')}"
+
+    extensions.time = SimulatedClock()
+    single = make_app()
+    with single.app_context():
+        populate(db.engine)
+        counts = {'primary': 0}
+        count_statements(db.engine, counts, 'primary')
+    run_mix(single.test_client(), requests)
+    print(f'no replica: {counts["primary"]} statements on the primary')
+
+    routed = make_app(SQLALCHEMY_BINDS={'replica_0': replica_uri})
+    with routed.app_context():
+        replica = db.engines['replica_0']
+        db.metadata.drop_all(replica)
+        db.metadata.create_all(replica)
+        populate(db.engine)
+        populate(replica)
+        counts = {'primary': 0, 'replica': 0}
+        count_statements(db.engine, counts, 'primary')
+        count_statements(replica, counts, 'replica')
+    pinned = run_mix(routed.test_client(), requests)
+    total = counts['primary'] + counts['replica']
+    print(f'one replica: {counts["primary"]} statements on the primary ({counts["primary"] / total:.0%}), '
+          f'{counts["replica"]} on the replica ({counts["replica"] / total:.0%}); '
+          f'{pinned} reads pinned to the primary by a {STICKY_SECONDS}s sticky window')
+    extensions.time = time
+
+    # Routing overhead per request
+    client = single.test_client()
+    report('GET /view_profile, no replica', measure(lambda: client.get('/view_profile/1'), 2000))
+    client = routed.test_client()
+    report('GET /view_profile, routed to the replica', measure(lambda: client.get('/view_profile/1'), 2000))
+    report('GET /view_profile, pinned to the primary by the header',
+           measure(lambda: client.get('/view_profile/1', headers={
+               STICKY_HEADER: str(time.time() + STICKY_SECONDS)}), 2000))
+
+
+if __name__ == '__main__':
+    main()
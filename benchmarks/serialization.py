@@ -0,0 +1,72 @@
+# serialization.py
+# JSON encoding cost of the row endpoints (/get_users, /view_posts, /get_impact) and of a plain jsonify
+# payload: rows_response and FastJSONProvider against Flask's DefaultJSONProvider on the same data, then
+# the full endpoints end to end.
+#
+#   python benchmarks/serialization.py [rows]
+
+import sys
+from datetime import datetime, timedelta
+
+from flask.json.provider import DefaultJSONProvider
+
+from common import make_app, measure, report
+
+from extensions import db
+from models import User, Post, EnvironmentalImpact
+from serialization import rows_response
+from views.environment_views import impact_serializer, IMPACT_COLUMNS
+from views.social_views import post_serializer, user_serializer
+
+
+def populate(rows):
+    now = datetime(2026, 1, 1)
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'eco_points': 0}
+        for user_id in range(1, rows + 1)])
+    db.session.execute(Post.__table__.insert(), [{
+        'user_id': n % rows + 1, 'content': f'Refilled my bottle for the {n}th time today',
+        'created_at': now + timedelta(minutes=n), 'updated_at': now + timedelta(minutes=n)} for n in range(rows)])
+    db.session.execute(EnvironmentalImpact.__table__.insert(), [{
+        'user_id': 1, 'impact_score': n * 1.5, 'water_saved': n * 0.83, 'plastic_waste_reduced': n * 0.004,
+        'co2_emissions_prevented': n * 0.43, 'money_saved': n * 0.85, 'recycled_bottles': n,
+        'single_use_bottles': 0, 'refillable_bottles': n} for n in range(rows)])
+    db.session.commit()
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(rows)
+        default = DefaultJSONProvider(app)
+        datasets = [
+            ('/get_users', user_serializer, db.session.query(User.id, User.username, User.email).all()),
+            ('/view_posts', post_serializer, [
+                (post_id, username, content, created_at.strftime("%Y-%m-%d %H:%M:%S"),
+                 updated_at.strftime("%Y-%m-%d %H:%M:%S")) for post_id, username, content, created_at, updated_at
+                in db.session.query(Post.id, User.username, Post.content, Post.created_at, Post.updated_at)
+                .join(User, User.id == Post.user_id)]),
+            ('/get_impact/1', impact_serializer,
+             db.session.query(*[getattr(EnvironmentalImpact, column) for column in IMPACT_COLUMNS]).all()),
+        ]
+
+    with app.test_request_context():
+        for path, serializer, data in datasets:
+            report(f'{path} encode, DefaultJSONProvider (n rows={len(data)})',
+                   measure(lambda: default.response([serializer.to_dict(row) for row in data]), 50))
+            report(f'{path} encode, rows_response',
+                   measure(lambda: rows_response(serializer, data), 50))
+
+        payload = {'leaderboard': [{'username': f'user{n}', 'eco_points': n * 1.5, 'rank': n}
+                                   for n in range(rows)]}
+        report('jsonify dict payload, DefaultJSONProvider', measure(lambda: default.response(payload), 50))
+        report('jsonify dict payload, FastJSONProvider', measure(lambda: app.json.response(payload), 50))
+
+    for path, _, _ in datasets:
+        report(f'GET {path} end to end', measure(lambda: client.get(path), 50))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,138 @@
+# sse_connections.py
+# Load test of the /events stream in the async mode: starts one uvicorn worker serving asgi:app on a
+# throwaway SQLite database (or BENCHMARK_DATABASE_URI), opens thousands of idle SSE connections to it and
+# prints:
+#   - the time to open them and the worker's memory per connection
+#   - the latency of ordinary requests while they are open
+#   - how long one event takes to reach every connection listening for that user
+#
+#   python benchmarks/sse_connections.py [connections]
+
+import asyncio
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+from common import percentile, report
+
+HOST = '127.0.0.1'
+PORT = int(os.getenv('BENCHMARK_PORT', 8765))
+LISTENERS = 1  # every connection listens for user 1, so one event fans out to all of them
+
+
+def prepare_database():
+    os.environ['DATABASE_URI'] = os.getenv('BENCHMARK_DATABASE_URI') or \
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'benchmark.db')}"
+    os.environ.setdefault('LOG_LEVEL', 'WARNING')
+    from app import app
+    from extensions import db
+    from models import User
+    with app.app_context():
+        db.session.execute(User.__table__.delete())
+        db.session.execute(User.__table__.insert(), [
+            {'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com'}
+            for user_id in (1, 2)])
+        db.session.commit()
+
+
+def start_server():
+    return subprocess.Popen([sys.executable, '-m', 'uvicorn', 'asgi:app', '--host', HOST, '--port', str(PORT),
+                             '--log-level', 'warning', '--backlog', '16384'],
+                            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def rss_kb(pid):
+    with open(f'/proc/{pid}/status') as status:
+        for line in status:
+            if line.startswith('VmRSS:'):
+                return int(line.split()[1])
+    return 0
+
+
+async def request(method, path, body=b''):
+    reader, writer = await asyncio.open_connection(HOST, PORT)
+    writer.write(f'{method} {path} HTTP/1.1\r\nHost: {HOST}\r\nContent-Type: application/json\r\n'
+                 f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    return int(response.split(b' ', 2)[1])
+
+
+async def wait_for_server():
+    for _ in range(200):
+        try:
+            return await request('GET', '/leaderboards')
+        except OSError:
+            await asyncio.sleep(0.1)
+    raise RuntimeError('uvicorn did not start')
+
+
+async def open_stream(slots):
+    async with slots:
+        reader, writer = await asyncio.open_connection(HOST, PORT)
+        writer.write(f'GET /events/{LISTENERS} HTTP/1.1\r\nHost: {HOST}\r\n\r\n'.encode())
+        await writer.drain()
+        while not (await reader.readline()).startswith(b'retry:'):
+            pass
+        await reader.readline()
+        return reader, writer
+
+
+async def next_event(reader):
+    while True:
+        line = await reader.readline()
+        if line.startswith(b'event: message'):
+            return time.perf_counter()
+        if not line:
+            raise ConnectionError('stream closed')
+
+
+async def main(connections, server_pid):
+    await wait_for_server()
+    baseline = rss_kb(server_pid)
+
+    # Connections are opened a few hundred at a time, like clients reconnecting after a deploy
+    started = time.perf_counter()
+    slots = asyncio.Semaphore(500)
+    streams = await asyncio.gather(*(open_stream(slots) for _ in range(connections)))
+    opened = time.perf_counter() - started
+    await asyncio.sleep(1)
+    per_connection = (rss_kb(server_pid) - baseline) / connections
+    print(f'{connections} idle streams opened in {opened:.2f}s, {per_connection:.1f} KB of worker memory each')
+
+    timings = []
+    for _ in range(200):
+        request_started = time.perf_counter()
+        assert await request('GET', '/leaderboards') == 200
+        timings.append(time.perf_counter() - request_started)
+    report(f'GET /leaderboards with {connections} idle streams', sorted(timings))
+
+    for _ in range(3):
+        waiting = [asyncio.ensure_future(next_event(reader)) for reader, _ in streams]
+        sent = time.perf_counter()
+        assert await request('POST', '/send_message', b'{"sender_id": 2, "recipient_id": %d, "content": "Hi"}'
+                             % LISTENERS) in (200, 201)
+        delivered = sorted(received - sent for received in await asyncio.gather(*waiting))
+        print(f'one event to {connections} streams: first after {delivered[0] * 1000:.1f} ms, '
+              f'p50 {percentile(delivered, 0.5) * 1000:.1f} ms, last after {delivered[-1] * 1000:.1f} ms')
+
+    for _, writer in streams:
+        writer.close()
+
+
+if __name__ == '__main__':
+    connections = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (min(hard, max(soft, connections * 2 + 1000)), hard))
+
+    prepare_database()
+    uvicorn = start_server()
+    try:
+        asyncio.run(main(connections, uvicorn.pid))
+    finally:
+        uvicorn.terminate()
+        uvicorn.wait()
@@ -0,0 +1,70 @@
+# user_loader.py
+# Message and friendship endpoints for a user with many counterparts, with the user summary cache emptied
+# before each request and warm, plus the per-row User.query.get lookups the serializers used to do. The
+# SQL statement count of each request is printed next to its latency.
+#
+#   python benchmarks/user_loader.py [counterparts]
+
+import sys
+from datetime import datetime
+
+from sqlalchemy import event
+
+from common import make_app, measure, report
+
+from extensions import db
+from models import User, Friendship, MessagesInbox
+from user_loader import user_summary_cache
+
+
+def populate(counterparts):
+    now = datetime(2026, 1, 1)
+    db.session.execute(User.__table__.insert(), [{
+        'id': user_id, 'username': f'user{user_id}', 'email': f'user{user_id}@example.com', 'eco_points': 0}
+        for user_id in range(1, counterparts + 2)])
+    db.session.execute(Friendship.__table__.insert(), [{
+        'user_id': 1, 'friend_id': friend_id, 'status': 'accepted', 'created_at': now, 'updated_at': now}
+        for friend_id in range(2, counterparts + 2)])
+    db.session.execute(MessagesInbox.__table__.insert(), [{
+        'user_id': user_id, 'sender_id': sender_id, 'content': 'Refill at noon?', 'timestamp': now, 'is_read': False}
+        for other in range(2, counterparts + 2) for user_id, sender_id in ((1, other), (other, 1))])
+    db.session.commit()
+
+
+def main():
+    counterparts = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    app = make_app()
+    client = app.test_client()
+    with app.app_context():
+        populate(counterparts)
+        engine = db.engine
+
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(1))
+
+    def statements_per_call(function):
+        statements.clear()
+        function()
+        return len(statements)
+
+    for path in ('/get_friendships/1', '/sent_messages/1', '/received_messages/1'):
+        def cold():
+            user_summary_cache.invalidate_all()
+            client.get(path)
+
+        report(f'GET {path} cold ({statements_per_call(cold)} statements)', measure(cold, 100))
+        report(f'GET {path} warm ({statements_per_call(lambda: client.get(path))} statements)',
+               measure(lambda: client.get(path), 100))
+
+    def per_row_lookups():
+        # What /received_messages did before the loader: one query per message sender
+        with app.app_context():
+            messages = MessagesInbox.query.filter_by(user_id=1).all()
+            return [User.query.get(message.sender_id).username for message in messages]
+
+    report(f'per-row User.query.get ({statements_per_call(per_row_lookups)} statements)',
+           measure(per_row_lookups, 20))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,139 @@
+# caching.py
+
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Small thread-safe in-process cache whose entries expire after `ttl` seconds.
+
+    Keys are tuples whose first element is a namespace (e.g. a challenge id), so every entry for that
+    namespace can be dropped at once with invalidate()."""
+
+    def __init__(self, ttl, max_entries=1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._evict_expired()
+                if len(self._entries) >= self.max_entries:
+                    # Still full: drop the entry closest to expiry
+                    del self._entries[min(self._entries, key=lambda k: self._entries[k][0])]
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+
+    def invalidate(self, namespace):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == namespace]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _evict_expired(self):
+        now = time.monotonic()
+        for key in [key for key, (expires_at, _) in self._entries.items() if expires_at < now]:
+            del self._entries[key]
+
+
+class LRUCache:
+    """Bounded, thread-safe LRU cache with version-based invalidation and hit-rate statistics.
+
+    invalidate() bumps the version of a key (invalidate_all() of every key). A value loaded through
+    get_or_load() is only stored if no invalidation happened while it was being loaded, so a slow read can
+    never put a stale row back into the cache. max_age bounds how long an entry may be served, which limits
+    staleness between processes that cannot see each other's invalidations."""
+
+    def __init__(self, max_size, max_age=None):
+        self.max_size = max_size
+        self.max_age = max_age
+        self._entries = OrderedDict()
+        self._versions = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = self.misses = self.evictions = 0
+
+    def _version(self, key):
+        return self._generation, self._versions.get(key, 0)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                version, stored_at, value = entry
+                if version == self._version(key) and (self.max_age is None or
+                                                      time.monotonic() - stored_at < self.max_age):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return None
+
+    def current_version(self, key):
+        with self._lock:
+            return self._version(key)
+
+    def set(self, key, value, version=None):
+        with self._lock:
+            if version is not None and version != self._version(key):
+                return  # Invalidated while the value was being loaded
+            self._entries[key] = (self._version(key), time.monotonic(), value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_load(self, key, loader):
+        value = self.get(key)
+        if value is None:
+            version = self.current_version(key)
+            value = loader(key)
+            if value is not None:
+                self.set(key, value, version)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.pop(key, None)
+
+    def invalidate_all(self):
+        with self._lock:
+            self._generation += 1
+            self._versions.clear()
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+
+# Per community challenge participant ordering behind the ranking pages, invalidated whenever
+# log_water_usage touches that challenge. Orderings of large challenges take ~10 MB per 100k participants,
+# so only a few challenges are kept
+community_ranking_cache = TTLCache(ttl=30, max_entries=32)
@@ -1,19 +1,27 @@
+import logging
 import os
 from celery import Celery
 from celery.schedules import crontab
 from datetime import datetime, timezone
 from flask import Flask
 from dotenv import load_dotenv
+from archiving import archive_cold_rows
 from extensions import db
+from logging_config import configure_logging
+from metrics import track_celery_tasks
 from models import Challenge, PersonalChallengeParticipant, CommunityChallengeParticipant
 
 # Load environment variables
 load_dotenv()
 
+configure_logging()
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
 app.config.update(
     broker_url=os.getenv('CELERY_BROKER_URL', 'redis://localhost:6379/0'),
     result_backend=os.getenv('CELERY_RESULT_BACKEND', 'redis://localhost:6379/0'),
+    worker_hijack_root_logger=False,  # keep the handlers installed by configure_logging
     SQLALCHEMY_DATABASE_URI=os.getenv('DATABASE_URI'),
     SQLALCHEMY_TRACK_MODIFICATIONS=False,
 )
@@ -41,12 +49,13 @@ def make_celery(app):
 
 
 celery = make_celery(app)
+track_celery_tasks()
 
 
 @celery.task
 def complete_challenges_automatically():
     now = datetime.now(timezone.utc)
-    print("Running automatic challenge completion...")
+    logger.info("Running automatic challenge completion...")
 
     # Complete personal challenges
     personal_challenges = PersonalChallengeParticipant.query.filter(
@@ -68,7 +77,15 @@ def complete_challenges_automatically():
         participant.status = "completed"
 
     db.session.commit()
-    print("Challenges updated successfully.")
+    logger.info("Challenges updated successfully.")
+
+
+@celery.task
+def archive_cold_rows_task():
+    logger.info("Archiving cold notification and inbox rows...")
+    moved = archive_cold_rows()
+    logger.info("Archiving finished: %s", moved)
+    return moved
 
 
 celery.conf.beat_schedule = {
@@ -76,6 +93,10 @@ celery.conf.beat_schedule = {
         'task': 'celery_config.complete_challenges_automatically',
         'schedule': crontab(hour=0, minute=0),  # Executes daily at midnight
     },
+    'archive-cold-rows-every-night': {
+        'task': 'celery_config.archive_cold_rows_task',
+        'schedule': crontab(hour=3, minute=0),  # Executes daily at 3am, away from peak traffic
+    },
 }
 
 if __name__ == '__main__':
@@ -0,0 +1,101 @@
+# challenge_cache.py
+# Read-through cache for Challenge and CommunityChallenge rows. Rows are cached as immutable snapshots
+# (not ORM instances) so they can be shared safely between requests and sessions. Every route that
+# changes a challenge must call the matching invalidate_* function after committing.
+
+import os
+from collections import namedtuple
+
+from caching import LRUCache
+from extensions import primary_reads
+from models import Challenge, CommunityChallenge
+
+ChallengeSnapshot = namedtuple('ChallengeSnapshot', 'id name description eco_points start_date end_date')
+CommunityChallengeSnapshot = namedtuple('CommunityChallengeSnapshot', 'id challenge_id created_by')
+
+challenge_cache = LRUCache(max_size=int(os.getenv('CHALLENGE_CACHE_SIZE', 2048)), max_age=300)
+community_challenge_cache = LRUCache(max_size=int(os.getenv('CHALLENGE_CACHE_SIZE', 2048)), max_age=300)
+
+
+def _challenge_snapshot(challenge):
+    return ChallengeSnapshot(challenge.id, challenge.name, challenge.description, challenge.eco_points,
+                             challenge.start_date, challenge.end_date)
+
+
+def _community_challenge_snapshot(community_challenge):
+    return CommunityChallengeSnapshot(community_challenge.id, community_challenge.challenge_id,
+                                      community_challenge.created_by)
+
+
+def _load_challenge(challenge_id):
+    # Shared cache entries are always filled from the primary, so replica lag cannot re-cache a stale row
+    with primary_reads():
+        challenge = Challenge.query.get(challenge_id)
+    return _challenge_snapshot(challenge) if challenge else None
+
+
+def _load_community_challenge(community_challenge_id):
+    with primary_reads():
+        community_challenge = CommunityChallenge.query.get(community_challenge_id)
+    return _community_challenge_snapshot(community_challenge) if community_challenge else None
+
+
+def _get_many(cache, model, snapshot, ids):
+    """Returns {id: snapshot} for the ids that exist, loading all cache misses with one IN query."""
+    found, missing = {}, []
+    for key in {int(key) for key in ids if key is not None}:
+        value = cache.get(key)
+        if value is None:
+            missing.append(key)
+        else:
+            found[key] = value
+
+    if missing:
+        versions = {key: cache.current_version(key) for key in missing}
+        with primary_reads():
+            rows = model.query.filter(model.id.in_(missing)).all()
+        for row in rows:
+            found[row.id] = snapshot(row)
+            cache.set(row.id, found[row.id], versions[row.id])
+    return found
+
+
+def get_challenge(challenge_id):
+    if challenge_id is None:
+        return None
+    return challenge_cache.get_or_load(int(challenge_id), _load_challenge)
+
+
+def get_challenges(challenge_ids):
+    return _get_many(challenge_cache, Challenge, _challenge_snapshot, challenge_ids)
+
+
+def get_community_challenge(community_challenge_id):
+    if community_challenge_id is None:
+        return None
+    return community_challenge_cache.get_or_load(int(community_challenge_id), _load_community_challenge)
+
+
+def get_community_challenges(community_challenge_ids):
+    return _get_many(community_challenge_cache, CommunityChallenge, _community_challenge_snapshot,
+                     community_challenge_ids)
+
+
+def invalidate_challenge(challenge_id):
+    challenge_cache.invalidate(int(challenge_id))
+
+
+def invalidate_community_challenge(community_challenge_id):
+    community_challenge_cache.invalidate(int(community_challenge_id))
+
+
+def invalidate_all_challenges():
+    challenge_cache.invalidate_all()
+    community_challenge_cache.invalidate_all()
+
+
+def cache_stats():
+    return {
+        "challenges": challenge_cache.stats(),
+        "community_challenges": community_challenge_cache.stats(),
+    }
@@ -0,0 +1,177 @@
+# events.py
+# Per-user push events for new messages, challenge invites and notifications, streamed to clients by
+# GET /events/<user_id> (views/event_views.py, or natively by asgi.py) so they no longer have to poll.
+#
+#   EVENT_BUS        'memory' (default): events reach the clients connected to this process only
+#                    'redis': events are published on Redis and every process fans them out to its own clients
+#   EVENT_REDIS_URL  Redis used by the 'redis' bus, defaults to REDIS_URL
+#
+# Events are raised by mapper hooks on MessagesInbox, ChallengesInbox and Notification, so every route that
+# inserts one of them publishes without any extra code, and are only published once the transaction commits.
+
+import json
+import logging
+import os
+import threading
+import time
+from itertools import count
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, object_session
+
+from models import MessagesInbox, ChallengesInbox, Notification
+
+logger = logging.getLogger(__name__)
+
+REDIS_CHANNEL_PREFIX = 'greenwave:events:'
+PENDING_EVENTS_KEY = 'pending_events'
+
+
+class EventBus:
+    """Delivers events to the callbacks subscribed for a user in this process. Callbacks run on the
+    publishing thread and must not block (stream handlers just enqueue the event)."""
+
+    def __init__(self):
+        self._subscribers = {}  # user id -> {token: callback}
+        self._tokens = count()
+        self._lock = threading.Lock()
+
+    def subscribe(self, user_id, callback):
+        token = next(self._tokens)
+        with self._lock:
+            self._subscribers.setdefault(user_id, {})[token] = callback
+        return token
+
+    def unsubscribe(self, user_id, token):
+        with self._lock:
+            callbacks = self._subscribers.get(user_id, {})
+            callbacks.pop(token, None)
+            if not callbacks:
+                self._subscribers.pop(user_id, None)
+
+    def subscriber_count(self):
+        with self._lock:
+            return sum(len(callbacks) for callbacks in self._subscribers.values())
+
+    def publish(self, user_id, event_data):
+        self.deliver(user_id, event_data)
+
+    def deliver(self, user_id, event_data):
+        with self._lock:
+            callbacks = list(self._subscribers.get(user_id, {}).values())
+        for callback in callbacks:
+            try:
+                callback(event_data)
+            except Exception:
+                # A full queue means the client is too slow; it misses the event rather than blocking others
+                logger.debug("Dropped event for user %s", user_id, exc_info=True)
+
+
+class RedisEventBus(EventBus):
+    """Publishes through Redis pub/sub. Each process keeps a single pattern subscription, started with the
+    first local subscriber, and fans incoming events out to its own connections."""
+
+    def __init__(self, client):
+        super().__init__()
+        self.client = client
+        self._listener = None
+
+    def subscribe(self, user_id, callback):
+        self._start_listener()
+        return super().subscribe(user_id, callback)
+
+    def publish(self, user_id, event_data):
+        try:
+            self.client.publish(f'{REDIS_CHANNEL_PREFIX}{user_id}', json.dumps(event_data))
+        except Exception as error:
+            logger.warning("Could not publish event for user %s: %s", user_id, error)
+
+    def _start_listener(self):
+        with self._lock:
+            if self._listener is None or not self._listener.is_alive():
+                self._listener = threading.Thread(target=self._listen, name='event-bus', daemon=True)
+                self._listener.start()
+
+    def _listen(self):
+        while True:
+            try:
+                pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.psubscribe(f'{REDIS_CHANNEL_PREFIX}*')
+                for message in pubsub.listen():
+                    channel = message['channel']
+                    channel = channel.decode() if isinstance(channel, bytes) else channel
+                    self.deliver(int(channel[len(REDIS_CHANNEL_PREFIX):]), json.loads(message['data']))
+            except Exception as error:
+                logger.warning("Event bus subscription lost, reconnecting: %s", error)
+                time.sleep(1)
+
+
+def _create_event_bus():
+    if os.getenv('EVENT_BUS', 'memory') == 'redis':
+        import redis
+        url = os.getenv('EVENT_REDIS_URL') or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        return RedisEventBus(redis.Redis.from_url(url))
+    workers = int(os.getenv('WEB_CONCURRENCY', 1))
+    if workers > 1:
+        logger.warning("EVENT_BUS=memory only delivers events to clients connected to the worker that made the "
+                       "change, so with %d workers most events are missed; set EVENT_BUS=redis", workers)
+    return EventBus()
+
+
+event_bus = _create_event_bus()
+
+
+def format_sse(event_data):
+    return f"event: {event_data['type']}\ndata: {json.dumps(event_data['data'])}\n\n"
+
+
+def publish_after_commit(session, user_id, event_type, data):
+    """Queues an event on the session; it is published only if the current transaction commits."""
+    session.info.setdefault(PENDING_EVENTS_KEY, []).append((user_id, {'type': event_type, 'data': data}))
+
+
+@event.listens_for(Session, 'after_commit')
+def _publish_pending_events(session):
+    for user_id, event_data in session.info.pop(PENDING_EVENTS_KEY, []):
+        event_bus.publish(user_id, event_data)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_pending_events(session):
+    session.info.pop(PENDING_EVENTS_KEY, None)
+
+
+def _timestamp(value):
+    return value.isoformat() if value else None
+
+
+@event.listens_for(MessagesInbox, 'after_insert')
+def _message_created(mapper, connection, message):
+    publish_after_commit(object_session(message), message.user_id, 'message', {
+        'id': message.id,
+        'sender_id': message.sender_id,
+        'content': message.content,
+        'timestamp': _timestamp(message.timestamp)
+    })
+
+
+@event.listens_for(ChallengesInbox, 'after_insert')
+def _challenge_invite_created(mapper, connection, invite):
+    publish_after_commit(object_session(invite), invite.user_id, 'challenge_invite', {
+        'id': invite.id,
+        'sender_id': invite.sender_id,
+        'challenge_id': invite.challenge_id,
+        'community_challenge_id': invite.community_challenge_id,
+        'status': invite.status,
+        'timestamp': _timestamp(invite.timestamp)
+    })
+
+
+@event.listens_for(Notification, 'after_insert')
+def _notification_created(mapper, connection, notification):
+    publish_after_commit(object_session(notification), notification.user_id, 'notification', {
+        'id': notification.id,
+        'content': notification.content,
+        'is_read': notification.is_read,
+        'timestamp': _timestamp(notification.timestamp)
+    })
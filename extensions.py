@@ -1,5 +1,90 @@
 # extensions.py
 
+import os
+import random
+import time
+from contextlib import contextmanager
+
+from flask import g, request, has_app_context
 from flask_sqlalchemy import SQLAlchemy
+from flask_sqlalchemy.session import Session
+from sqlalchemy.sql.dml import UpdateBase
+
+# Read replicas are configured as SQLALCHEMY_BINDS named replica_0, replica_1, ... (see replica_binds)
+REPLICA_BIND_PREFIX = 'replica_'
+
+# After a write, the client's reads go to the primary for this many seconds so it sees its own changes
+# despite replication lag. Writes answer with the end of the window in STICKY_HEADER and the client sends
+# it back on its next requests (a header rather than a cookie, since the frontend calls the API cross-origin
+# without credentials), so the window follows the client across workers.
+STICKY_HEADER = 'X-DB-Primary-Until'
+STICKY_SECONDS = float(os.getenv('DATABASE_REPLICA_STICKY_SECONDS', 5))
+
+READ_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def replica_binds(replica_uris):
+    """SQLALCHEMY_BINDS entries for a comma-separated list of replica URIs (e.g. DATABASE_REPLICA_URIS)."""
+    uris = [uri.strip() for uri in (replica_uris or '').split(',') if uri.strip()]
+    return {f'{REPLICA_BIND_PREFIX}{index}': uri for index, uri in enumerate(uris)}
+
+
+def _reads_from_replica():
+    return has_app_context() and g.get('db_read_replica', False)
+
+
+class RoutingSession(Session):
+    """Sends the statements of read-only requests to a read replica and everything else to the primary.
+
+    Models keep their default bind, so db.create_all(), migrations, Celery tasks and CLI commands only
+    ever see the primary. Flushes and INSERT/UPDATE/DELETE statements always go to the primary, even
+    inside a request that was routed to a replica.
+    """
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not isinstance(clause, UpdateBase) and _reads_from_replica():
+            replicas = [key for key in self._db.engines if key and key.startswith(REPLICA_BIND_PREFIX)]
+            if replicas:
+                return self._db.engines[random.choice(replicas)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+
+@contextmanager
+def primary_reads():
+    """Reads inside this block go to the primary, e.g. to fill a shared cache right after an invalidation."""
+    routed = _reads_from_replica()
+    if routed:
+        g.db_read_replica = False
+    try:
+        yield
+    finally:
+        if routed:
+            g.db_read_replica = True
+
+
+def init_read_routing(app):
+    """Routes GET requests to the read replicas, unless the client echoes a STICKY_HEADER window that
+    has not ended yet. Does nothing when no replica binds are configured."""
+
+    @app.before_request
+    def choose_database():
+        if request.method not in READ_METHODS or not app.config.get('SQLALCHEMY_BINDS'):
+            return
+        try:
+            sticky_until = float(request.headers.get(STICKY_HEADER, 0))
+        except ValueError:
+            sticky_until = 0
+        now = time.time()
+        # A window longer than STICKY_SECONDS was not issued by us, so it cannot pin a client to the primary
+        # (one second of slack covers clock differences between the workers)
+        g.db_read_replica = not now <= sticky_until <= now + STICKY_SECONDS + 1
 
-db = SQLAlchemy()
+    @app.after_request
+    def mark_sticky(response):
+        if request.method not in READ_METHODS and response.status_code < 400 \
+                and app.config.get('SQLALCHEMY_BINDS'):
+            response.headers[STICKY_HEADER] = f'{time.time() + STICKY_SECONDS:.3f}'
+        return response
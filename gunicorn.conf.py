@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+# Loaded automatically by gunicorn from the working directory (see Procfile).
+
+import os
+import shutil
+import tempfile
+
+# /metrics must add up the samples of every worker, which prometheus_client only does when this is set
+# before a worker imports it. The workers inherit the environment of the master that reads this file.
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'greenwave-prometheus'))
+
+
+def on_starting(server):
+    # Start every deploy with an empty Prometheus multiprocess directory
+    directory = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+
+def child_exit(server, worker):
+    # Let /metrics drop the live gauges of workers that have exited
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,156 @@
+# logging_config.py
+# Logging setup shared by the web app and the Celery worker.
+#
+#   LOG_LEVEL    root level, INFO on Heroku and DEBUG locally by default. Calls below it return before a
+#                record is even created, so DEBUG logging costs nothing in production
+#   LOG_MODE     'queue' (default on Heroku): the request thread only enqueues records, formatting and I/O
+#                happen on a QueueListener thread. 'sync' (default locally): plain synchronous handler
+#   LOG_FORMAT   'json' (default on Heroku) or 'text'
+#   LOG_SAMPLE_<LEVEL>  fraction of records kept per level, e.g. LOG_SAMPLE_DEBUG=0.01, default 1
+
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import uuid
+from logging.handlers import QueueHandler, QueueListener
+
+from flask import g, request, has_request_context
+
+REQUEST_ID_HEADER = 'X-Request-ID'
+TEXT_FORMAT = '%(asctime)s %(levelname)s [%(request_id)s %(route)s]: %(message)s'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+QUEUE_SIZE = 10000
+
+# (request id, route) of the request being handled by an asgi.py handler, which runs outside Flask
+async_request_context = contextvars.ContextVar('async_request_context', default=None)
+
+
+class RequestContextFilter(logging.Filter):
+    """Stamps each record with the current request id and route (or '-' outside a request)."""
+
+    def filter(self, record):
+        if has_request_context():
+            record.request_id = g.get('request_id', '-')
+            record.route = request.url_rule.rule if request.url_rule else request.path
+        else:
+            record.request_id, record.route = async_request_context.get() or ('-', '-')
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of the records of each level."""
+
+    def __init__(self, rates):
+        super().__init__()
+        self.rates = rates
+
+    def filter(self, record):
+        rate = self.rates.get(record.levelno, 1.0)
+        return rate >= 1.0 or random.random() < rate
+
+
+class JSONFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            'timestamp': self.formatTime(record, DATE_FORMAT),
+            'level': record.levelname,
+            'logger': record.name,
+            'message': record.getMessage(),
+            'request_id': getattr(record, 'request_id', '-'),
+            'route': getattr(record, 'route', '-'),
+        }
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+
+class DeferredQueueHandler(QueueHandler):
+    """QueueHandler for an in-process queue. The stock handler formats the message in the calling thread
+    so records can be pickled; nothing is pickled here, so formatting is left to the listener thread.
+    When the queue is full the record is dropped instead of blocking the request."""
+
+    dropped = 0
+
+    def prepare(self, record):
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DeferredQueueHandler.dropped += 1
+
+
+_listener = None
+
+
+def _sampling_rates():
+    rates = {}
+    for level_name in ('DEBUG', 'INFO', 'WARNING'):
+        value = os.getenv(f'LOG_SAMPLE_{level_name}')
+        if value is not None:
+            rates[logging.getLevelName(level_name)] = float(value)
+    return rates
+
+
+def _start_listener(handler, output_handler):
+    global _listener
+    handler.queue = queue.Queue(QUEUE_SIZE)
+    _listener = QueueListener(handler.queue, output_handler, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop_listener():
+    if _listener is not None:
+        _listener.stop()
+
+
+def configure_logging():
+    is_heroku = 'DYNO' in os.environ
+    level = os.getenv('LOG_LEVEL', 'INFO' if is_heroku else 'DEBUG').upper()
+    mode = os.getenv('LOG_MODE', 'queue' if is_heroku else 'sync')
+    log_format = os.getenv('LOG_FORMAT', 'json' if is_heroku else 'text')
+
+    output_handler = logging.StreamHandler(sys.stdout)
+    if log_format == 'json':
+        output_handler.setFormatter(JSONFormatter())
+    else:
+        output_handler.setFormatter(logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT))
+
+    if mode == 'queue':
+        handler = DeferredQueueHandler(None)
+        _start_listener(handler, output_handler)
+        atexit.register(_stop_listener)
+        # The listener thread does not survive a fork (Celery prefork pool), so each child starts its own
+        os.register_at_fork(after_in_child=lambda: _start_listener(handler, output_handler))
+    else:
+        handler = output_handler
+
+    handler.addFilter(SamplingFilter(_sampling_rates()))
+    handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in list(root.handlers):
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+
+def init_request_logging(app):
+    """Gives every request an id (taken from X-Request-ID when the client sends one) that is attached to
+    its log records and echoed back in the response."""
+
+    @app.before_request
+    def assign_request_id():
+        g.request_id = request.headers.get(REQUEST_ID_HEADER) or uuid.uuid4().hex
+
+    @app.after_request
+    def add_request_id_header(response):
+        if 'request_id' in g:
+            response.headers[REQUEST_ID_HEADER] = g.request_id
+        return response
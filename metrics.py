@@ -0,0 +1,132 @@
+# metrics.py
+# Prometheus metrics for the web app and the Celery worker. When PROMETHEUS_MULTIPROC_DIR is set (see
+# gunicorn.conf.py) every process writes its samples to memory-mapped files in that directory and /metrics
+# aggregates them, so counts and histograms are correct across all gunicorn workers.
+
+import contextvars
+import os
+import time
+
+from flask import g, request, has_request_context, Response
+from prometheus_client import Counter, Histogram, CollectorRegistry, REGISTRY, generate_latest, \
+    CONTENT_TYPE_LATEST, multiprocess
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+REQUEST_COUNT = Counter('greenwave_http_requests_total', 'HTTP requests handled',
+                        ['method', 'route', 'status'])
+REQUEST_LATENCY = Histogram('greenwave_http_request_duration_seconds', 'HTTP request latency',
+                            ['method', 'route'], buckets=LATENCY_BUCKETS)
+DB_STATEMENTS = Counter('greenwave_db_statements_total', 'SQL statements executed', ['route'])
+DB_TIME = Counter('greenwave_db_statement_seconds_total', 'Time spent executing SQL statements', ['route'])
+CELERY_TASK_DURATION = Histogram('greenwave_celery_task_duration_seconds', 'Celery task run time',
+                                 ['task', 'state'], buckets=LATENCY_BUCKETS + (30, 60, 300))
+
+# Label used for statements executed outside a request (Celery tasks, CLI commands)
+BACKGROUND_ROUTE = 'background'
+
+# [statements, seconds] of the request being handled by an asgi.py handler, which runs outside Flask
+_async_request_db = contextvars.ContextVar('async_request_db', default=None)
+
+
+def _route_label():
+    return request.url_rule.rule if request.url_rule else 'unmatched'
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_query_start'].pop()
+    if has_request_context() and 'metrics_db' in g:
+        # Summed per request and exported once in after_request to keep per-statement overhead low
+        g.metrics_db[0] += 1
+        g.metrics_db[1] += elapsed
+    elif _async_request_db.get() is not None:
+        usage = _async_request_db.get()
+        usage[0] += 1
+        usage[1] += elapsed
+    else:
+        DB_STATEMENTS.labels(BACKGROUND_ROUTE).inc()
+        DB_TIME.labels(BACKGROUND_ROUTE).inc(elapsed)
+
+
+@event.listens_for(Engine, 'handle_error')
+def _on_statement_error(exception_context):
+    # after_cursor_execute is not called for failed statements, so drop their start time here
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('metrics_query_start'):
+        connection.info['metrics_query_start'].pop()
+
+
+def _start_request_timer():
+    g.metrics_start = time.perf_counter()
+    g.metrics_db = [0, 0.0]
+
+
+def _record_request(response):
+    started = g.pop('metrics_start', None)
+    if started is None:
+        return response
+
+    route = _route_label()
+    REQUEST_LATENCY.labels(request.method, route).observe(time.perf_counter() - started)
+    REQUEST_COUNT.labels(request.method, route, str(response.status_code)).inc()
+    statements, db_time = g.pop('metrics_db', (0, 0.0))
+    if statements:
+        DB_STATEMENTS.labels(route).inc(statements)
+        DB_TIME.labels(route).inc(db_time)
+    return response
+
+
+def start_async_request():
+    """Starts the same measurements as the Flask hooks for a request served by asgi.py. Statements run by
+    the handler (including its asyncio.gather subtasks, which copy the context) are counted for it."""
+    _async_request_db.set([0, 0.0])
+    return time.perf_counter()
+
+
+def record_async_request(method, route, status, started):
+    REQUEST_LATENCY.labels(method, route).observe(time.perf_counter() - started)
+    REQUEST_COUNT.labels(method, route, str(status)).inc()
+    statements, db_time = _async_request_db.get() or (0, 0.0)
+    _async_request_db.set(None)
+    if statements:
+        DB_STATEMENTS.labels(route).inc(statements)
+        DB_TIME.labels(route).inc(db_time)
+
+
+def init_metrics(app):
+    app.before_request(_start_request_timer)
+    app.after_request(_record_request)
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        if 'PROMETHEUS_MULTIPROC_DIR' in os.environ:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
+
+
+def track_celery_tasks():
+    """Records the duration and final state of every Celery task run in this process."""
+    from celery.signals import task_prerun, task_postrun
+
+    started = {}
+
+    @task_prerun.connect(weak=False)
+    def _task_started(task_id=None, **kwargs):
+        started[task_id] = time.perf_counter()
+
+    @task_postrun.connect(weak=False)
+    def _task_finished(task_id=None, task=None, state=None, **kwargs):
+        start = started.pop(task_id, None)
+        if start is not None:
+            CELERY_TASK_DURATION.labels(task.name, state or 'UNKNOWN').observe(time.perf_counter() - start)
@@ -1,5 +1,7 @@
 # __init__.py
 
-from .challenge_models import EnvironmentalImpact, Challenge, PersonalChallengeParticipant, Badge, CommunityChallenge, CommunityChallengeParticipant
+from .challenge_models import EnvironmentalImpact, Challenge, PersonalChallengeParticipant, Badge, CommunityChallenge, CommunityChallengeParticipant, \
+    ImpactTotals, CommunityChallengeImpactTotals, IMPACT_TOTAL_FIELDS
 from .community_models import Post, Like, Comment, Friendship
 from .user_models import User, UserAction, Notification, UserPreference, MessagesInbox, ChallengesInbox
+from .archive_models import NotificationArchive, MessagesInboxArchive, ChallengesInboxArchive
@@ -0,0 +1,55 @@
+# archive_models.py
+# Cold copies of rows moved out of the hot tables by archiving.archive_cold_rows. Each archive table has
+# the columns of its hot table (ids are kept, so an archived row has the same id it always had) plus the
+# time it was archived. There are no foreign keys, so archiving never has to lock the parent tables.
+#
+# Kept ids rely on the hot table never handing out an archived row's id again once the table has been
+# emptied: the hot tables use AUTOINCREMENT on SQLite, and MySQL 8 persists its AUTO_INCREMENT counter
+# across restarts. On servers that do not (MySQL 5.7 resets it to MAX(id) + 1), archive_batch leaves rows
+# whose id is already archived in the hot table instead of failing the batch.
+
+from datetime import datetime, timezone
+
+from extensions import db
+
+
+class NotificationArchive(db.Model):
+    __tablename__ = 'notification_archive'
+    __table_args__ = (db.Index('ix_notification_archive_user_timestamp', 'user_id', 'timestamp'),)
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    is_read = db.Column(db.Boolean, default=False)
+    timestamp = db.Column(db.DateTime)
+    archived_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class MessagesInboxArchive(db.Model):
+    __tablename__ = 'messages_inbox_archive'
+    __table_args__ = (
+        db.Index('ix_messages_inbox_archive_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_messages_inbox_archive_sender_id', 'sender_id'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    sender_id = db.Column(db.Integer, nullable=False)
+    content = db.Column(db.Text, nullable=False)
+    timestamp = db.Column(db.DateTime)
+    is_read = db.Column(db.Boolean, default=False)
+    archived_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+
+class ChallengesInboxArchive(db.Model):
+    __tablename__ = 'challenges_inbox_archive'
+    __table_args__ = (
+        db.Index('ix_challenges_inbox_archive_user_status', 'user_id', 'status'),
+        db.Index('ix_challenges_inbox_archive_sender_status', 'sender_id', 'status'),
+    )
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    user_id = db.Column(db.Integer, nullable=False)
+    sender_id = db.Column(db.Integer, nullable=False)
+    challenge_id = db.Column(db.Integer, nullable=True)
+    community_challenge_id = db.Column(db.Integer, nullable=True)
+    timestamp = db.Column(db.DateTime)
+    status = db.Column(db.String(20))
+    archived_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
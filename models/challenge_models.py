@@ -6,6 +6,10 @@ from extensions import db
 
 
 class EnvironmentalImpact(db.Model):
+    __table_args__ = (
+        db.Index('ix_environmental_impact_user_personal_challenge', 'user_id', 'personal_challenge_id'),
+        db.Index('ix_environmental_impact_user_community_challenge', 'user_id', 'community_challenge_id'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     recycled_bottles = db.Column(db.Integer, default=0)
@@ -34,6 +38,9 @@ class Challenge(db.Model):
 
 
 class PersonalChallengeParticipant(db.Model):
+    __table_args__ = (
+        db.Index('ix_personal_challenge_participant_user_challenge_end', 'user_id', 'challenge_id', 'end_date'),
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=False)
@@ -87,3 +94,33 @@ class CommunityChallengeParticipant(db.Model):
     community_challenge = db.relationship('CommunityChallenge', back_populates='participants',
                                           overlaps="community_participations,community_challenges")
 
+
+# Impact columns tracked by the aggregate counter tables below
+IMPACT_TOTAL_FIELDS = ('impact_score', 'water_saved', 'plastic_waste_reduced', 'co2_emissions_prevented',
+                       'money_saved', 'recycled_bottles', 'single_use_bottles', 'refillable_bottles')
+
+
+class ImpactTotals(db.Model):
+    # Single row (id=1) holding the community-wide sums of EnvironmentalImpact, updated incrementally
+    id = db.Column(db.Integer, primary_key=True)
+    impact_score = db.Column(db.Float, nullable=False, default=0)
+    water_saved = db.Column(db.Float, nullable=False, default=0)
+    plastic_waste_reduced = db.Column(db.Float, nullable=False, default=0)
+    co2_emissions_prevented = db.Column(db.Float, nullable=False, default=0)
+    money_saved = db.Column(db.Float, nullable=False, default=0)
+    recycled_bottles = db.Column(db.Integer, nullable=False, default=0)
+    single_use_bottles = db.Column(db.Integer, nullable=False, default=0)
+    refillable_bottles = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CommunityChallengeImpactTotals(db.Model):
+    # Per community challenge sums of EnvironmentalImpact, updated incrementally
+    community_challenge_id = db.Column(db.Integer, db.ForeignKey('community_challenge.id'), primary_key=True)
+    impact_score = db.Column(db.Float, nullable=False, default=0)
+    water_saved = db.Column(db.Float, nullable=False, default=0)
+    plastic_waste_reduced = db.Column(db.Float, nullable=False, default=0)
+    co2_emissions_prevented = db.Column(db.Float, nullable=False, default=0)
+    money_saved = db.Column(db.Float, nullable=False, default=0)
+    recycled_bottles = db.Column(db.Integer, nullable=False, default=0)
+    single_use_bottles = db.Column(db.Integer, nullable=False, default=0)
+    refillable_bottles = db.Column(db.Integer, nullable=False, default=0)
@@ -8,6 +8,7 @@ from extensions import db
 
 
 class Post(db.Model):
+    __table_args__ = (db.Index('ix_post_user_created_at', 'user_id', 'created_at'),)
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id', ondelete='CASCADE'), nullable=False)
     content = db.Column(db.Text, nullable=False)
@@ -34,11 +34,13 @@ class UserAction(db.Model):
 
 
 class Notification(db.Model):
+    # AUTOINCREMENT: ids of archived rows are never handed out again on SQLite (see archive_models.py)
+    __table_args__ = (db.Index('ix_notification_user_is_read', 'user_id', 'is_read'), {'sqlite_autoincrement': True})
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
     is_read = db.Column(db.Boolean, default=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
 
     user = db.relationship('User', backref=db.backref('notifications', lazy='dynamic'))
 
@@ -53,11 +55,16 @@ class UserPreference(db.Model):
 
 
 class MessagesInbox(db.Model):
+    __table_args__ = (
+        db.Index('ix_messages_inbox_sender_id', 'sender_id'),
+        db.Index('ix_messages_inbox_user_timestamp', 'user_id', 'timestamp'),
+        {'sqlite_autoincrement': True},
+    )
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     content = db.Column(db.Text, nullable=False)
-    timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     is_read = db.Column(db.Boolean, default=False)
 
     user = db.relationship('User', backref='received_messages', foreign_keys=[user_id])
@@ -65,12 +72,15 @@ class MessagesInbox(db.Model):
 
 
 class ChallengesInbox(db.Model):
+    __table_args__ = (db.Index('ix_challenges_inbox_user_status', 'user_id', 'status'),
+                      db.Index('ix_challenges_inbox_sender_status', 'sender_id', 'status'),
+                      {'sqlite_autoincrement': True})
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     sender_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     challenge_id = db.Column(db.Integer, db.ForeignKey('challenge.id'), nullable=True)  # Allow null values
     community_challenge_id = db.Column(db.Integer, db.ForeignKey('community_challenge.id'), nullable=True)
-    timestamp = db.Column(db.DateTime, default=datetime.now(timezone.utc))
+    timestamp = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc))
     status = db.Column(db.String(20), default='pending')  # e.g., 'pending', 'accepted', 'rejected'
 
     user = db.relationship('User', backref='received_challenges', foreign_keys=[user_id])
@@ -0,0 +1,148 @@
+# profiling.py
+# Opt-in per-route profiling. Nothing is registered unless PROFILE_TOKEN is set, so the hooks cost nothing
+# when profiling is disabled.
+#
+#   PROFILE_ROUTES=1            profile a random sample of all requests, needs PROFILE_TOKEN to read the results
+#   PROFILE_SAMPLE_RATE=0.01    fraction of requests sampled when PROFILE_ROUTES is on
+#   PROFILE_TOKEN=<secret>      requests sending "X-Profile-Token: <secret>" are always profiled, and the
+#                               token is required by GET /admin/profiles
+#   PROFILE_DIR=profiles        where .prof (cProfile) and .alloc.txt (tracemalloc) files are written
+#   PROFILE_MAX_FILES=20        profiles kept per route, older ones are deleted
+#   PROFILE_ALLOCATIONS=1       also trace allocations with tracemalloc
+
+import cProfile
+import hmac
+import logging
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+
+from flask import g, request, jsonify
+
+logger = logging.getLogger(__name__)
+
+PROFILE_TOKEN_HEADER = 'X-Profile-Token'
+
+
+class RouteProfiler:
+    def __init__(self, directory, sample_rate, token, max_files, trace_allocations):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.token = token
+        self.max_files = max_files
+        self.trace_allocations = trace_allocations
+        self.route_stats = {}
+        # cProfile and tracemalloc are process wide, so only one request is profiled at a time
+        self._profiling_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+    def is_authorized(self):
+        supplied = request.headers.get(PROFILE_TOKEN_HEADER)
+        return bool(self.token and supplied and hmac.compare_digest(supplied, self.token))
+
+    def _should_profile(self):
+        if self.sample_rate and random.random() < self.sample_rate:
+            return True
+        return self.token is not None and PROFILE_TOKEN_HEADER in request.headers and self.is_authorized()
+
+    def start(self):
+        if not self._should_profile() or not self._profiling_lock.acquire(blocking=False):
+            return
+
+        if self.trace_allocations:
+            tracemalloc.start()
+        profile = cProfile.Profile()
+        g._route_profile = (profile, time.perf_counter())
+        profile.enable()
+
+    def stop(self, exception=None):
+        state = g.pop('_route_profile', None)
+        if state is None:
+            return
+
+        profile, started = state
+        profile.disable()
+        elapsed = time.perf_counter() - started
+        allocation_peak, top_allocations = 0, []
+        try:
+            if self.trace_allocations:
+                _, allocation_peak = tracemalloc.get_traced_memory()
+                top_allocations = tracemalloc.take_snapshot().statistics('lineno')[:25]
+                tracemalloc.stop()
+        finally:
+            self._profiling_lock.release()
+
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        self._record(route, elapsed, allocation_peak)
+        self._write(route, profile, top_allocations)
+
+    def _record(self, route, elapsed, allocation_peak):
+        with self._stats_lock:
+            stats = self.route_stats.setdefault(route, {
+                "route": route, "samples": 0, "cumulative_time": 0.0, "max_time": 0.0, "allocated_bytes": 0})
+            stats["samples"] += 1
+            stats["cumulative_time"] += elapsed
+            stats["max_time"] = max(stats["max_time"], elapsed)
+            stats["allocated_bytes"] += allocation_peak
+
+    def _write(self, route, profile, top_allocations):
+        route_directory = os.path.join(self.directory, re.sub(r'[^A-Za-z0-9_.-]+', '_', route).strip('_') or 'root')
+        os.makedirs(route_directory, exist_ok=True)
+        name = str(time.time_ns())
+        profile.dump_stats(os.path.join(route_directory, f"{name}.prof"))
+        if top_allocations:
+            with open(os.path.join(route_directory, f"{name}.alloc.txt"), 'w') as file:
+                file.write('\n'.join(str(statistic) for statistic in top_allocations))
+
+        # Rotate: keep only the newest max_files profiles for this route
+        profiles = sorted(file for file in os.listdir(route_directory) if file.endswith('.prof'))
+        for old in profiles[:-self.max_files]:
+            for path in (old, old.replace('.prof', '.alloc.txt')):
+                try:
+                    os.remove(os.path.join(route_directory, path))
+                except FileNotFoundError:
+                    pass
+
+    def top_routes(self, limit=10):
+        with self._stats_lock:
+            stats = [dict(entry, mean_time=entry["cumulative_time"] / entry["samples"])
+                     for entry in self.route_stats.values()]
+        return {
+            "by_cumulative_time": sorted(stats, key=lambda entry: entry["cumulative_time"], reverse=True)[:limit],
+            "by_allocations": sorted(stats, key=lambda entry: entry["allocated_bytes"], reverse=True)[:limit],
+        }
+
+
+def init_profiling(app):
+    enabled = os.getenv('PROFILE_ROUTES') == '1'
+    token = os.getenv('PROFILE_TOKEN') or None
+    if enabled and not token:
+        # /admin/profiles answers 403 without a token, so the samples could never be read
+        logger.warning("PROFILE_ROUTES=1 is ignored because PROFILE_TOKEN is not set; set both to profile routes")
+        return None
+    if not enabled and not token:
+        return None
+
+    profiler = RouteProfiler(
+        directory=os.getenv('PROFILE_DIR', 'profiles'),
+        sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', 0.01)) if enabled else 0,
+        token=token,
+        max_files=int(os.getenv('PROFILE_MAX_FILES', 20)),
+        trace_allocations=os.getenv('PROFILE_ALLOCATIONS', '1') == '1',
+    )
+    app.before_request(profiler.start)
+    app.teardown_request(profiler.stop)
+
+    @app.route('/admin/profiles', methods=['GET'])
+    def get_route_profiles():
+        if not profiler.is_authorized():
+            return jsonify({"error": "Unauthorized"}), 403
+
+        limit = request.args.get('limit', 10, type=int)
+        return jsonify(profiler.top_routes(limit)), 200
+
+    app.extensions['route_profiler'] = profiler
+    return profiler
@@ -0,0 +1,193 @@
+# rate_limiting.py
+# Token-bucket admission control for the write endpoints. Each limited route has a bucket per client and a
+# bucket shared by every caller, and a request is admitted only when both have a token. The check runs in
+# before_request, so rejected calls get their 429 before any database work.
+#
+#   RATE_LIMIT_BACKEND          'memory' (default, per process), 'redis' (shared by all workers) or 'off'
+#   RATE_LIMIT_REDIS_URL        Redis used by the 'redis' backend, defaults to REDIS_URL
+#   RATE_LIMIT_TRUSTED_PROXIES  proxies in front of the app that append to X-Forwarded-For (1 on Heroku, whose
+#                               router does, 0 elsewhere)
+#
+# Clients are told apart by address, not by the user id in the request: the app has no authentication, so
+# a user id is whatever the client chooses to send. The address is read that many hops from the right of
+# X-Forwarded-For, the part written by our own proxies, so a client cannot pick its bucket with the header.
+#
+# The memory backend keeps separate buckets in every process: under N gunicorn workers a client gets up to
+# N times the configured rates. Use the redis backend whenever more than one worker or dyno serves traffic.
+#
+# Buckets are stored as (tokens, last refill time) and refilled lazily when they are checked, so idle
+# buckets cost nothing and there is no background timer.
+
+import logging
+import math
+import os
+import threading
+import time
+
+from flask import request, jsonify
+
+logger = logging.getLogger(__name__)
+
+# endpoint -> (per-client rate per second, per-client burst, route-wide rate per second, route-wide burst)
+RATE_LIMITS = {
+    'log_water_usage': (1, 10, 200, 400),
+    'send_message': (1, 20, 200, 400),
+    'like_post': (2, 30, 400, 800),
+}
+
+RATE_LIMIT_TRUSTED_PROXIES = int(os.getenv('RATE_LIMIT_TRUSTED_PROXIES', 1 if 'DYNO' in os.environ else 0))
+
+# In-process buckets kept before full (idle) buckets are pruned
+MAX_BUCKETS = 100000
+
+
+class InProcessLimiter:
+    def __init__(self, max_buckets=MAX_BUCKETS):
+        self.max_buckets = max_buckets
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, limits):
+        """limits is a list of (key, rate, capacity). Takes one token from every bucket if all of them have
+        one and returns (True, 0); otherwise takes nothing and returns (False, seconds until admitted)."""
+        now = time.monotonic()
+        with self._lock:
+            levels = []
+            retry_after = 0.0
+            for key, rate, capacity in limits:
+                tokens, updated = self._buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - updated) * rate)
+                levels.append(tokens)
+                if tokens < 1:
+                    retry_after = max(retry_after, (1 - tokens) / rate)
+
+            allowed = retry_after == 0
+            for (key, _, _), tokens in zip(limits, levels):
+                self._buckets[key] = (tokens - 1 if allowed else tokens, now)
+
+            if len(self._buckets) > self.max_buckets:
+                self._prune(now)
+        return allowed, retry_after
+
+    def _prune(self, now):
+        # A bucket that has refilled completely behaves exactly like a missing one
+        for key, (tokens, updated) in list(self._buckets.items()):
+            rate, capacity = _bucket_limits(key)
+            if tokens + (now - updated) * rate >= capacity:
+                del self._buckets[key]
+
+        # Still full (many active callers): forget the earliest-created quarter, which only makes the limiter more
+        # lenient for them and keeps pruning from running on every request
+        if len(self._buckets) > self.max_buckets * 3 // 4:
+            for key in list(self._buckets)[:len(self._buckets) // 4]:
+                del self._buckets[key]
+
+
+# Same algorithm as InProcessLimiter.acquire, run atomically inside Redis. KEYS are the buckets and ARGV
+# holds a (rate, capacity) pair per key. Redis' own clock is used so all workers agree on the time.
+ACQUIRE_SCRIPT = """
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local levels = {}
+local retry_after = 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local state = redis.call('HMGET', key, 'tokens', 'updated')
+    local tokens = tonumber(state[1]) or capacity
+    local updated = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+    levels[i] = tokens
+    if tokens < 1 then
+        retry_after = math.max(retry_after, (1 - tokens) / rate)
+    end
+end
+local allowed = retry_after == 0
+for i, key in ipairs(KEYS) do
+    local rate = tonumber(ARGV[2 * i - 1])
+    local capacity = tonumber(ARGV[2 * i])
+    local tokens = levels[i]
+    if allowed then
+        tokens = tokens - 1
+    end
+    redis.call('HSET', key, 'tokens', tostring(tokens), 'updated', tostring(now))
+    redis.call('PEXPIRE', key, math.ceil(capacity / rate * 1000))
+end
+return {allowed and 1 or 0, tostring(retry_after)}
+"""
+
+
+class RedisLimiter:
+    """Token buckets shared by every worker. If Redis is unreachable requests are admitted (fail open),
+    so an outage of the limiter never takes the write endpoints down with it."""
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.prefix = prefix
+        self._script = client.register_script(ACQUIRE_SCRIPT)
+
+    def acquire(self, limits):
+        keys = [self.prefix + key for key, _, _ in limits]
+        args = [value for _, rate, capacity in limits for value in (rate, capacity)]
+        try:
+            allowed, retry_after = self._script(keys=keys, args=args)
+        except Exception as error:
+            logger.warning("Rate limiter unavailable, admitting request: %s", error)
+            return True, 0.0
+        return bool(allowed), float(retry_after)
+
+
+def _bucket_limits(key):
+    endpoint, scope = key.split(':', 2)[:2]
+    per_client_rate, per_client_burst, route_rate, route_burst = RATE_LIMITS[endpoint]
+    if scope == 'route':
+        return route_rate, route_burst
+    return per_client_rate, per_client_burst
+
+
+def _client_address():
+    """The address of the client, as seen by the outermost of our trusted proxies."""
+    if RATE_LIMIT_TRUSTED_PROXIES:
+        forwarded = [address.strip() for address in request.headers.get('X-Forwarded-For', '').split(',')]
+        forwarded = [address for address in forwarded if address]
+        if len(forwarded) >= RATE_LIMIT_TRUSTED_PROXIES:
+            return forwarded[-RATE_LIMIT_TRUSTED_PROXIES]
+    return request.remote_addr or 'unknown'
+
+
+def _create_limiter():
+    backend = os.getenv('RATE_LIMIT_BACKEND', 'memory')
+    if backend == 'off':
+        return None
+    workers = int(os.getenv('WEB_CONCURRENCY', 1))
+    if backend == 'memory' and workers > 1:
+        logger.warning("RATE_LIMIT_BACKEND=memory keeps separate buckets in each of the %d workers, so clients "
+                       "get up to %d times the configured rates; set RATE_LIMIT_BACKEND=redis", workers, workers)
+    if backend == 'redis':
+        import redis
+        url = os.getenv('RATE_LIMIT_REDIS_URL') or os.getenv('REDIS_URL', 'redis://localhost:6379/0')
+        return RedisLimiter(redis.Redis.from_url(url, socket_timeout=0.05, socket_connect_timeout=0.05))
+    return InProcessLimiter()
+
+
+def init_rate_limiting(app, limiter=None):
+    limiter = limiter or _create_limiter()
+    if limiter is None:
+        return
+
+    @app.before_request
+    def admit_request():
+        if request.endpoint not in RATE_LIMITS:
+            return None
+
+        per_client_rate, per_client_burst, route_rate, route_burst = RATE_LIMITS[request.endpoint]
+        allowed, retry_after = limiter.acquire([
+            (f'{request.endpoint}:client:{_client_address()}', per_client_rate, per_client_burst),
+            (f'{request.endpoint}:route', route_rate, route_burst),
+        ])
+        if allowed:
+            return None
+
+        response = jsonify({"error": "Too many requests, please retry later"})
+        response.status_code = 429
+        response.headers['Retry-After'] = str(max(1, math.ceil(retry_after)))
+        return response
@@ -1,9 +1,13 @@
 # seed.py
+import logging
 from datetime import datetime, timezone, timedelta
 
+from challenge_cache import invalidate_all_challenges
 from models import Challenge
 from extensions import db
 
+logger = logging.getLogger(__name__)
+
 
 def seed_challenges(app):
     """Seed or update the database with challenge data."""
@@ -47,11 +51,12 @@ def seed_challenges(app):
                 challenge.eco_points = challenge_info["eco_points"]
                 challenge.start_date = challenge_info["start_date"]
                 challenge.end_date = challenge_info["end_date"]
-                print(f"Updated challenge: {challenge.name}")
+                logger.debug("Updated challenge: %s", challenge.name)
             else:
                 # Add new challenge
                 new_challenge = Challenge(**challenge_info)
                 db.session.add(new_challenge)
-                print(f"Added new challenge: {new_challenge.name}")
+                logger.debug("Added new challenge: %s", new_challenge.name)
 
-        db.session.commit()
\ No newline at end of file
+        db.session.commit()
+        invalidate_all_challenges()
\ No newline at end of file
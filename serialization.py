@@ -0,0 +1,121 @@
+# serialization.py
+
+import math
+from json.encoder import encode_basestring_ascii
+
+from flask import current_app, jsonify
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, the stdlib encoder is used without it
+    orjson = None
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider that encodes compact responses (jsonify outside debug mode) with orjson when it is
+    installed. dumps() and pretty-printed responses are left to DefaultJSONProvider.
+
+    Output matches DefaultJSONProvider byte for byte: keys are sorted, the same default() handles dates
+    and other types, and payloads containing non-ASCII text are re-encoded with the stdlib encoder so they
+    keep Flask's \\u escapes. The only differences are the exponent notation of very large or very small
+    floats (1e16 instead of 1e+16) and NaN/infinity becoming null (the stdlib writes invalid JSON for
+    them), neither of which the endpoints return."""
+
+    def response(self, *args, **kwargs):
+        if orjson is None or not self._is_compact():
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(f"{self._dumps_compact(obj)}\n", mimetype=self.mimetype)
+
+    def _dumps_compact(self, obj):
+        encoded = self.dumps_orjson(obj)
+        return encoded if encoded is not None else self.dumps(obj, separators=(',', ':'))
+
+    def dumps_orjson(self, obj):
+        """Compact orjson encoding of obj, or None when orjson is missing or its output would differ from
+        the stdlib encoder's."""
+        if orjson is None:
+            return None
+        try:
+            data = orjson.dumps(obj, default=self.default,
+                                option=orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME |
+                                orjson.OPT_PASSTHROUGH_DATACLASS)
+        except TypeError:
+            # Includes non-string keys, which orjson would sort as strings ("10" before "2") unlike the stdlib
+            return None
+        return data.decode('ascii') if data.isascii() else None
+
+    def _is_compact(self):
+        return self.compact or (self.compact is None and not self._app.debug)
+
+
+def _encode_float(value):
+    # Same as the stdlib encoder's floatstr (allow_nan=True)
+    if value != value:
+        return 'NaN'
+    if value == math.inf:
+        return 'Infinity'
+    if value == -math.inf:
+        return '-Infinity'
+    return float.__repr__(value)
+
+
+# Encoders of the exact column types; anything else (dates, Decimal, subclasses) goes through the provider.
+# Mirrors the stdlib encoder so rows encode exactly like jsonify would encode them
+_ENCODERS = {
+    type(None): lambda value: 'null',
+    bool: lambda value: 'true' if value else 'false',
+    str: encode_basestring_ascii,
+    int: int.__repr__,
+    float: _encode_float,
+}
+
+
+def _encode_value(value):
+    encoder = _ENCODERS.get(type(value))
+    if encoder is not None:
+        return encoder(value)
+    return current_app.json.dumps(value)
+
+
+class RowSerializer:
+    """Encodes result rows (tuples in `keys` order) to JSON objects with sorted keys, like jsonify. Without
+    orjson (or for non-ASCII rows) each row is encoded straight into a precompiled template, without
+    building an intermediate dict."""
+
+    def __init__(self, *keys):
+        self.keys = keys
+        order = sorted(range(len(keys)), key=lambda index: keys[index])
+        self._order = order
+        self._template = '{' + ','.join(encode_basestring_ascii(keys[index]) + ':%s' for index in order) + '}'
+
+    def encode_row(self, row):
+        return self._template % tuple([_encode_value(row[index]) for index in self._order])
+
+    def to_dict(self, row):
+        return dict(zip(self.keys, row))
+
+
+def rows_response(serializer, rows, status=200):
+    """Returns the rows as a JSON array response, equivalent to jsonify([serializer.to_dict(row), ...])."""
+    json_provider = current_app.json
+    compact = json_provider.compact or (json_provider.compact is None and not current_app.debug)
+    if not compact:
+        # Pretty-printed output (debug mode) goes through jsonify to keep its formatting
+        return jsonify([serializer.to_dict(row) for row in rows]), status
+
+    body = None
+    if isinstance(json_provider, FastJSONProvider):
+        # orjson encodes the row dicts several times faster than the template, floats especially
+        body = json_provider.dumps_orjson([serializer.to_dict(row) for row in rows])
+    if body is None:
+        body = '[' + ','.join([serializer.encode_row(row) for row in rows]) + ']'
+    return current_app.response_class(body + '\n', mimetype=json_provider.mimetype), status
+
+
+def format_timestamp(value):
+    """Same output as value.strftime("%Y-%m-%d %H:%M:%S") without going through strftime."""
+    return '%04d-%02d-%02d %02d:%02d:%02d' % (value.year, value.month, value.day,
+                                              value.hour, value.minute, value.second)
@@ -0,0 +1,103 @@
+# conftest.py
+# Every test gets the full application (views.create_app) on its own SQLite database. Rate limiting is
+# off unless a test installs a limiter itself, and the in-process caches are emptied between tests.
+
+import os
+from datetime import datetime, timedelta
+
+os.environ.setdefault('RATE_LIMIT_BACKEND', 'off')
+
+import pytest
+
+from caching import community_ranking_cache
+from challenge_cache import challenge_cache, community_challenge_cache
+from extensions import db
+from models import User, Challenge, CommunityChallenge, CommunityChallengeParticipant
+from user_loader import user_summary_cache
+from username_index import username_index
+from views import create_app
+from views.dashboard_views import dashboard_cache
+
+
+@pytest.fixture(autouse=True)
+def reset_caches():
+    for cache in (community_ranking_cache, dashboard_cache):
+        cache.clear()
+    for cache in (challenge_cache, community_challenge_cache, user_summary_cache):
+        cache.invalidate_all()
+    username_index.__init__(username_index.max_age)
+
+
+@pytest.fixture
+def make_app(tmp_path):
+    """Returns a factory of applications, each on its own SQLite database, for tests comparing two of them.
+    Keyword arguments are extra config, applied before the database is set up."""
+    def make_app(name='test', **config):
+        app = create_app()
+        app.config.update(TESTING=True, SQLALCHEMY_DATABASE_URI=f"sqlite:///{tmp_path / f'{name}.db'}", **config)
+        db.init_app(app)
+        with app.app_context():
+            db.create_all()
+        return app
+    return make_app
+
+
+@pytest.fixture
+def app(make_app):
+    return make_app()
+
+
+@pytest.fixture
+def routed_app(make_app, tmp_path):
+    """An app with a primary and a "replica" database that is not replicated to. User 1 (ana) has 5 eco points
+    on the primary and 99 on the replica, so a response shows which of the two was read."""
+    app = make_app(SQLALCHEMY_BINDS={'replica_0': f"sqlite:///{tmp_path / 'replica.db'}"})
+    with app.app_context():
+        # create_all only touches the primary, the replica schema is set up here
+        db.metadata.create_all(db.engines['replica_0'])
+        for engine, eco_points in ((db.engine, 5), (db.engines['replica_0'], 99)):
+            with engine.begin() as connection:
+                connection.execute(User.__table__.insert(), {
+                    'id': 1, 'username': 'ana', 'email': 'ana@example.com', 'eco_points': eco_points})
+    yield app
+    # init_app registered the bind key on the shared db object, later apps' create_all would look for it
+    db.metadatas.pop('replica_0', None)
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """Creates a user and returns its id."""
+    def make_user(username, eco_points=0):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', eco_points=eco_points,
+                        password_hash='unused')
+            db.session.add(user)
+            db.session.commit()
+            return user.id
+    return make_user
+
+
+@pytest.fixture
+def make_community_challenge(app):
+    """Creates a community challenge created by `created_by` with the given participants and returns its id."""
+    def make_community_challenge(created_by, participant_ids=()):
+        with app.app_context():
+            challenge = Challenge(name='Refill week', eco_points=10, start_date=datetime(2026, 1, 1),
+                                  end_date=datetime(2026, 1, 1) + timedelta(days=7))
+            db.session.add(challenge)
+            db.session.flush()
+            community_challenge = CommunityChallenge(challenge_id=challenge.id, created_by=created_by)
+            db.session.add(community_challenge)
+            db.session.flush()
+            for participant_id in participant_ids:
+                db.session.add(CommunityChallengeParticipant(community_challenge_id=community_challenge.id,
+                                                             participant_id=participant_id, status='active',
+                                                             start_date=datetime(2026, 1, 1)))
+            db.session.commit()
+            return community_challenge.id
+    return make_community_challenge
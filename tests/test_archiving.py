@@ -0,0 +1,116 @@
+# test_archiving.py
+
+from datetime import datetime, timedelta
+
+import pytest
+
+import archiving
+from archiving import ARCHIVE_SPECS, archive_batch, archive_cold_rows, archive_table
+from extensions import db
+from models import Notification, NotificationArchive, MessagesInbox, ChallengesInbox, ChallengesInboxArchive
+
+NOTIFICATIONS = ARCHIVE_SPECS[0]
+OLD = datetime(2020, 1, 1)
+
+
+def _notify(user_id, content, timestamp=OLD):
+    notification = Notification(user_id=user_id, content=content, timestamp=timestamp)
+    db.session.add(notification)
+    db.session.commit()
+    return notification.id
+
+
+def test_ids_are_not_reused_after_the_hot_table_is_emptied(app, make_user):
+    user_id = make_user('ana')
+    with app.app_context():
+        archived_ids = [_notify(user_id, f'Old {n}') for n in range(3)]
+        assert archive_cold_rows(pause=0)['notifications'] == 3
+        assert Notification.query.count() == 0
+
+        new_id = _notify(user_id, 'New')
+        assert new_id > max(archived_ids)
+
+        # The new row is archived next to the old ones instead of colliding with them
+        db.session.get(Notification, new_id).timestamp = OLD
+        db.session.commit()
+        assert archive_cold_rows(pause=0)['notifications'] == 1
+        assert NotificationArchive.query.count() == 4
+
+
+def test_rows_whose_id_is_already_archived_stay_in_the_hot_table(app, make_user):
+    user_id = make_user('ana')
+    with app.app_context():
+        reused_id = _notify(user_id, 'Reused id')
+        other_id = _notify(user_id, 'Other')
+        # What an id handed out again after a MySQL 5.7 restart looks like
+        db.session.add(NotificationArchive(id=reused_id, user_id=user_id, content='Archived long ago'))
+        db.session.commit()
+
+        assert archive_batch(NOTIFICATIONS, datetime(2021, 1, 1), batch_size=10) == 1
+
+        assert [row.id for row in Notification.query] == [reused_id]
+        assert db.session.get(NotificationArchive, reused_id).content == 'Archived long ago'
+        assert db.session.get(NotificationArchive, other_id).content == 'Other'
+
+
+def test_recent_rows_and_pending_invites_stay_in_the_hot_tables(app, make_user):
+    ana, ben = make_user('ana'), make_user('ben')
+    recent = datetime.now() - timedelta(days=1)
+    with app.app_context():
+        _notify(ana, 'Old')
+        _notify(ana, 'Recent', timestamp=recent)
+        db.session.add_all([MessagesInbox(user_id=ana, sender_id=ben, content='Old', timestamp=OLD),
+                            MessagesInbox(user_id=ana, sender_id=ben, content='Recent', timestamp=recent)])
+        db.session.add_all(ChallengesInbox(user_id=ana, sender_id=ben, timestamp=OLD, status=status)
+                           for status in ('pending', 'accepted', 'rejected'))
+        db.session.commit()
+
+        assert archive_cold_rows(pause=0) == {'notifications': 1, 'messages': 1, 'challenge_invites': 2}
+
+        assert [row.content for row in Notification.query] == ['Recent']
+        assert [row.content for row in MessagesInbox.query] == ['Recent']
+        assert [row.status for row in ChallengesInbox.query] == ['pending']
+        assert sorted(row.status for row in ChallengesInboxArchive.query) == ['accepted', 'rejected']
+
+
+@pytest.mark.parametrize('rows, max_batches, batches', [
+    (10, 3, [2, 2, 2]),  # stops after max_batches
+    (5, 10, [2, 2, 1]),  # stops at the first short batch
+])
+def test_runs_are_bounded_by_batch_size_and_count(app, make_user, monkeypatch, rows, max_batches, batches):
+    user_id = make_user('ana')
+    moved = []
+    monkeypatch.setattr(archiving, 'archive_batch', lambda *args: moved.append(archive_batch(*args)) or moved[-1])
+    with app.app_context():
+        for n in range(rows):
+            _notify(user_id, f'Old {n}')
+
+        assert archive_table(NOTIFICATIONS, datetime(2021, 1, 1), batch_size=2, max_batches=max_batches,
+                             pause=0) == sum(batches)
+
+        assert moved == batches
+        # oldest ids first
+        assert [row.content for row in Notification.query] == [f'Old {n}' for n in range(sum(batches), rows)]
+
+
+def test_include_archived_returns_archived_rows_before_hot_ones(app, client, make_user):
+    ana, ben = make_user('ana'), make_user('ben')
+    with app.app_context():
+        for n in range(2):
+            _notify(ana, f'Old {n}')
+            db.session.add(MessagesInbox(user_id=ben, sender_id=ana, content=f'Old {n}', timestamp=OLD))
+        db.session.commit()
+        archive_cold_rows(pause=0)
+        _notify(ana, 'New', timestamp=datetime.now())
+        db.session.add(MessagesInbox(user_id=ben, sender_id=ana, content='New', timestamp=datetime.now()))
+        db.session.commit()
+
+    notifications = client.get(f'/get_notifications/{ana}?include_archived=true').json
+    messages = client.get(f'/sent_messages/{ana}?include_archived=true').json['sent_messages']
+
+    assert [row['content'] for row in notifications] == ['Old 0', 'Old 1', 'New']
+    assert [row['content'] for row in messages] == ['Old 0', 'Old 1', 'New']
+    assert messages[0]['recipient_name'] == 'ben'
+    # without the flag only the hot rows are returned
+    assert [row['content'] for row in client.get(f'/get_notifications/{ana}').json] == ['New']
+    assert [row['content'] for row in client.get(f'/sent_messages/{ana}').json['sent_messages']] == ['New']
@@ -0,0 +1,124 @@
+# test_async_views.py
+# The asyncio handlers served by asgi.py must answer exactly like their Flask routes.
+
+import asyncio
+import json
+
+import pytest
+
+from archiving import archive_cold_rows
+from metrics import REQUEST_COUNT
+
+
+@pytest.fixture(scope='session')
+def asgi_module(tmp_path_factory):
+    # Importing asgi builds the module-level Flask app from DATABASE_URI; the tests use their own app
+    monkeypatch = pytest.MonkeyPatch()
+    monkeypatch.setenv('LOG_LEVEL', 'WARNING')
+    monkeypatch.setenv('DATABASE_URI', f"sqlite:///{tmp_path_factory.mktemp('asgi') / 'asgi.db'}")
+    import asgi
+    monkeypatch.undo()
+    return asgi
+
+
+@pytest.fixture
+def asgi_app(asgi_module, app):
+    return asgi_module.AsyncReadApp(app, app.config['SQLALCHEMY_DATABASE_URI'])
+
+
+def asgi_get(asgi_app, path, headers=()):
+    """Runs one GET request through the ASGI app and returns (status, headers, body)."""
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    path, _, query = path.partition('?')
+
+    async def run():
+        scope = {'type': 'http', 'http_version': '1.1', 'method': 'GET', 'path': path, 'raw_path': path.encode(),
+                 'query_string': query.encode(), 'root_path': '', 'scheme': 'http', 'server': ('testserver', 80),
+                 'client': ('127.0.0.1', 1234), 'headers': [(name.lower().encode(), value.encode())
+                                                             for name, value in headers]}
+        await asgi_app(scope, receive, send)
+        if asgi_app.handlers is not None:
+            await asgi_app.handlers.engine.dispose()
+
+    asyncio.run(run())
+    start = messages[0]
+    body = b''.join(message.get('body', b'') for message in messages[1:])
+    return start['status'], dict(start['headers']), body
+
+
+@pytest.fixture
+def social_data(client, make_user):
+    ana, ben, cleo = make_user('ana', eco_points=30), make_user('ben', eco_points=50), make_user('cleo')
+    client.post(f'/add_friend/{ana}/{ben}')
+    client.post(f'/add_friend/{cleo}/{ana}')
+    client.post(f'/respond_friend_request/{ben}/{ana}', json={'action': 'accept'})
+    for sender, content in ((ben, 'Refill at noon?'), (cleo, 'Café is open ☕')):
+        assert client.post('/send_message', json={'sender_id': sender, 'recipient_id': ana,
+                                                  'content': content}).status_code in (200, 201)
+    return ana
+
+
+@pytest.mark.parametrize('path', ['/get_friendships/{user}', '/received_messages/{user}', '/leaderboards',
+                                  '/user_challenge_status/{user}', '/received_messages/999',
+                                  '/user_challenge_status/999'])
+def test_async_handlers_answer_like_the_flask_routes(asgi_app, client, social_data, path):
+    path = path.format(user=social_data)
+    expected = client.get(path)
+
+    status, _, body = asgi_get(asgi_app, path)
+
+    assert status == expected.status_code
+    assert json.loads(body) == expected.json
+
+
+def test_async_handlers_echo_the_request_id_and_record_metrics(asgi_app, social_data):
+    route = '/received_messages/<int:user_id>'
+    before = REQUEST_COUNT.labels('GET', route, '200')._value.get()
+
+    status, headers, _ = asgi_get(asgi_app, f'/received_messages/{social_data}', [('X-Request-ID', 'abc123')])
+
+    assert status == 200
+    assert headers[b'x-request-id'] == b'abc123'
+    assert REQUEST_COUNT.labels('GET', route, '200')._value.get() == before + 1
+
+
+
+def test_failing_async_handlers_are_recorded_as_500(asgi_module, asgi_app, social_data, monkeypatch):
+    async def fail(self, user_id):
+        raise RuntimeError('database went away')
+
+    monkeypatch.setattr(asgi_module.AsyncReadHandlers, 'received_messages', fail)
+    route = '/received_messages/<int:user_id>'
+    before = REQUEST_COUNT.labels('GET', route, '500')._value.get()
+
+    with pytest.raises(RuntimeError):
+        asgi_get(asgi_app, f'/received_messages/{social_data}')
+
+    assert REQUEST_COUNT.labels('GET', route, '500')._value.get() == before + 1
+
+
+def test_archived_reads_fall_through_to_flask(app, asgi_app, client, social_data):
+    with app.app_context():
+        archive_cold_rows(max_age_days=-1, pause=0)
+    path = f'/received_messages/{social_data}?include_archived=true'
+
+    status, _, body = asgi_get(asgi_app, path)
+
+    assert status == 200
+    assert len(json.loads(body)['received_messages']) == 2
+    assert json.loads(body) == client.get(path).json
+    assert asgi_app.handlers is None  # served by Flask
+
+
+def test_other_routes_fall_through_to_flask(asgi_app, social_data):
+    status, _, body = asgi_get(asgi_app, '/get_users')
+
+    assert status == 200
+    assert {user['username'] for user in json.loads(body)} == {'ana', 'ben', 'cleo'}
@@ -0,0 +1,111 @@
+# test_batch.py
+
+import time
+
+import pytest
+from flask import jsonify
+
+import rate_limiting
+from rate_limiting import InProcessLimiter, init_rate_limiting
+from views import batch_views
+
+
+@pytest.mark.parametrize('propagate_exceptions', [True, False])
+def test_a_failing_sub_request_becomes_a_500_entry(app, client, make_user, propagate_exceptions):
+    app.config['PROPAGATE_EXCEPTIONS'] = propagate_exceptions
+    ana, ben = make_user('ana'), make_user('ben')
+
+    def broken_view():
+        raise RuntimeError('database went away')
+
+    app.view_functions['get_all_users'] = broken_view
+
+    response = client.post('/batch', json={'requests': [
+        {'method': 'POST', 'path': f'/add_friend/{ana}/{ben}'},
+        {'method': 'GET', 'path': '/get_users'},
+        {'method': 'GET', 'path': f'/get_friendships/{ben}'}]})
+
+    assert response.status_code == 200
+    assert [item['status'] for item in response.json['responses']] == [201, 500, 200]
+    # The writes before the failure are kept and the requests after it still run
+    assert response.json['responses'][2]['body'][0]['friend_id'] == ana
+
+
+def test_responses_are_returned_in_request_order(client, make_user):
+    ana, ben = make_user('ana'), make_user('ben')
+
+    response = client.post('/batch', json={'requests': [
+        {'method': 'GET', 'path': f'/get_friendships/{ana}'},
+        {'path': f'/get_friendships/{ana}'},
+        {'method': 'post', 'path': f'/add_friend/{ana}/{ben}'},
+        {'method': 'GET', 'path': f'/get_friendships/{ana}'},
+        {'method': 'GET', 'path': '/no_such_route'}]})
+
+    statuses = [item['status'] for item in response.json['responses']]
+    assert statuses == [200, 200, 201, 200, 404]
+    bodies = [item['body'] for item in response.json['responses']]
+    assert bodies[0] == bodies[1] == []
+    assert [friendship['friend_id'] for friendship in bodies[3]] == [ben]
+
+
+@pytest.mark.parametrize('payload, error', [
+    ({}, 'requests must be a non-empty list'),
+    ({'requests': []}, 'requests must be a non-empty list'),
+    ({'requests': [{'path': '/get_users'}] * (batch_views.BATCH_MAX_REQUESTS + 1)},
+     f'A batch can contain at most {batch_views.BATCH_MAX_REQUESTS} requests'),
+    ({'requests': [{'path': '/get_users'}, 'GET /get_users']}, 'Request 1: Each request must be an object'),
+    ({'requests': [{'method': 'TRACE', 'path': '/get_users'}]}, 'Request 0: Unsupported method TRACE'),
+    ({'requests': [{'path': 'get_users'}]},
+     'Request 0: path must be an absolute path such as /get_friendships/1'),
+    ({'requests': [{'path': '/get_users'}, {'path': '/batch'}]}, 'Request 1: /batch cannot be batched'),
+    ({'requests': [{'path': '/export/1?kind=water'}]}, 'Request 0: /export/1?kind=water cannot be batched'),
+    ({'requests': [{'path': '/events/1'}]}, 'Request 0: /events/1 cannot be batched'),
+    ({'requests': [{'path': '/admin/profiles'}]}, 'Request 0: /admin/profiles cannot be batched'),
+])
+def test_invalid_batches_are_rejected_before_anything_runs(app, client, payload, error):
+    ran = []
+    get_all_users = app.view_functions['get_all_users']
+    app.view_functions['get_all_users'] = lambda: ran.append(1) or get_all_users()
+
+    response = client.post('/batch', json=payload)
+
+    assert response.status_code == 400
+    assert response.json == {'error': error}
+    assert ran == []
+
+
+def test_sub_requests_past_the_time_budget_are_not_run(app, client, monkeypatch):
+    monkeypatch.setattr(batch_views, 'BATCH_MAX_SECONDS', 0.05)
+    ran = []
+
+    def slow_view():
+        ran.append(1)
+        time.sleep(0.1)
+        return jsonify([])
+
+    app.view_functions['get_all_users'] = slow_view
+
+    response = client.post('/batch', json={'requests': [{'path': '/get_users'}] * 3})
+
+    assert [item['status'] for item in response.json['responses']] == [200, 503, 503]
+    assert response.json['responses'][1]['body'] == {'error': 'Batch time budget exceeded, not run'}
+    assert ran == [1]
+
+
+def test_batched_writes_are_limited_per_client_behind_the_proxy(app, make_user, monkeypatch):
+    monkeypatch.setattr(rate_limiting, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    init_rate_limiting(app, InProcessLimiter())
+    client = app.test_client()
+    user_id = make_user('ana')
+    burst = rate_limiting.RATE_LIMITS['log_water_usage'][1]
+    log = {'method': 'POST', 'path': '/log_water_usage', 'body': {'user_id': user_id, 'bottle_type': 'refillable'}}
+
+    def batch(address, count):
+        # Every call comes from the router's address, with the client appended to X-Forwarded-For
+        response = client.post('/batch', json={'requests': [log] * count},
+                               headers={'X-Forwarded-For': address}, environ_base={'REMOTE_ADDR': '10.1.1.1'})
+        return [item['status'] for item in response.json['responses']]
+
+    assert batch('203.0.113.7', burst + 1) == [200] * burst + [429]
+    # Another client behind the same router has its own bucket
+    assert batch('203.0.113.8', 2) == [200, 200]
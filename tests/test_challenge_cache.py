@@ -0,0 +1,58 @@
+# test_challenge_cache.py
+
+from caching import LRUCache
+from challenge_cache import cache_stats
+
+
+def test_lru_cache_evicts_the_least_recently_used_entry_and_counts_hits():
+    cache = LRUCache(max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert (cache.get('a'), cache.get('b'), cache.get('c')) == (1, None, 3)
+    assert cache.stats() == {"size": 2, "max_size": 2, "hits": 3, "misses": 1, "evictions": 1, "hit_rate": 0.75}
+
+
+def test_value_loaded_across_an_invalidation_is_not_cached():
+    cache = LRUCache(max_size=10)
+
+    def slow_loader(key):
+        # Another request edits the row while this one is reading it
+        cache.invalidate(key)
+        return 'stale'
+
+    assert cache.get_or_load('a', slow_loader) == 'stale'
+    assert cache.get('a') is None
+    assert cache.get_or_load('a', lambda key: 'fresh') == 'fresh'
+    assert cache.get('a') == 'fresh'
+
+
+def test_expired_entries_are_reloaded(monkeypatch):
+    cache = LRUCache(max_size=10, max_age=60)
+    cache.set('a', 1)
+    now = __import__('time').monotonic()
+    monkeypatch.setattr('caching.time.monotonic', lambda: now + 61)
+
+    assert cache.get('a') is None
+
+
+def test_challenge_reads_hit_the_cache_until_the_challenge_is_edited(client, make_user, make_community_challenge):
+    user_id = make_user('ana')
+    community_challenge_id = make_community_challenge(user_id, [user_id])
+
+    for _ in range(3):
+        assert client.get(f'/community_challenge_details/{community_challenge_id}').json['name'] == 'Refill week'
+    stats = client.get('/cache_stats').json
+    assert (stats['challenges']['hits'], stats['challenges']['misses']) == (2, 1)
+    assert (stats['community_challenges']['hits'], stats['community_challenges']['misses']) == (2, 1)
+
+    response = client.put(f'/edit_community_challenge/{user_id}/{community_challenge_id}', json={
+        'name': 'Refill fortnight', 'start_date': '2030-01-01T00:00:00+00:00', 'end_date': '2030-01-15T00:00:00+00:00'})
+    assert response.status_code == 200
+    assert client.get(f'/community_challenge_details/{community_challenge_id}').json['name'] == 'Refill fortnight'
+    assert cache_stats()['challenges']['misses'] == 2
+
+    assert client.delete(f'/delete_community_challenge/{user_id}/{community_challenge_id}').status_code == 200
+    assert client.get(f'/community_challenge_details/{community_challenge_id}').status_code == 404
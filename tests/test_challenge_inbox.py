@@ -0,0 +1,50 @@
+# test_challenge_inbox.py
+
+import pytest
+
+from extensions import db
+from models import CommunityChallenge
+
+
+@pytest.fixture
+def inbox(app, client, make_user, make_community_challenge):
+    """ana sends ben three personal invites and two community invites, interleaved."""
+    ana, ben = make_user('ana'), make_user('ben')
+    community_challenge_id = make_community_challenge(ana, [ana])
+    with app.app_context():
+        challenge_id = db.session.get(CommunityChallenge, community_challenge_id).challenge_id
+    for kind in ('personal', 'community', 'personal', 'community', 'personal'):
+        if kind == 'personal':
+            payload = {'sender_id': ana, 'recipient_id': ben, 'challenge_id': challenge_id}
+        else:
+            payload = {'sender_id': ana, 'recipient_id': ben, 'community_challenge_id': community_challenge_id}
+        assert client.post(f'/send_{kind}_challenge', json=payload).status_code == 200
+    return ana, ben
+
+
+@pytest.mark.parametrize('path, user_index, expected_ids', [
+    ('/get_received_personal_challenges/{user}', 1, [1, 3, 5]),
+    ('/get_received_community_challenges/{user}', 1, [2, 4]),
+    ('/get_sent_personal_challenges/{user}', 0, [1, 3, 5]),
+    ('/get_sent_community_challenges/{user}', 0, [2, 4]),
+])
+def test_legacy_routes_keep_ascending_id_order(client, inbox, path, user_index, expected_ids):
+    response = client.get(path.format(user=inbox[user_index]))
+
+    assert response.status_code == 200
+    assert [item['id'] for item in response.json] == expected_ids
+    assert all(item.get('challenge_name', item.get('community_challenge_name')) == 'Refill week'
+               for item in response.json)
+
+
+def test_challenge_inbox_pages_newest_first(client, inbox):
+    _, ben = inbox
+
+    first = client.get(f'/challenge_inbox/{ben}?limit=2').json
+    second = client.get(f'/challenge_inbox/{ben}?limit=2&before_id={first["next_cursor"]}').json
+    last = client.get(f'/challenge_inbox/{ben}?limit=2&before_id={second["next_cursor"]}').json
+
+    assert [[item['id'] for item in page['items']] for page in (first, second, last)] == [[5, 4], [3, 2], [1]]
+    assert last['next_cursor'] is None
+    community = client.get(f'/challenge_inbox/{ben}?type=community').json['items']
+    assert [item['id'] for item in community] == [4, 2]
@@ -0,0 +1,106 @@
+# test_community_ranking.py
+
+from datetime import datetime
+
+from caching import community_ranking_cache
+from extensions import db
+from models import EnvironmentalImpact, Challenge, CommunityChallenge, CommunityChallengeParticipant, ChallengesInbox
+
+
+def test_ranking_pages_follow_the_cursor(app, client, make_user, make_community_challenge):
+    user_ids = [make_user(name) for name in ('ana', 'ben', 'cy', 'dee', 'eli')]
+    community_challenge_id = make_community_challenge(user_ids[0], user_ids)
+    scores = {user_ids[0]: 5.0, user_ids[1]: 9.0, user_ids[2]: 5.0, user_ids[3]: 1.0}  # eli has no impact
+    with app.app_context():
+        for user_id, score in scores.items():
+            db.session.add(EnvironmentalImpact(user_id=user_id, community_challenge_id=community_challenge_id,
+                                               impact_score=score))
+        db.session.commit()
+
+    participants, cursor = [], None
+    while True:
+        query = f'?per_page=2&after={cursor}' if cursor else '?per_page=2'
+        page = client.get(f'/community_challenge_ranking/{community_challenge_id}{query}').json
+        participants += page['participants']
+        cursor = page['next_cursor']
+        if not page['has_more']:
+            break
+
+    assert [(p['rank'], p['user_id'], p['impact_score']) for p in participants] == [
+        (1, user_ids[1], 9.0), (2, user_ids[0], 5.0), (3, user_ids[2], 5.0), (4, user_ids[3], 1.0),
+        (5, user_ids[4], 0)]
+
+
+def test_ranking_rejects_bad_cursors_and_unknown_challenges(client):
+    assert client.get('/community_challenge_ranking/1?after=oops').status_code == 400
+    assert client.get('/community_challenge_ranking/999').status_code == 404
+
+
+def test_log_water_usage_leaves_participant_progress_alone(app, client, make_user, make_community_challenge):
+    user_id = make_user('ana')
+    community_challenge_id = make_community_challenge(user_id, [user_id])
+    response = client.post('/log_water_usage', json={'user_id': user_id, 'bottle_type': 'refillable',
+                                                     'challenge_type': 'community',
+                                                     'challenge_id': community_challenge_id})
+    assert response.status_code == 200
+    with app.app_context():
+        assert db.session.get(CommunityChallengeParticipant, (community_challenge_id, user_id)).progress is None
+
+
+def test_cached_ranking_follows_logged_usage(app, client, make_user, make_community_challenge):
+    ana, ben = make_user('ana'), make_user('ben')
+    community_challenge_id = make_community_challenge(ana, [ana, ben])
+    url = f'/community_challenge_ranking/{community_challenge_id}'
+
+    def log(user_id, count):
+        assert client.post('/log_water_usage', json={
+            'user_id': user_id, 'bottle_type': 'refillable', 'count': count, 'challenge_type': 'community',
+            'challenge_id': community_challenge_id}).status_code == 200
+
+    log(ana, 1)
+    assert [p['user_id'] for p in client.get(url).json['participants']] == [ana, ben]
+
+    log(ben, 3)
+    cached = client.get(url).json
+    community_ranking_cache.clear()
+    rebuilt = client.get(url).json
+    assert [p['user_id'] for p in cached['participants']] == [ben, ana]
+    assert cached == rebuilt
+
+
+def test_joining_and_accepting_add_the_participant_to_a_cached_ranking(app, client, make_user,
+                                                                       make_community_challenge):
+    ana, ben, cy = make_user('ana'), make_user('ben'), make_user('cy')
+    community_challenge_id = make_community_challenge(ana, [ana])
+    url = f'/community_challenge_ranking/{community_challenge_id}'
+    assert [p['user_id'] for p in client.get(url).json['participants']] == [ana]
+
+    assert client.post('/join_community_challenge', json={
+        'user_id': ben, 'community_challenge_id': community_challenge_id}).status_code == 200
+    assert [p['user_id'] for p in client.get(url).json['participants']] == [ana, ben]
+
+    with app.app_context():
+        invite = ChallengesInbox(user_id=cy, sender_id=ana, community_challenge_id=community_challenge_id)
+        db.session.add(invite)
+        db.session.commit()
+        invite_id = invite.id
+    assert client.put('/accept_challenge', json={
+        'challenge_id': invite_id, 'user_id': cy, 'challenge_type': 'community'}).status_code == 200
+    assert [p['user_id'] for p in client.get(url).json['participants']] == [ana, ben, cy]
+
+
+def test_ranking_is_cached_from_the_primary(routed_app):
+    # The challenge and its participant exist on the primary only, like right after a write
+    with routed_app.app_context():
+        with db.engine.begin() as connection:
+            connection.execute(Challenge.__table__.insert(), {
+                'id': 1, 'name': 'Refill week', 'eco_points': 10, 'start_date': datetime(2026, 1, 1),
+                'end_date': datetime(2026, 1, 8)})
+            connection.execute(CommunityChallenge.__table__.insert(), {'id': 1, 'challenge_id': 1, 'created_by': 1})
+            connection.execute(CommunityChallengeParticipant.__table__.insert(), {
+                'community_challenge_id': 1, 'participant_id': 1, 'status': 'active',
+                'start_date': datetime(2026, 1, 1)})
+
+    participants = routed_app.test_client().get('/community_challenge_ranking/1').json['participants']
+
+    assert [(p['user_id'], p['username'], p['status']) for p in participants] == [(1, 'ana', 'active')]
@@ -0,0 +1,131 @@
+# test_dashboard.py
+
+from datetime import datetime
+
+import pytest
+from sqlalchemy import event
+
+from challenge_cache import invalidate_all_challenges
+from extensions import db
+from models import User, UserPreference, Badge, Challenge, PersonalChallengeParticipant, EnvironmentalImpact, \
+    Notification
+from models.challenge_models import user_badges
+from views.dashboard_views import dashboard_cache
+
+
+def _cached_sections(user_id):
+    return {key[1] for key in dashboard_cache._entries if key[0] == user_id}
+
+
+def _create_community_challenge(client, user, other):
+    return client.post('/create_community_challenge', json={
+        'name': 'Refill week', 'description': 'Refill only', 'eco_points': 10,
+        'start_date': '2026-01-01T00:00:00', 'end_date': '2026-01-08T00:00:00', 'created_by': user})
+
+
+@pytest.mark.parametrize('write', [
+    lambda client, user, other: client.post(f'/add_friend/{other}/{user}'),  # friend_id in the URL
+    _create_community_challenge,  # created_by in the body
+])
+def test_writes_drop_the_cached_sections_of_every_user_they_name(client, make_user, write):
+    user, other = make_user('ana'), make_user('ben')
+    assert client.get(f'/dashboard/{user}').status_code == 200
+    assert _cached_sections(user) == {'profile', 'badges', 'challenges', 'notifications'}
+
+    assert write(client, user, other).status_code == 201
+    assert _cached_sections(user) == set()
+
+
+def test_failed_and_read_requests_keep_the_cache(client, make_user):
+    user = make_user('ana')
+    client.get(f'/dashboard/{user}')
+
+    assert client.post(f'/add_friend/{user}/{user}').status_code == 400
+    client.get(f'/get_friendships/{user}')
+
+    assert _cached_sections(user) == {'profile', 'badges', 'challenges', 'notifications'}
+
+
+def _populate(app, user_id, make_community_challenge, count):
+    """Gives the user a preference, `count` badges, personal challenges with impact records and notifications,
+    and one community challenge."""
+    with app.app_context():
+        db.session.add(UserPreference(user_id=user_id, receive_notifications=False, privacy_settings='Friends Only'))
+        for n in range(count):
+            badge = Badge(name=f'Badge {user_id}.{n}', eco_points_required=n)
+            challenge = Challenge(name=f'Challenge {user_id}.{n}', eco_points=10, start_date=datetime(2026, 1, 1),
+                                  end_date=datetime(2026, 2, 1))
+            db.session.add_all([badge, challenge])
+            db.session.flush()
+            db.session.execute(user_badges.insert(), {'user_id': user_id, 'badge_id': badge.id})
+            participant = PersonalChallengeParticipant(user_id=user_id, challenge_id=challenge.id,
+                                                       start_date=datetime(2026, 1, 2))
+            db.session.add(participant)
+            db.session.flush()
+            db.session.add(EnvironmentalImpact(user_id=user_id, impact_score=n + 0.5,
+                                               personal_challenge_id=participant.id))
+            db.session.add(Notification(user_id=user_id, content=f'Notification {n}',
+                                        timestamp=datetime(2026, 1, 3, n)))
+        db.session.query(User).filter_by(id=user_id).update({'eco_points': 40 + count})
+        db.session.commit()
+    make_community_challenge(user_id, [user_id])
+
+
+def test_every_section_matches_its_standalone_endpoint(app, client, make_user, make_community_challenge):
+    user = make_user('ana')
+    make_user('ben', eco_points=3)
+    _populate(app, user, make_community_challenge, 3)
+
+    dashboard = client.get(f'/dashboard/{user}').json
+
+    assert dashboard['profile'] == client.get(f'/view_profile/{user}').json
+    assert dashboard['eco_points'] == client.get(f'/get_eco_points/{user}').json['eco_points']
+    assert dashboard['badges'] == client.get(f'/get_badges/{user}').json['badges']
+    assert dashboard['challenges'] == client.get(f'/user_challenge_status/{user}').json
+    assert dashboard['notifications'] == client.get(f'/get_notifications/{user}').json
+    assert dashboard['leaderboard'] == client.get('/leaderboards').json['leaderboard']
+    # the comparison is not vacuous
+    assert len(dashboard['challenges']) == 4 and len(dashboard['notifications']) == 3
+    assert dashboard['profile']['preferences'] == {'receive_notifications': False, 'privacy_settings': 'Friends Only'}
+
+
+def _statements(app, request):
+    """The SQL statements executed while `request` runs."""
+    statements = []
+
+    def listener(connection, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            request()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+    return statements
+
+
+def test_dashboard_runs_the_same_queries_whatever_the_amount_of_data(app, client, make_user,
+                                                                     make_community_challenge):
+    small, large = make_user('ana'), make_user('ben')
+    _populate(app, small, make_community_challenge, 1)
+    _populate(app, large, make_community_challenge, 8)
+
+    def cold_dashboard(user_id):
+        dashboard_cache.clear()
+        invalidate_all_challenges()
+        return _statements(app, lambda: client.get(f'/dashboard/{user_id}'))
+
+    # profile, badges, the three challenge status queries, the community challenge lookup, the challenge
+    # lookups of the personal and of the community challenges, notifications and the leaderboard
+    assert len(cold_dashboard(small)) == len(cold_dashboard(large)) == 10
+    # and a warm cache answers without any
+    assert _statements(app, lambda: client.get(f'/dashboard/{large}')) == []
+
+
+def test_sections_are_cached_from_the_primary(routed_app):
+    client = routed_app.test_client()
+
+    # the first read fills the cache for every client, so it must not come from a lagging replica
+    assert client.get('/dashboard/1?fields=eco_points').json == {'eco_points': 5}
+    assert client.get('/view_profile/1').json['eco_points'] == 99
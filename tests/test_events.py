@@ -0,0 +1,97 @@
+# test_events.py
+
+import queue
+import time
+
+import fakeredis
+import pytest
+
+import events
+from events import EventBus, RedisEventBus
+from extensions import db
+from models import MessagesInbox, Notification
+from views import event_views
+
+
+def test_flask_route_refuses_streams_unless_enabled(client, make_user):
+    response = client.get(f'/events/{make_user("ana")}')
+
+    assert response.status_code == 501
+    assert 'asgi' in response.json['error']
+
+
+def test_enabled_flask_route_streams_committed_events(client, make_user, monkeypatch):
+    monkeypatch.setattr(event_views, 'EVENTS_WSGI_STREAMING', True)
+    ana, ben = make_user('ana'), make_user('ben')
+    assert client.get('/events/999').status_code == 404
+
+    response = client.get(f'/events/{ana}')
+    chunks = iter(response.response)
+    assert next(chunks).startswith(b'retry:')  # subscribed from here on
+
+    client.post('/send_message', json={'sender_id': ben, 'recipient_id': ana, 'content': 'Refill at noon?'})
+
+    assert next(chunks).startswith(b'event: message\ndata: {"id": 1, "sender_id": %d' % ben)
+    response.close()
+    assert events.event_bus.subscriber_count() == 0
+
+
+@pytest.mark.parametrize('workers, warned', [('1', False), ('4', True)])
+def test_memory_bus_warns_when_several_workers_serve(monkeypatch, caplog, workers, warned):
+    monkeypatch.setenv('EVENT_BUS', 'memory')
+    monkeypatch.setenv('WEB_CONCURRENCY', workers)
+
+    bus = events._create_event_bus()
+
+    assert type(bus) is EventBus
+    assert ('EVENT_BUS=redis' in caplog.text) is warned
+
+
+@pytest.fixture
+def redis_buses(monkeypatch):
+    """Two RedisEventBus instances on one fakeredis server, as two worker processes would have. The app
+    publishes on the first, clients are subscribed to the second."""
+    server = fakeredis.FakeServer()
+    publisher, listener = (RedisEventBus(fakeredis.FakeRedis(server=server)) for _ in range(2))
+    monkeypatch.setattr(events, 'event_bus', publisher)
+    return publisher, listener
+
+
+def _subscribe(bus, user_id):
+    received = queue.Queue()
+    bus.subscribe(user_id, received.put)
+    deadline = time.monotonic() + 5
+    while not bus.client.pubsub_numpat():  # the listener thread subscribes asynchronously
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    return received
+
+
+def test_committed_events_reach_subscribers_of_another_process(client, make_user, redis_buses):
+    publisher, listener = redis_buses
+    ana, ben = make_user('ana'), make_user('ben')
+    received = _subscribe(listener, ana)
+
+    client.post('/send_message', json={'sender_id': ben, 'recipient_id': ana, 'content': 'Refill at noon?'})
+
+    event_data = received.get(timeout=5)
+    assert event_data['type'] == 'message'
+    assert event_data['data']['sender_id'] == ben and event_data['data']['content'] == 'Refill at noon?'
+    assert publisher.subscriber_count() == 0 and listener.subscriber_count() == 1
+
+
+def test_rolled_back_inserts_publish_nothing(app, make_user, redis_buses):
+    _, listener = redis_buses
+    ana, ben = make_user('ana'), make_user('ben')
+    received = _subscribe(listener, ana)
+
+    with app.app_context():
+        db.session.add(MessagesInbox(user_id=ana, sender_id=ben, content='Never sent'))
+        db.session.flush()
+        db.session.rollback()
+        db.session.add(Notification(user_id=ana, content='Committed'))
+        db.session.commit()
+
+    # Events arrive in publishing order, so the committed notification comes first if nothing else was sent
+    assert received.get(timeout=5)['data']['content'] == 'Committed'
+    assert received.empty()
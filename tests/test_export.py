@@ -0,0 +1,138 @@
+# test_export.py
+
+import csv
+import gzip
+import io
+import json
+from datetime import datetime
+
+import pytest
+
+from extensions import db
+from models import CommunityChallenge, EnvironmentalImpact, Post, PersonalChallengeParticipant
+from views import export_views
+
+IMPACTS = 25
+
+
+@pytest.fixture
+def user_id(client, make_user):
+    user_id = make_user('ana')
+    assert client.post('/log_water_usage', json={'user_id': user_id, 'bottle_type': 'refillable'}).status_code == 200
+    return user_id
+
+
+@pytest.fixture
+def impacts(app, make_user, monkeypatch):
+    """Two users with IMPACTS impact records each, exported in many small chunks and cursor batches."""
+    monkeypatch.setattr(export_views, 'EXPORT_BATCH_ROWS', 4)
+    monkeypatch.setattr(export_views, 'EXPORT_CHUNK_BYTES', 256)
+    ana, ben = make_user('ana'), make_user('ben')
+    with app.app_context():
+        db.session.add_all(EnvironmentalImpact(user_id=user_id, impact_score=n + 0.5, water_saved=n)
+                           for n in range(IMPACTS) for user_id in (ana, ben))
+        db.session.commit()
+    return ana
+
+
+def test_plain_export(client, user_id):
+    response = client.get(f'/export/{user_id}/impacts')
+    assert response.mimetype == 'text/csv'
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Content-Disposition'] == f'attachment; filename=impacts_{user_id}.csv'
+    assert response.data.decode().startswith('id,user_id,impact_score')
+
+
+def test_gzip_download_is_a_gz_file_without_content_encoding(client, user_id):
+    response = client.get(f'/export/{user_id}/impacts?gzip=1')
+    assert response.mimetype == 'application/gzip'
+    assert 'Content-Encoding' not in response.headers
+    assert response.headers['Content-Disposition'] == f'attachment; filename=impacts_{user_id}.csv.gz'
+    assert gzip.decompress(response.data).decode().startswith('id,user_id,impact_score')
+
+
+def test_accept_encoding_compresses_in_transit_and_keeps_the_csv_name(client, user_id):
+    response = client.get(f'/export/{user_id}/impacts?format=ndjson', headers={'Accept-Encoding': 'gzip'})
+    assert response.mimetype == 'application/x-ndjson'
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Content-Disposition'] == f'attachment; filename=impacts_{user_id}.ndjson'
+    assert b'"impact_score"' in gzip.decompress(response.data)
+
+
+def test_csv_export_streams_every_row_of_the_user(client, impacts):
+    response = client.get(f'/export/{impacts}/impacts', buffered=False)
+    chunks = list(response.response)
+    response.close()
+
+    rows = list(csv.DictReader(io.StringIO(b''.join(chunks).decode())))
+    assert len(chunks) > 1  # streamed, not built in one piece
+    assert [float(row['impact_score']) for row in rows] == [n + 0.5 for n in range(IMPACTS)]
+    assert {row['user_id'] for row in rows} == {str(impacts)}
+    assert rows[0]['personal_challenge_id'] == ''
+
+
+def test_ndjson_export_has_one_object_per_line(client, impacts):
+    lines = client.get(f'/export/{impacts}/impacts?format=ndjson').data.decode().splitlines()
+
+    rows = [json.loads(line) for line in lines]
+    assert [row['water_saved'] for row in rows] == list(range(IMPACTS))
+    assert rows[0]['personal_challenge_id'] is None and rows[0]['user_id'] == impacts
+
+
+@pytest.mark.parametrize('export_format', ['csv', 'ndjson'])
+def test_gzip_export_round_trips_to_the_plain_export(client, impacts, export_format):
+    plain = client.get(f'/export/{impacts}/impacts?format={export_format}').data
+    downloaded = client.get(f'/export/{impacts}/impacts?format={export_format}&gzip=1').data
+    in_transit = client.get(f'/export/{impacts}/impacts?format={export_format}',
+                            headers={'Accept-Encoding': 'gzip'}).data
+
+    assert gzip.decompress(downloaded) == gzip.decompress(in_transit) == plain
+
+
+def test_challenges_export_lists_personal_then_community_participations(app, client, make_user,
+                                                                        make_community_challenge):
+    ana = make_user('ana')
+    community_challenge_id = make_community_challenge(ana, [ana])
+    with app.app_context():
+        challenge_id = CommunityChallenge.query.get(community_challenge_id).challenge_id
+        db.session.add(PersonalChallengeParticipant(user_id=ana, challenge_id=challenge_id,
+                                                    start_date=datetime(2026, 1, 2)))
+        db.session.add(Post(user_id=ana, content='First refill'))
+        db.session.commit()
+
+    challenges = [json.loads(line) for line in
+                  client.get(f'/export/{ana}/challenges?format=ndjson').data.decode().splitlines()]
+    posts = list(csv.DictReader(io.StringIO(client.get(f'/export/{ana}/posts').data.decode())))
+
+    assert [(row['type'], row['community_challenge_id'], row['status']) for row in challenges] == [
+        ('personal', None, None), ('community', community_challenge_id, 'active')]
+    assert challenges[0]['start_date'] == '2026-01-02T00:00:00'
+    assert [(row['username'], row['content']) for row in posts] == [('ana', 'First refill')]
+
+
+@pytest.mark.parametrize('path, status, error', [
+    ('/export/{user}/badges', 400, 'Unknown export type, expected one of: impacts, actions, posts, challenges'),
+    ('/export/{user}/impacts?format=xml', 400, 'Unknown export format, expected one of: csv, ndjson'),
+    ('/export/999/impacts', 404, 'User not found'),
+])
+def test_invalid_exports_are_rejected(client, user_id, path, status, error):
+    response = client.get(path.format(user=user_id))
+
+    assert response.status_code == status
+    assert response.json == {'error': error}
+
+
+def test_export_data_command_writes_every_user_or_one(app, impacts, tmp_path):
+    runner = app.test_cli_runner()
+    output = tmp_path / 'impacts.ndjson.gz'
+
+    result = runner.invoke(args=['export-data', 'impacts', '--format', 'ndjson', '--gzip', '--output', str(output)])
+    assert result.exit_code == 0, result.output
+    assert len(gzip.decompress(output.read_bytes()).splitlines()) == IMPACTS * 2
+
+    result = runner.invoke(args=['export-data', 'impacts', '--user-id', str(impacts)])
+    assert result.exit_code == 0, result.output
+    rows = list(csv.DictReader(io.StringIO(result.output)))
+    assert len(rows) == IMPACTS and {row['user_id'] for row in rows} == {str(impacts)}
+
+    assert runner.invoke(args=['export-data', 'badges']).exit_code == 2
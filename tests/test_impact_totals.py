@@ -0,0 +1,43 @@
+# test_impact_totals.py
+
+import pytest
+
+from extensions import db
+from models import ImpactTotals, CommunityChallengeImpactTotals, EnvironmentalImpact
+from views.environment_views import apply_impact_totals_deltas, rebuild_impact_totals, GLOBAL_IMPACT_TOTALS_ID
+
+
+def test_first_write_creates_the_totals_row_and_later_writes_add_to_it(app):
+    with app.app_context():
+        assert db.session.get(ImpactTotals, GLOBAL_IMPACT_TOTALS_ID) is None
+
+        apply_impact_totals_deltas({'impact_score': 3.0, 'refillable_bottles': 2})
+        apply_impact_totals_deltas({'impact_score': 1.5, 'water_saved': 4.0})
+        db.session.commit()
+
+        totals = db.session.get(ImpactTotals, GLOBAL_IMPACT_TOTALS_ID)
+        assert (totals.impact_score, totals.water_saved, totals.refillable_bottles) == (4.5, 4.0, 2)
+
+
+def test_log_water_usage_keeps_global_and_community_totals_in_step(app, client, make_user,
+                                                                   make_community_challenge):
+    user_id = make_user('ana')
+    community_challenge_id = make_community_challenge(user_id, [user_id])
+
+    for payload in ({'bottle_type': 'refillable', 'count': 2},
+                    {'bottle_type': 'recycled'},
+                    {'bottle_type': 'refillable', 'challenge_type': 'community', 'challenge_id': community_challenge_id}):
+        response = client.post('/log_water_usage', json={'user_id': user_id, **payload})
+        assert response.status_code == 200
+
+    with app.app_context():
+        impacts = EnvironmentalImpact.query.all()
+        assert client.get('/impact_totals').json['impact_score'] == pytest.approx(
+            sum(impact.impact_score for impact in impacts))
+
+        community = client.get(f'/impact_totals/community/{community_challenge_id}').json
+        assert community['refillable_bottles'] == 1
+        assert db.session.get(CommunityChallengeImpactTotals, community_challenge_id) is not None
+
+        # The incremental totals match a full rebuild
+        assert rebuild_impact_totals(dry_run=True) == []
@@ -0,0 +1,87 @@
+# test_import.py
+
+import io
+
+import pytest
+
+import views.import_views
+from extensions import db
+from models import EnvironmentalImpact, ImpactTotals, User
+from views.import_views import BottleLogImportError, IMPACT_STATE_FIELDS, import_bottle_logs
+
+USERNAMES = ('ana', 'ben', 'cleo')
+
+# user_id, bottle_type, count; ids follow USERNAMES, 99 is unknown and skipped
+BOTTLE_LOGS = [
+    (1, 'refillable', 2), (2, 'recycled', 1), (1, 'single-use', 1), (3, 'refillable', 5),
+    (2, 'refillable', 1), (1, 'recycled', 3), (99, 'refillable', 1), (3, 'single-use', 2),
+    (1, 'refillable', 1), (2, 'single-use', 4),
+]
+
+
+def _csv(rows):
+    return 'user_id,bottle_type,count\n' + ''.join(f'{user_id},{bottle_type},{count}\n'
+                                                   for user_id, bottle_type, count in rows)
+
+
+def _snapshot(app):
+    with app.app_context():
+        impacts = {impact.user_id: tuple(getattr(impact, field) for field in IMPACT_STATE_FIELDS)
+                   for impact in EnvironmentalImpact.query.all()}
+        eco_points = {user.username: user.eco_points for user in User.query.all()}
+        totals = db.session.get(ImpactTotals, 1)
+        return impacts, eco_points, totals.impact_score, totals.refillable_bottles
+
+
+def _make_users(app):
+    with app.app_context():
+        for username in USERNAMES:
+            db.session.add(User(username=username, email=f'{username}@example.com', password_hash='unused'))
+        db.session.commit()
+
+
+def test_bulk_import_matches_logging_every_event(make_app):
+    per_event_app, bulk_app = make_app('per_event'), make_app('bulk')
+    for app in (per_event_app, bulk_app):
+        _make_users(app)
+        # An existing record the import has to carry on from
+        app.test_client().post('/log_water_usage', json={'user_id': 2, 'bottle_type': 'refillable', 'count': 3})
+
+    client = per_event_app.test_client()
+    for user_id, bottle_type, count in BOTTLE_LOGS:
+        response = client.post('/log_water_usage',
+                               json={'user_id': user_id, 'bottle_type': bottle_type, 'count': count})
+        assert response.status_code == (404 if user_id == 99 else 200)
+
+    with bulk_app.app_context():
+        # Small chunks so the state carried between chunks is exercised too
+        assert import_bottle_logs(io.StringIO(_csv(BOTTLE_LOGS)), chunk_size=3) == (9, 1)
+
+    assert _snapshot(bulk_app) == _snapshot(per_event_app)
+
+
+def test_invalid_chunk_keeps_earlier_chunks_and_reports_them(app, client, make_user, monkeypatch):
+    for username in USERNAMES:
+        make_user(username)
+    rows = BOTTLE_LOGS[:4] + [(1, 'refillable', 'lots')] + BOTTLE_LOGS[4:]
+
+    monkeypatch.setattr(views.import_views, 'IMPORT_CHUNK_ROWS', 2)
+    response = client.post('/import_bottle_logs', data={'file': (io.BytesIO(_csv(rows).encode()), 'logs.csv')})
+
+    assert response.status_code == 422
+    assert (response.json['imported'], response.json['skipped']) == (4, 0)
+    assert response.json['failed_rows'] == {'first': 5, 'last': 6}
+    with app.app_context():
+        assert sum(impact.refillable_bottles for impact in EnvironmentalImpact.query.all()) == 7
+
+
+def test_invalid_first_chunk_is_rejected(app, client, make_user):
+    make_user('ana')
+    response = client.post('/import_bottle_logs',
+                           data={'file': (io.BytesIO(_csv([(1, 'refillable', 'lots')]).encode()), 'logs.csv')})
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert EnvironmentalImpact.query.count() == 0
+        with pytest.raises(BottleLogImportError):
+            import_bottle_logs(io.StringIO(_csv([(1, 'refillable', 'lots')])))
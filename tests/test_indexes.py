@@ -0,0 +1,58 @@
+# test_indexes.py
+# The hot queries of the views must be answered from the composite indexes declared on the models (and
+# built by migration 8d2a4b6c0e13). The SQLite plans are always checked; the MySQL half runs only when
+# TEST_MYSQL_DATABASE_URI points at a scratch MySQL schema, as no MySQL server is available by default.
+
+import os
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from extensions import db
+from models import PersonalChallengeParticipant, EnvironmentalImpact, MessagesInbox, ChallengesInbox, Post, \
+    Notification
+
+MYSQL_DATABASE_URI = os.getenv('TEST_MYSQL_DATABASE_URI')
+
+# (index that must be used, the query as the views build it)
+HOT_QUERIES = [
+    ('ix_personal_challenge_participant_user_challenge_end', lambda: PersonalChallengeParticipant.query.filter(
+        PersonalChallengeParticipant.user_id == 1, PersonalChallengeParticipant.challenge_id == 2,
+        PersonalChallengeParticipant.end_date > datetime(2026, 1, 1))),
+    ('ix_environmental_impact_user_personal_challenge',
+     lambda: EnvironmentalImpact.query.filter_by(user_id=1, personal_challenge_id=2)),
+    ('ix_environmental_impact_user_community_challenge',
+     lambda: EnvironmentalImpact.query.filter_by(user_id=1, community_challenge_id=2)),
+    ('ix_messages_inbox_sender_id', lambda: MessagesInbox.query.filter_by(sender_id=1)),
+    ('ix_messages_inbox_user_timestamp',
+     lambda: MessagesInbox.query.filter_by(user_id=1).order_by(MessagesInbox.timestamp.desc())),
+    ('ix_challenges_inbox_user_status', lambda: ChallengesInbox.query.filter_by(user_id=1, status='pending')),
+    ('ix_post_user_created_at', lambda: Post.query.filter_by(user_id=1).order_by(Post.created_at.desc())),
+    ('ix_notification_user_is_read', lambda: Notification.query.filter_by(user_id=1, is_read=False)),
+]
+
+
+def _compile(query, dialect):
+    return str(query.statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+
+
+@pytest.mark.parametrize('index, build_query', HOT_QUERIES, ids=[index for index, _ in HOT_QUERIES])
+def test_sqlite_plan_uses_the_index(app, index, build_query):
+    with app.app_context():
+        query = build_query()
+        plan = db.session.execute(text(f'EXPLAIN QUERY PLAN {_compile(query, db.engine.dialect)}')).all()
+        details = ' | '.join(row[-1] for row in plan)
+        assert f'INDEX {index} ' in details, details
+
+
+@pytest.mark.skipif(not MYSQL_DATABASE_URI, reason='set TEST_MYSQL_DATABASE_URI to check the MySQL plans')
+@pytest.mark.parametrize('index, build_query', HOT_QUERIES, ids=[index for index, _ in HOT_QUERIES])
+def test_mysql_plan_uses_the_index(app, index, build_query):
+    engine = create_engine(MYSQL_DATABASE_URI)
+    db.metadata.create_all(engine)
+    with app.app_context(), engine.connect() as connection:
+        statement = _compile(build_query(), engine.dialect)
+        keys = [row['key'] for row in connection.execute(text(f'EXPLAIN {statement}')).mappings()]
+        assert index in keys, keys
+    engine.dispose()
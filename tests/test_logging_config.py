@@ -0,0 +1,60 @@
+# test_logging_config.py
+
+import json
+import logging
+import queue
+
+from logging_config import RequestContextFilter, SamplingFilter, JSONFormatter, DeferredQueueHandler, \
+    REQUEST_ID_HEADER
+
+
+def _record(message='Refill logged', level=logging.INFO):
+    return logging.LogRecord('greenwave', level, __file__, 1, message, None, None)
+
+
+def test_request_id_is_generated_or_taken_from_the_client(client):
+    generated = client.get('/leaderboards').headers[REQUEST_ID_HEADER]
+    assert len(generated) == 32
+
+    assert client.get('/leaderboards', headers={REQUEST_ID_HEADER: 'abc123'}).headers[REQUEST_ID_HEADER] == 'abc123'
+
+
+def test_records_are_stamped_with_the_request_id_and_route(app):
+    record_filter = RequestContextFilter()
+    with app.test_request_context('/leaderboards', headers={REQUEST_ID_HEADER: 'abc123'}):
+        app.preprocess_request()
+        record = _record()
+        record_filter.filter(record)
+        assert (record.request_id, record.route) == ('abc123', '/leaderboards')
+
+    record = _record()
+    record_filter.filter(record)
+    assert (record.request_id, record.route) == ('-', '-')
+
+
+def test_json_formatter_output():
+    record = _record('Café open')
+    RequestContextFilter().filter(record)
+
+    entry = json.loads(JSONFormatter().format(record))
+    assert (entry['level'], entry['logger'], entry['message'], entry['request_id']) == \
+        ('INFO', 'greenwave', 'Café open', '-')
+
+
+def test_sampling_keeps_the_configured_fraction():
+    sampling = SamplingFilter({logging.DEBUG: 0.0, logging.INFO: 0.5})
+
+    assert not any(sampling.filter(_record(level=logging.DEBUG)) for _ in range(100))
+    assert all(sampling.filter(_record(level=logging.WARNING)) for _ in range(100))
+    assert 300 < sum(sampling.filter(_record()) for _ in range(1000)) < 700
+
+
+def test_full_queue_drops_records_instead_of_blocking():
+    handler = DeferredQueueHandler(queue.Queue(1))
+    dropped = DeferredQueueHandler.dropped
+
+    handler.emit(_record())
+    handler.emit(_record())
+
+    assert handler.queue.qsize() == 1
+    assert DeferredQueueHandler.dropped == dropped + 1
@@ -0,0 +1,53 @@
+# test_metrics.py
+
+import os
+import runpy
+import tempfile
+
+from metrics import REQUEST_COUNT, REQUEST_LATENCY, DB_STATEMENTS
+
+
+def _sample(metric, *labels):
+    return metric.labels(*labels)._value.get()
+
+
+def test_requests_and_their_statements_are_counted_per_route(client, make_user):
+    user_id = make_user('ana')
+    route = '/get_eco_points/<int:user_id>'
+    requests_before = _sample(REQUEST_COUNT, 'GET', route, '200')
+    not_found_before = _sample(REQUEST_COUNT, 'GET', route, '404')
+    statements_before = _sample(DB_STATEMENTS, route)
+
+    assert client.get(f'/get_eco_points/{user_id}').status_code == 200
+    assert client.get('/get_eco_points/999').status_code == 404
+
+    assert _sample(REQUEST_COUNT, 'GET', route, '200') == requests_before + 1
+    assert _sample(REQUEST_COUNT, 'GET', route, '404') == not_found_before + 1
+    assert _sample(DB_STATEMENTS, route) >= statements_before + 2
+
+
+def test_metrics_endpoint_exposes_the_samples(client):
+    client.get('/leaderboards')
+
+    body = client.get('/metrics').get_data(as_text=True)
+    assert 'greenwave_http_requests_total{method="GET",route="/leaderboards",status="200"}' in body
+    assert 'greenwave_http_request_duration_seconds_bucket' in body
+    assert REQUEST_LATENCY.labels('GET', '/leaderboards')._sum.get() > 0
+
+
+def test_gunicorn_config_sets_the_multiprocess_directory(monkeypatch, tmp_path):
+    config_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'gunicorn.conf.py')
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', '')
+    monkeypatch.delenv('PROMETHEUS_MULTIPROC_DIR')  # restored to its previous state at teardown
+
+    runpy.run_path(config_path)
+    assert os.environ['PROMETHEUS_MULTIPROC_DIR'] == os.path.join(tempfile.gettempdir(), 'greenwave-prometheus')
+
+    # An explicit setting wins, and the master empties the directory when it starts
+    directory = tmp_path / 'metrics'
+    directory.mkdir()
+    (directory / 'counter_1.db').write_bytes(b'stale')
+    monkeypatch.setenv('PROMETHEUS_MULTIPROC_DIR', str(directory))
+    runpy.run_path(config_path)['on_starting'](None)
+    assert os.environ['PROMETHEUS_MULTIPROC_DIR'] == str(directory)
+    assert directory.is_dir() and not any(directory.iterdir())
@@ -0,0 +1,50 @@
+# test_profiling.py
+
+import os
+
+import pytest
+
+from profiling import RouteProfiler
+
+
+@pytest.fixture
+def profiled_app(make_app, monkeypatch, tmp_path):
+    monkeypatch.setenv('PROFILE_TOKEN', 'secret')
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path / 'profiles'))
+    monkeypatch.setenv('PROFILE_MAX_FILES', '2')
+    monkeypatch.setenv('PROFILE_ALLOCATIONS', '0')
+    return make_app('profiled')
+
+
+def test_disabled_profiling_installs_nothing(app, client):
+    hooks = app.before_request_funcs.get(None, []) + app.teardown_request_funcs.get(None, [])
+    assert not any(isinstance(getattr(hook, '__self__', None), RouteProfiler) for hook in hooks)
+    assert client.get('/admin/profiles').status_code == 404
+
+
+def test_requests_with_the_token_are_profiled_and_rotated(profiled_app, tmp_path):
+    client = profiled_app.test_client()
+    for _ in range(3):
+        assert client.get('/leaderboards', headers={'X-Profile-Token': 'secret'}).status_code == 200
+    # Without the token (and with sampling off) nothing is recorded
+    client.get('/leaderboards')
+    client.get('/leaderboards', headers={'X-Profile-Token': 'wrong'})
+
+    profiles = os.listdir(tmp_path / 'profiles' / 'leaderboards')
+    assert len(profiles) == 2 and all(name.endswith('.prof') for name in profiles)
+
+    assert client.get('/admin/profiles').status_code == 403
+    top = client.get('/admin/profiles', headers={'X-Profile-Token': 'secret'}).json
+    assert [(entry['route'], entry['samples']) for entry in top['by_cumulative_time']] == [('/leaderboards', 3)]
+
+
+def test_sampling_without_a_token_is_refused(make_app, monkeypatch, caplog, tmp_path):
+    monkeypatch.setenv('PROFILE_ROUTES', '1')
+    monkeypatch.delenv('PROFILE_TOKEN', raising=False)
+    monkeypatch.setenv('PROFILE_DIR', str(tmp_path / 'profiles'))
+
+    app = make_app('sampled')
+
+    assert 'route_profiler' not in app.extensions
+    assert 'PROFILE_TOKEN is not set' in caplog.text
+    assert app.test_client().get('/admin/profiles').status_code == 404
@@ -0,0 +1,85 @@
+# test_rate_limiting.py
+
+import fakeredis
+import pytest
+import redis
+
+import rate_limiting
+from rate_limiting import InProcessLimiter, RedisLimiter, init_rate_limiting
+
+# log_water_usage admits a burst of 10 per client
+BURST = rate_limiting.RATE_LIMITS['log_water_usage'][1]
+
+
+def _log(client, user_id, address='10.0.0.1', headers=None):
+    return client.post('/log_water_usage', json={'user_id': user_id, 'bottle_type': 'refillable'},
+                       headers=headers, environ_base={'REMOTE_ADDR': address})
+
+
+@pytest.fixture
+def limited_client(app):
+    init_rate_limiting(app, InProcessLimiter())
+    return app.test_client()
+
+
+def test_client_is_limited_whatever_user_id_it_sends(limited_client, make_user):
+    user_id = make_user('ana')
+    for n in range(BURST):
+        assert _log(limited_client, user_id if n % 2 else 1000 + n).status_code in (200, 404)
+
+    rejected = _log(limited_client, 2000)
+    assert rejected.status_code == 429
+    assert int(rejected.headers['Retry-After']) >= 1
+    # Another client still gets through
+    assert _log(limited_client, user_id, address='10.0.0.2').status_code == 200
+
+
+def test_forwarded_for_is_read_from_the_trusted_proxy_hop(limited_client, monkeypatch):
+    monkeypatch.setattr(rate_limiting, 'RATE_LIMIT_TRUSTED_PROXIES', 1)
+    for n in range(BURST):
+        # The client makes up the left part of the header; the router appends the address it saw
+        _log(limited_client, 1, address='10.1.1.1', headers={'X-Forwarded-For': f'192.0.2.{n}, 203.0.113.7'})
+
+    assert _log(limited_client, 1, address='10.1.1.1',
+                headers={'X-Forwarded-For': '192.0.2.99, 203.0.113.7'}).status_code == 429
+    assert _log(limited_client, 1, address='10.1.1.1',
+                headers={'X-Forwarded-For': '203.0.113.8'}).status_code == 404
+
+
+def test_in_process_buckets_refill_over_time(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rate_limiting.time, 'monotonic', lambda: now[0])
+    limiter = InProcessLimiter()
+    limits = [('log_water_usage:client:a', 1, 2)]
+
+    assert [limiter.acquire(limits)[0] for _ in range(3)] == [True, True, False]
+    assert limiter.acquire(limits) == (False, 1.0)
+    now[0] += 1
+    assert limiter.acquire(limits) == (True, 0.0)
+
+
+def test_redis_buckets_are_shared_between_workers():
+    server = fakeredis.FakeServer()
+    workers = [RedisLimiter(fakeredis.FakeRedis(server=server)) for _ in range(2)]
+    limits = [('log_water_usage:client:a', 1, 3), ('log_water_usage:route', 100, 200)]
+
+    admitted = [workers[n % 2].acquire(limits) for n in range(4)]
+
+    assert [allowed for allowed, _ in admitted] == [True, True, True, False]
+    assert 0 < admitted[-1][1] <= 1
+    # Only admitted requests take a token from the route bucket (which refills 100 tokens a second meanwhile)
+    assert 197 <= float(fakeredis.FakeRedis(server=server).hget('ratelimit:log_water_usage:route', 'tokens')) < 199
+
+
+def test_redis_outage_admits_requests():
+    limiter = RedisLimiter(redis.Redis(port=1, socket_timeout=0.05, socket_connect_timeout=0.05))
+
+    assert limiter.acquire([('log_water_usage:client:a', 1, 1)]) == (True, 0.0)
+
+
+def test_memory_backend_warns_when_several_workers_serve(monkeypatch, caplog):
+    monkeypatch.setenv('RATE_LIMIT_BACKEND', 'memory')
+    monkeypatch.setenv('WEB_CONCURRENCY', '4')
+
+    assert isinstance(rate_limiting._create_limiter(), InProcessLimiter)
+    assert 'up to 4 times' in caplog.text
@@ -0,0 +1,69 @@
+# test_read_routing.py
+# The app runs on two SQLite databases (the routed_app fixture), a primary and a "replica" that is not
+# replicated to, so every response shows which of the two was read.
+
+import time
+
+import pytest
+
+from extensions import STICKY_HEADER, STICKY_SECONDS, db
+from models import User
+
+
+def _eco_points(client, headers=None):
+    return client.get('/view_profile/1', headers=headers).json['eco_points']
+
+
+def test_reads_go_to_the_replica_and_writes_to_the_primary(routed_app):
+    client = routed_app.test_client()
+
+    assert _eco_points(client) == 99
+    response = client.put('/update_user_profile/1', json={'profile_picture': 'ana.png'})
+
+    assert response.status_code == 200
+    with routed_app.app_context():
+        assert db.session.get(User, 1).profile_picture == 'ana.png'
+        with db.engines['replica_0'].connect() as connection:
+            assert connection.execute(User.__table__.select()).one().profile_picture is None
+
+
+def test_reads_echoing_the_sticky_header_go_to_the_primary(routed_app):
+    client = routed_app.test_client()
+
+    sticky_until = client.put('/update_user_profile/1', json={'profile_picture': 'ana.png'}).headers[STICKY_HEADER]
+
+    assert time.time() + STICKY_SECONDS - 1 < float(sticky_until) <= time.time() + STICKY_SECONDS + 1
+    assert _eco_points(client, {STICKY_HEADER: sticky_until}) == 5
+    # Without the header, e.g. another client, reads stay on the replica
+    assert _eco_points(client) == 99
+
+
+@pytest.mark.parametrize('sticky_until', [
+    lambda: time.time() - 1,  # expired
+    lambda: time.time() + STICKY_SECONDS * 100,  # longer than any window the app hands out
+    lambda: 'soon',
+])
+def test_expired_or_forged_windows_read_the_replica(routed_app, sticky_until):
+    client = routed_app.test_client()
+
+    assert _eco_points(client, {STICKY_HEADER: str(sticky_until())}) == 99
+
+
+def test_failed_writes_send_no_header(routed_app):
+    assert STICKY_HEADER not in routed_app.test_client().put('/update_user_profile/2', json={}).headers
+
+
+def test_single_database_apps_send_no_header(client, make_user):
+    make_user('ana')
+
+    assert STICKY_HEADER not in client.put('/update_user_profile/1', json={}).headers
+
+
+def test_writes_in_a_batch_are_read_back_from_the_primary(routed_app):
+    response = routed_app.test_client().post('/batch', json={'requests': [
+        {'method': 'GET', 'path': '/view_profile/1'},
+        {'method': 'PUT', 'path': '/update_user_profile/1', 'body': {'profile_picture': 'ana.png'}},
+        {'method': 'GET', 'path': '/view_profile/1'}]})
+
+    assert [item['body'].get('eco_points') for item in response.json['responses']] == [99, None, 5]
+    assert STICKY_HEADER in response.headers
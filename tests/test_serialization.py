@@ -0,0 +1,63 @@
+# test_serialization.py
+# FastJSONProvider and rows_response must produce exactly the bytes Flask's DefaultJSONProvider would.
+
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+from flask.json.provider import DefaultJSONProvider
+
+from serialization import RowSerializer, rows_response
+
+PAYLOADS = [
+    {'username': 'zoë', 'bio': 'Café ☕ — refill 🚰', 'emoji_key_ä': None},
+    {'b': 2, 'a': [1, 2.5, -0.0, 0.1, 1 / 3, 123456.789, 1e15, 3.0], 'c': {'z': None, 'y': True, 'x': False}},
+    {'created_at': datetime(2026, 3, 4, 5, 6, 7), 'aware': datetime(2026, 3, 4, 5, 6, 7, tzinfo=timezone.utc),
+     'day': date(2026, 3, 4)},
+    {'id': uuid.UUID('12345678-1234-5678-1234-567812345678'), 'amount': Decimal('12.50')},
+    [1, 'two', None, 2 ** 63, -(2 ** 40)],
+    {2: 'integer keys', 10: 'ascii only'},
+    'a "quoted" \\ string with\ncontrol\tcharacters\x01',
+]
+
+
+@pytest.mark.parametrize('payload', PAYLOADS)
+def test_fast_provider_matches_flask_default_byte_for_byte(app, payload):
+    with app.app_context():
+        default = DefaultJSONProvider(app)
+        assert app.json.dumps(payload) == default.dumps(payload)
+        assert app.json.response(payload).get_data() == default.response(payload).get_data()
+
+
+ROWS = [
+    (1, 'zoë', 'Café ☕', None, 2.5, datetime(2026, 3, 4, 5, 6, 7)),
+    (2, 'ben', 'plain "text"', True, 0.1, date(2026, 3, 4)),
+    (3, 'cleo', '', False, 1 / 3, None),
+]
+
+
+# Non-ASCII rows take the template encoder, ASCII rows orjson
+@pytest.mark.parametrize('rows', [ROWS, ROWS[1:]])
+def test_rows_response_matches_jsonify_of_the_row_dicts(app, rows):
+    serializer = RowSerializer('id', 'username', 'content', 'flag', 'score', 'when')
+    with app.test_request_context():
+        default = DefaultJSONProvider(app)
+        response, status = rows_response(serializer, rows)
+        assert status == 200
+        assert response.get_data() == default.response([serializer.to_dict(row) for row in rows]).get_data()
+        assert [serializer.encode_row(row) for row in rows] == [default.dumps(serializer.to_dict(row),
+                                                                              separators=(',', ':'))
+                                                                 for row in rows]
+        assert response.mimetype == 'application/json'
+
+
+def test_row_endpoints_match_default_provider(app, client, make_user):
+    ana = make_user('zoë')
+    client.post('/create_post', json={'user_id': ana, 'content': 'Café ☕ refill'})
+    client.post('/log_water_usage', json={'user_id': ana, 'bottle_type': 'refillable', 'count': 3})
+
+    for path in ('/get_users', '/view_posts', f'/get_impact/{ana}'):
+        body = client.get(path).get_data()
+        with app.app_context():
+            assert body == DefaultJSONProvider(app).response(app.json.loads(body)).get_data(), path
@@ -0,0 +1,382 @@
+# test_trigger_pr_merge.py
+# The webhook receiver runs on a local ThreadingHTTPServer and is called over HTTP, like Slack and GitHub
+# would call it. The GitHub and Slack APIs are replaced by StandInAPI, a local server that records every
+# call, so the tests can count the API calls a merge cycle makes.
+
+import hashlib
+import hmac
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+import requests
+
+import trigger_pr_merge
+from trigger_pr_merge import GitHubClient, MergeNotifier, ProcessedPRStore, WebhookHandler
+
+SLACK_SECRET = 'slack-secret'
+GITHUB_SECRET = 'github-secret'
+CHANNEL = 'C0123'
+
+
+def _serve(handler):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+    threading.Thread(target=server.serve_forever, args=(0.01,), daemon=True).start()
+    return server, f'http://127.0.0.1:{server.server_port}'
+
+
+class StandInAPI:
+    """Local stand-in for the GitHub (/github/...) and Slack (/slack/...) APIs.
+
+    Every call is recorded in `calls` as (method, path, status). Dispatching the merge workflow merges the PR
+    and adds a successful run for it, like the real workflow would.
+    """
+
+    def __init__(self):
+        self.calls = []
+        self.pulls = {}  # PR number -> pull request json
+        self.workflow_runs = []  # newest first
+        self.reactions = {}  # message ts -> thumbs-up count
+        self.messages = []  # channel history, newest first
+        self.server, self.url = _serve(self._handler())
+
+    def count(self, prefix, status=None):
+        return sum(1 for _, path, code in self.calls if path.startswith(prefix) and status in (None, code))
+
+    def _handler(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlsplit(self.path)
+                query = {key: values[0] for key, values in parse_qs(url.query).items()}
+                status, data = api.get(url.path, query)
+                self._reply(url.path, status, data)
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+                if self.path.endswith('/dispatches'):
+                    api.merge(body['inputs']['prNumber'])
+                self._reply(self.path, 204, None)
+
+            def _reply(self, path, status, data):
+                body = json.dumps(data).encode() if data is not None else b''
+                etag = '"%s"' % hashlib.sha1(body).hexdigest() if path.startswith('/github/') else None
+                if etag and status == 200 and self.headers.get('If-None-Match') == etag:
+                    status, body = 304, b''
+                api.calls.append((self.command, path, status))
+                self.send_response(status)
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def get(self, path, query):
+        if '/pulls/' in path:
+            pull = self.pulls.get(path.rsplit('/', 1)[1])
+            return (200, pull) if pull else (404, {'message': 'Not Found'})
+        if path.endswith('/runs'):
+            return 200, {'workflow_runs': self.workflow_runs}
+        if path == '/slack/reactions.get':
+            count = self.reactions.get(query['timestamp'], 0)
+            return 200, {'ok': True, 'message': {'reactions': [{'name': '+1', 'count': count}] if count else []}}
+        if path == '/slack/conversations.history':
+            messages = [message for message in self.messages
+                        if float(message['ts']) > float(query.get('oldest', 0))]
+            start, limit = int(query.get('cursor', 0)), int(query['limit'])
+            page, has_more = messages[start:start + limit], start + limit < len(messages)
+            return 200, {'ok': True, 'messages': page, 'has_more': has_more,
+                         'response_metadata': {'next_cursor': str(start + limit) if has_more else ''}}
+        return 404, {'message': 'Not Found'}
+
+    def merge(self, pr_number):
+        self.pulls[pr_number] = dict(self.pulls[pr_number], state='closed', merged=True, mergeable_state='unknown')
+        title = f'Merge pull request #{pr_number} from ana/refill'
+        self.workflow_runs.insert(0, {'status': 'completed', 'conclusion': 'success', 'display_title': title,
+                                      'head_commit': {'message': title}})
+
+    def add_pr_message(self, pr_number, ts, thumbs_up=1):
+        self.pulls[str(pr_number)] = {'number': pr_number, 'state': 'open', 'merged': False,
+                                      'mergeable_state': 'clean'}
+        self.reactions[ts] = thumbs_up
+        message = {'ts': ts, 'attachments': [{'pretext': 'Pull Request Opened',
+                                              'title': f'Pull Request #{pr_number}'}]}
+        self.messages.insert(0, message)
+        return message
+
+
+@pytest.fixture
+def api(monkeypatch, tmp_path):
+    """Points trigger_pr_merge at a StandInAPI and an empty processed PR file."""
+    api = StandInAPI()
+    monkeypatch.setattr(trigger_pr_merge, 'github', GitHubClient(api_url=api.url + '/github', headers={}))
+    monkeypatch.setattr(trigger_pr_merge, 'CONVERSATIONS_HISTORY_URL', api.url + '/slack/conversations.history')
+    monkeypatch.setattr(trigger_pr_merge, 'REACTIONS_GET_URL', api.url + '/slack/reactions.get')
+    monkeypatch.setattr(trigger_pr_merge, 'SLACK_CHANNEL_ID', CHANNEL)
+    monkeypatch.setattr(trigger_pr_merge, 'processed_prs', ProcessedPRStore(str(tmp_path / 'processed.txt')))
+    yield api
+    api.server.shutdown()
+    api.server.server_close()
+
+
+@pytest.fixture
+def receiver(monkeypatch):
+    """Webhook receiver with fresh secrets, queue and notifier, returns its base URL."""
+    monkeypatch.setattr(trigger_pr_merge, 'SLACK_SIGNING_SECRET', SLACK_SECRET)
+    monkeypatch.setattr(trigger_pr_merge, 'GITHUB_WEBHOOK_SECRET', GITHUB_SECRET)
+    monkeypatch.setattr(trigger_pr_merge, 'SLACK_CHANNEL_ID', CHANNEL)
+    monkeypatch.setattr(trigger_pr_merge, 'merge_notifier', MergeNotifier())
+    monkeypatch.setattr(trigger_pr_merge, 'reaction_queue', queue.Queue())
+    monkeypatch.setattr(trigger_pr_merge, 'queued_messages', set())
+    server, url = _serve(WebhookHandler)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+def _post_slack(url, payload, timestamp=None, secret=SLACK_SECRET):
+    body = json.dumps(payload).encode()
+    timestamp = str(int(time.time()) if timestamp is None else timestamp)
+    signature = 'v0=' + hmac.new(secret.encode(), b'v0:' + timestamp.encode() + b':' + body,
+                                 hashlib.sha256).hexdigest()
+    return requests.post(url + trigger_pr_merge.SLACK_EVENTS_PATH, data=body, headers={
+        'X-Slack-Request-Timestamp': timestamp, 'X-Slack-Signature': signature})
+
+
+def _post_github(url, event_type, payload, secret=GITHUB_SECRET):
+    body = json.dumps(payload).encode()
+    signature = 'sha256=' + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return requests.post(url + trigger_pr_merge.GITHUB_WEBHOOK_PATH, data=body, headers={
+        'X-GitHub-Event': event_type, 'X-Hub-Signature-256': signature})
+
+
+def _reaction(ts='1700000000.000100'):
+    return {'event': {'type': 'reaction_added', 'reaction': '+1',
+                      'item': {'type': 'message', 'channel': CHANNEL, 'ts': ts}}}
+
+
+def test_signed_slack_reaction_is_queued_once(receiver):
+    assert _post_slack(receiver, _reaction()).status_code == 200
+    assert _post_slack(receiver, _reaction()).status_code == 200
+
+    assert list(trigger_pr_merge.reaction_queue.queue) == ['1700000000.000100']
+    response = _post_slack(receiver, {'type': 'url_verification', 'challenge': 'abc'})
+    assert response.json() == {'challenge': 'abc'}
+
+
+@pytest.mark.parametrize('timestamp, secret', [
+    (None, 'wrong-secret'),
+    (int(time.time()) - trigger_pr_merge.SLACK_MAX_REQUEST_AGE - 60, SLACK_SECRET),  # replayed request
+])
+def test_slack_request_with_bad_signature_or_old_timestamp_is_rejected(receiver, timestamp, secret):
+    response = _post_slack(receiver, _reaction(), timestamp=timestamp, secret=secret)
+
+    assert response.status_code == 401
+    assert trigger_pr_merge.reaction_queue.empty()
+
+
+def test_signed_github_merge_events_wake_the_waiting_worker(receiver):
+    notifier = trigger_pr_merge.merge_notifier
+    run = {'action': 'completed', 'workflow_run': {
+        'conclusion': 'success', 'head_commit': {'message': 'Merge pull request #41 from ana/refill'},
+        'display_title': 'Merge pull request #41 from ana/refill'}}
+    pull_request = {'action': 'closed', 'pull_request': {'number': 42, 'merged': True}}
+
+    assert _post_github(receiver, 'workflow_run', run).status_code == 200
+    assert _post_github(receiver, 'pull_request', pull_request).status_code == 200
+
+    assert notifier.wait(41, timeout=0) and notifier.wait(42, timeout=0)
+    assert notifier._events == notifier._early == {}
+
+
+def test_github_request_with_bad_signature_is_rejected(receiver, monkeypatch):
+    pull_request = {'action': 'closed', 'pull_request': {'number': 42, 'merged': True}}
+
+    assert _post_github(receiver, 'pull_request', pull_request, secret='wrong-secret').status_code == 401
+    monkeypatch.setattr(trigger_pr_merge, 'GITHUB_WEBHOOK_SECRET', None)
+    assert _post_github(receiver, 'pull_request', pull_request).status_code == 401
+    assert not trigger_pr_merge.merge_notifier.wait(42, timeout=0)
+
+
+def test_notifications_nobody_waits_for_expire(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(trigger_pr_merge.time, 'monotonic', lambda: now[0])
+    notifier = MergeNotifier()
+
+    for pr_number in range(100):
+        notifier.notify(pr_number)
+    now[0] += MergeNotifier.EARLY_NOTIFY_TTL + 1
+    notifier.notify(100)
+
+    assert list(notifier._early) == ['100'] and notifier._events == {}
+    assert not notifier.wait(99, timeout=0)
+
+
+def test_notify_wakes_a_waiting_worker():
+    notifier = MergeNotifier()
+    woke = []
+    waiter = threading.Thread(target=lambda: woke.append(notifier.wait(7, timeout=5)))
+    waiter.start()
+    while '7' not in notifier._events:
+        time.sleep(0.001)
+
+    notifier.notify(7)
+    waiter.join()
+
+    assert woke == [True]
+    assert notifier._events == notifier._early == {}
+
+
+def test_approved_pr_is_merged_with_one_call_per_step(api):
+    message = api.add_pr_message(12, '1700000000.000100')
+
+    assert trigger_pr_merge.handle_pr_message(message, trigger_pr_merge.processed_prs)
+
+    assert api.count('/slack/') == 1  # reactions.get
+    # PR state once for all the pre-merge checks, dispatch, the run list, and PR state again after the merge
+    assert [(method, path.rsplit('/', 1)[1]) for method, path, _ in api.calls if path.startswith('/github/')] == [
+        ('GET', '12'), ('POST', 'dispatches'), ('GET', 'runs'), ('GET', '12')]
+    assert '12' in trigger_pr_merge.processed_prs
+
+    # The next cycle finds the PR in the processed file and calls nothing
+    calls = len(api.calls)
+    assert trigger_pr_merge.handle_pr_message(message, trigger_pr_merge.processed_prs)
+    assert len(api.calls) == calls
+
+
+def test_unapproved_pr_is_only_looked_up(api):
+    message = api.add_pr_message(13, '1700000000.000200', thumbs_up=0)
+
+    assert not trigger_pr_merge.handle_pr_message(message, trigger_pr_merge.processed_prs)
+    trigger_pr_merge.handle_pr_message(message, trigger_pr_merge.processed_prs)
+
+    # one PR lookup per cycle to notice a closed PR, revalidated as a free 304 while nothing changes
+    assert api.count('/slack/') == 2
+    assert [(method, status) for method, path, status in api.calls if path.startswith('/github/')] == [
+        ('GET', 200), ('GET', 304)]
+
+
+@pytest.mark.parametrize('pull', [{'state': 'closed', 'merged': False}, None])
+def test_closed_or_missing_pr_is_dropped_without_slack_calls(api, monkeypatch, pull):
+    message = api.add_pr_message(15, '1700000000.000400')
+    if pull is None:
+        del api.pulls['15']
+    else:
+        api.pulls['15'].update(pull)
+    monkeypatch.setattr(trigger_pr_merge, 'pending_pr_messages', {'15': message})
+
+    trigger_pr_merge.run_pr_message(message, '15', 1)
+
+    assert trigger_pr_merge.pending_pr_messages == {}
+    assert api.count('/slack/') == 0 and api.count('/github/') == 1
+
+
+def test_approved_pr_that_is_not_mergeable_does_not_wait(api, monkeypatch):
+    message = api.add_pr_message(16, '1700000000.000500')
+    api.pulls['16']['mergeable_state'] = 'dirty'
+    monkeypatch.setattr(trigger_pr_merge, 'wait_for_pr_to_merge', lambda *args: pytest.fail('waited for a merge'))
+
+    assert not trigger_pr_merge.handle_pr_message(message, trigger_pr_merge.processed_prs)
+    assert api.count('/github/') == 1 and '16' not in trigger_pr_merge.processed_prs
+
+
+def test_pending_pr_messages_expire(api, monkeypatch):
+    monkeypatch.setattr(trigger_pr_merge, 'pending_pr_messages', {})
+    now = 1700000000 + trigger_pr_merge.PENDING_PR_MAX_AGE
+    old = api.add_pr_message(17, '1699999999.000100')
+    recent = api.add_pr_message(18, '1700000001.000100')
+
+    assert trigger_pr_merge.update_pending_pr_messages([old, recent], now) == [recent]
+    assert trigger_pr_merge.update_pending_pr_messages([], now + 2) == []
+    assert trigger_pr_merge.pending_pr_messages == {}
+
+
+def test_pr_in_flight_is_dispatched_once_and_prs_merge_concurrently(api, monkeypatch):
+    monkeypatch.setattr(trigger_pr_merge, 'in_flight_prs', set())
+    first, second = api.add_pr_message(31, '1700000000.000600'), api.add_pr_message(32, '1700000000.000700')
+    monkeypatch.setattr(trigger_pr_merge, 'pending_pr_messages', {'31': first, '32': second})
+    dispatching, release = threading.Semaphore(0), threading.Event()
+    trigger_github_workflow = trigger_pr_merge.trigger_github_workflow
+
+    def held_dispatch(pr_number):
+        dispatching.release()
+        assert release.wait(5)
+        trigger_github_workflow(pr_number)
+
+    monkeypatch.setattr(trigger_pr_merge, 'trigger_github_workflow', held_dispatch)
+
+    future = trigger_pr_merge.submit_pr_message(first)
+    assert dispatching.acquire(timeout=5)
+    assert trigger_pr_merge.submit_pr_message(first) is None  # still in flight
+    other = trigger_pr_merge.submit_pr_message(second)
+    assert dispatching.acquire(timeout=5)  # both PRs are past their checks at the same time
+    release.set()
+    future.result(timeout=10)
+    other.result(timeout=10)
+
+    assert api.count('/github/', status=204) == 2  # one dispatch per PR
+    assert '31' in trigger_pr_merge.processed_prs and '32' in trigger_pr_merge.processed_prs
+    assert trigger_pr_merge.in_flight_prs == set() and trigger_pr_merge.pending_pr_messages == {}
+
+
+def test_unchanged_responses_are_revalidated_with_their_etag(api):
+    api.add_pr_message(14, '1700000000.000300')
+    github = trigger_pr_merge.github
+
+    first = github.get_pull(14)
+    github.new_cycle()
+    second = github.get_pull(14)
+    assert github.get_workflow_runs('codeql_workflow.yml', 'push') == []
+    assert github.get_workflow_runs('codeql_workflow.yml', 'push') == []
+
+    assert first == second == (200, api.pulls['14'])
+    assert [status for _, _, status in api.calls] == [200, 304, 200, 304]
+
+    # A changed resource is downloaded again
+    api.merge('14')
+    github.new_cycle()
+    assert github.get_pull(14)[1]['merged'] is True
+    assert len(github.get_workflow_runs('codeql_workflow.yml', 'push')) == 1
+    assert [status for _, _, status in api.calls[4:]] == [200, 200]
+
+
+def test_store_drops_a_truncated_trailing_line(tmp_path):
+    path = tmp_path / 'processed.txt'
+    path.write_bytes(b'10,1700000000.000100\n11,1700000000.000200%\n12,17000')  # crash mid-append
+
+    store = ProcessedPRStore(str(path))
+
+    assert '10' in store and '11' in store and '12' not in store
+    assert store.watermark() == '1700000000.000200'
+    assert path.read_bytes() == b'10,1700000000.000100\n11,1700000000.000200%\n'
+
+    store.add(12, '1700000000.000300')
+    store.add(12, '1700000000.000300')
+    reloaded = ProcessedPRStore(str(path))
+    assert len(reloaded) == 3 and reloaded.latest() == {'12': '1700000000.000300'}
+    assert path.read_bytes().endswith(b'\n11,1700000000.000200%\n12,1700000000.000300\n')
+
+
+def test_new_pr_messages_are_collected_across_history_pages(api, monkeypatch):
+    monkeypatch.setattr(trigger_pr_merge, 'SLACK_HISTORY_PAGE_SIZE', 2)
+    for n in range(1, 8):
+        api.add_pr_message(20 + n, f'1700000000.00{n}000')
+        api.messages.insert(0, {'ts': f'1700000000.00{n}500', 'text': 'Deploy finished'})
+
+    messages = trigger_pr_merge.find_new_pr_opened_messages(CHANNEL, oldest_ts='1700000000.001500')
+
+    # 12 newer messages, two per page
+    assert api.count('/slack/conversations.history') == 6
+    assert [trigger_pr_merge.extract_pr_number(message) for message in messages] == [
+        '22', '23', '24', '25', '26', '27']
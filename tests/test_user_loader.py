@@ -0,0 +1,74 @@
+# test_user_loader.py
+
+import pytest
+from sqlalchemy import event
+
+from extensions import db
+from user_loader import UserLoader, user_summary_cache
+
+
+def _statements(app, client, path):
+    """Runs GET path and returns (response, number of SQL statements it executed)."""
+    statements = []
+
+    def count(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        response = client.get(path)
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+    return response, len(statements)
+
+
+@pytest.fixture
+def social_graph(client, make_user):
+    """Returns a function building a user with `size` friends who each sent and received a message."""
+    def social_graph(name, size):
+        user_id = make_user(name)
+        for n in range(size):
+            friend_id = make_user(f'{name}_friend{n}')
+            client.post(f'/add_friend/{user_id}/{friend_id}')
+            client.post('/send_message', json={'sender_id': friend_id, 'recipient_id': user_id, 'content': 'Hi'})
+            client.post('/send_message', json={'sender_id': user_id, 'recipient_id': friend_id, 'content': 'Hey'})
+        return user_id
+    return social_graph
+
+
+@pytest.mark.parametrize('path', ['/get_friendships/{user}', '/sent_messages/{user}', '/received_messages/{user}'])
+def test_user_lookups_do_not_grow_with_the_number_of_rows(app, client, social_graph, path):
+    small, large = social_graph('ana', 2), social_graph('ben', 8)
+
+    user_summary_cache.invalidate_all()
+    small_response, small_statements = _statements(app, client, path.format(user=small))
+    user_summary_cache.invalidate_all()
+    large_response, large_statements = _statements(app, client, path.format(user=large))
+
+    assert small_response.status_code == large_response.status_code == 200
+    assert small_statements == large_statements <= 2
+    assert len(str(large_response.json)) > len(str(small_response.json))
+
+
+def test_summaries_are_shared_across_requests(app, client, social_graph):
+    user_id = social_graph('ana', 3)
+    user_summary_cache.invalidate_all()
+
+    _, cold = _statements(app, client, f'/received_messages/{user_id}')
+    _, warm = _statements(app, client, f'/received_messages/{user_id}')
+
+    assert warm == cold - 1
+
+
+def test_loader_batches_primed_ids_and_returns_none_for_missing_users(app, make_user):
+    ana, ben = make_user('ana'), make_user('ben')
+    with app.app_context():
+        loader = UserLoader()
+        loader.prime([ana, ben, 999, None])
+
+        assert loader.get(ana).username == 'ana'
+        assert loader.get(999) is None
+        assert loader.load_many([ben, 999]) == {ben: loader.get(ben), 999: None}
+        assert loader.username(ben) == 'ben'
@@ -0,0 +1,146 @@
+# test_username_index.py
+
+import random
+import threading
+
+import pytest
+
+import username_index as username_index_module
+from extensions import db
+from models import User
+from username_index import BKTree, UsernameIndex
+
+
+def _add_users(app, users):
+    with app.app_context():
+        db.session.execute(User.__table__.insert(), [
+            {'id': user_id, 'username': username, 'email': f'{user_id}@example.com', 'eco_points': eco_points}
+            for user_id, username, eco_points in users])
+        db.session.commit()
+
+
+def _expected(users, prefix, limit):
+    matches = [user for user in users if user[1].lower().startswith(prefix)]
+    matches.sort(key=lambda user: (user[1].lower() != prefix, -user[2], user[1].lower(), user[0]))
+    return matches[:limit]
+
+
+@pytest.fixture
+def population(app, monkeypatch):
+    """1200 users, most of them starting with 'a', so 'a' and 'an' are ranked from precomputed top lists."""
+    monkeypatch.setattr(username_index_module, 'AUTOCOMPLETE_SCAN_LIMIT', 100)
+    rng = random.Random(7)
+    users = [(user_id, ''.join(rng.choice('an') for _ in range(rng.randint(1, 6))) + str(user_id),
+              rng.randint(0, 500)) for user_id in range(1, 1200)]
+    users.append((1200, 'An', 3))
+    _add_users(app, users)
+    return users
+
+
+@pytest.mark.parametrize('prefix', ['a', 'an', 'ann', 'n', 'annan', 'b'])
+def test_complete_ranks_every_match_of_every_prefix(app, population, prefix):
+    index = UsernameIndex()
+    with app.app_context():
+        results = index.complete(prefix, 20)
+
+    assert [user_id for user_id, _, _ in results] == [user[0] for user in _expected(population, prefix, 20)]
+
+
+def test_users_added_between_reloads_are_ranked(app, population):
+    index = UsernameIndex()
+    with app.app_context():
+        index.complete('a')
+        assert 'a' in index._top
+        index.add(5000, 'Aardvark', 10_000)
+        index.add(5001, 'anna', 2.5)  # float eco points must not break the int arrays
+
+        assert index.complete('a', 1) == [(5000, 'Aardvark', 10_000)]
+        assert index.complete('anna', 1) == [(5001, 'anna', 2)]
+
+
+def test_float_eco_points_are_loaded(app):
+    _add_users(app, [(1, 'ana', 12)])
+    with app.app_context():
+        db.session.execute(User.__table__.update().values(eco_points=12.75))
+        db.session.commit()
+        assert UsernameIndex().complete('an') == [(1, 'ana', 12)]
+
+
+def test_stale_index_reloads_in_the_background(app, monkeypatch):
+    _add_users(app, [(1, 'ana', 10)])
+    index = UsernameIndex(max_age=0)
+    with app.app_context():
+        assert index.complete('a') == [(1, 'ana', 10)]
+        db.session.execute(User.__table__.update().values(eco_points=20))
+        db.session.commit()
+
+        loading = threading.Event()
+        release = threading.Event()
+        load = index._load
+
+        def slow_load():
+            loading.set()
+            release.wait(5)
+            load()
+
+        monkeypatch.setattr(index, '_load', slow_load)
+        # The request that notices the index is stale answers from the current data right away
+        assert index.complete('a') == [(1, 'ana', 10)]
+        assert loading.wait(5)
+        assert index._reloader is not threading.current_thread()
+        release.set()
+        index._reloader.join(5)
+
+        index.max_age = 300
+        assert index.complete('a') == [(1, 'ana', 20)]
+
+
+
+def _random_words(seed, count, letters='abcde'):
+    rng = random.Random(seed)
+    return {''.join(rng.choice(letters) for _ in range(rng.randint(1, 7))) for _ in range(count)}
+
+
+def test_bk_tree_search_matches_brute_force():
+    words = _random_words(3, 2000)
+    tree = BKTree()
+    for word in words:
+        tree.add(word)
+
+    for query in ['abc', 'eeee', 'a', 'badcab', 'zz']:
+        for max_distance in range(4):
+            expected = {(tree.distance(query, word), word) for word in words
+                        if tree.distance(query, word) <= max_distance}
+            assert sorted(tree.search(query, max_distance)) == sorted(expected)
+
+
+def test_fuzzy_search_answers_the_same_before_and_after_the_tree_is_built(app):
+    words = sorted(_random_words(5, 300))
+    _add_users(app, [(user_id, word.capitalize(), user_id % 4) for user_id, word in enumerate(words, 1)])
+    index = UsernameIndex()
+    with app.app_context():
+        before = [index.fuzzy_search(query, 2) for query in ('abc', 'Dead', 'ea')]
+        index._fuzzy_builder.join(5)
+        assert index._fuzzy_tree is not None
+        after = [index.fuzzy_search(query, 2) for query in ('abc', 'Dead', 'ea')]
+
+        index.add(1000, 'Abcx', 7)
+        assert (1000, 'Abcx', 7, 1) in index.fuzzy_search('abc', 1)
+
+    assert before == after
+    assert all(distance <= 2 for matches in after for _, _, _, distance in matches)
+
+
+def test_search_route_returns_fuzzy_matches_closest_first(client, make_user, make_community_challenge):
+    ana = make_user('ana', eco_points=5)
+    make_user('anna', eco_points=50)
+    make_user('hannah')
+    make_community_challenge(ana)
+
+    response = client.get('/search?query=Ana&fuzzy=1')
+
+    assert response.status_code == 200
+    assert response.json['users'] == [{'id': ana, 'username': 'ana', 'distance': 0},
+                                      {'id': ana + 1, 'username': 'anna', 'distance': 1}]
+    assert client.get('/search?query=Refill&fuzzy=1').json['challenges'] == [{'id': 1, 'name': 'Refill week'}]
+    assert client.get('/search?query=ana&fuzzy=1&max_distance=-1').status_code == 400
@@ -1,9 +1,17 @@
 # trigger_pr_merge.py
 
+import hashlib
+import hmac
+import json
+import queue
 import requests
+import threading
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
 
 # load_dotenv()  # only needed locally Heroku does not need it
 
@@ -15,11 +23,30 @@ SLACK_BOT_TOKEN = os.getenv('SLACK_BOT_TOKEN')
 GITHUB_REPO = "kenny-ahmedd/GreenWave-sustainability-tracker-app"
 GITHUB_WORKFLOW_ID = "dispatch_merge_pr_workflow.yml"
 GITHUB_TOKEN = os.getenv('GITHUB_TOKEN')
+# workflow whose push runs on main show that a merge commit landed ("Merge pull request #N")
+GITHUB_MERGE_CHECK_WORKFLOW = os.getenv('GITHUB_MERGE_CHECK_WORKFLOW', "codeql_workflow.yml")
+GITHUB_API_URL = "https://api.github.com"
+
+# Trigger mode: 'poll' (default) checks Slack every minute, 'webhook' runs an HTTP receiver for Slack
+# reaction events and GitHub workflow_run/pull_request webhooks and makes no API calls while idle
+TRIGGER_MODE = os.getenv('TRIGGER_MODE', 'poll')
+WEBHOOK_HOST = os.getenv('WEBHOOK_HOST', '0.0.0.0')
+WEBHOOK_PORT = int(os.getenv('WEBHOOK_PORT', os.getenv('PORT', 8080)))
+SLACK_SIGNING_SECRET = os.getenv('SLACK_SIGNING_SECRET')
+GITHUB_WEBHOOK_SECRET = os.getenv('GITHUB_WEBHOOK_SECRET')
+SLACK_EVENTS_PATH = "/slack/events"
+GITHUB_WEBHOOK_PATH = "/github/webhook"
+SLACK_MAX_REQUEST_AGE = 300  # seconds, older signed Slack requests are rejected as replays
+
+# Number of PRs evaluated and merged at the same time
+MERGE_WORKERS = int(os.getenv('MERGE_WORKERS', 4))
+SLACK_HISTORY_PAGE_SIZE = 200
+# PR messages older than this are no longer checked, so a PR that never gets merged stops being polled
+PENDING_PR_MAX_AGE = int(os.getenv('PENDING_PR_MAX_AGE', 7 * 24 * 3600))  # seconds
 
 # API endpoints
 CONVERSATIONS_HISTORY_URL = "https://slack.com/api/conversations.history"
 REACTIONS_GET_URL = "https://slack.com/api/reactions.get"
-GITHUB_DISPATCH_URL = f"https://api.github.com/repos/{GITHUB_REPO}/actions/workflows/{GITHUB_WORKFLOW_ID}/dispatches"
 
 # Headers
 slack_headers = {
@@ -31,6 +58,136 @@ github_headers = {
     "Accept": "application/vnd.github.v3+json"
 }
 
+
+
+class GitHubClient:
+    """GitHub REST client shared by every check in this script.
+
+    - one pooled requests.Session, so connections are reused instead of reopened for every call
+    - GET responses are remembered with their ETag and revalidated with If-None-Match; a 304 reuses the
+      remembered body and does not count against the rate limit
+    - PR state is cached for the current cycle of the calling thread (new_cycle() starts one), so the
+      mergeability and merged checks of one PR share a single request
+    - when the X-RateLimit-* headers say the quota is used up, calls wait for the reset instead of failing,
+      and throttled or 5xx responses are retried with exponential backoff
+    """
+
+    MAX_RETRIES = 5
+    BASE_BACKOFF = 1  # seconds, doubled on every retry
+    MAX_BACKOFF = 300  # never sleep longer than this for one retry
+    MAX_ETAGS = 256
+    TIMEOUT = 10
+
+    def __init__(self, api_url=GITHUB_API_URL, repo=GITHUB_REPO, headers=None):
+        self.api_url = api_url
+        self.repo = repo
+        self.session = requests.Session()
+        self.session.headers.update(headers if headers is not None else github_headers)
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=MERGE_WORKERS + 1)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.etags = {}  # (url, params) -> (etag, status code, json body), guarded by _lock
+        self._lock = threading.Lock()  # the merge pool threads share etags and request_count
+        self._local = threading.local()  # per thread: pull_cache, PR number -> (status code, json body)
+        self.rate_limit_remaining = None
+        self.rate_limit_reset = None
+        self.request_count = 0
+
+    @property
+    def pull_cache(self):
+        if not hasattr(self._local, "pull_cache"):
+            self._local.pull_cache = {}
+        return self._local.pull_cache
+
+    def new_cycle(self):
+        self.pull_cache.clear()
+
+    def get_pull(self, pr_number, refresh=False):
+        pr_number = str(pr_number)
+        if refresh or pr_number not in self.pull_cache:
+            self.pull_cache[pr_number] = self.get_json(f"{self.api_url}/repos/{self.repo}/pulls/{pr_number}")
+        return self.pull_cache[pr_number]
+
+    # lists the runs of one workflow for one event, newest first
+    def get_workflow_runs(self, workflow_id, event, branch="main", per_page=20):
+        params = {"event": event, "branch": branch, "per_page": per_page}
+        status, data = self.get_json(f"{self.api_url}/repos/{self.repo}/actions/workflows/{workflow_id}/runs",
+                                     params)
+        return data.get("workflow_runs", []) if status == 200 else []
+
+    def dispatch_workflow(self, workflow_id, ref, inputs):
+        return self.request("POST", f"{self.api_url}/repos/{self.repo}/actions/workflows/{workflow_id}/dispatches",
+                            json={"ref": ref, "inputs": inputs})
+
+    # conditional GET, returns (status code, json body or None)
+    def get_json(self, url, params=None):
+        key = (url, tuple(sorted((params or {}).items())))
+        with self._lock:
+            cached = self.etags.get(key)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self.request("GET", url, params=params, headers=headers)
+        if response.status_code == 304 and cached:
+            return cached[1], cached[2]
+
+        data = response.json() if response.status_code == 200 else None
+        etag = response.headers.get("ETag")
+        if etag and response.status_code == 200:
+            with self._lock:
+                if len(self.etags) >= self.MAX_ETAGS:
+                    self.etags.clear()
+                self.etags[key] = (etag, response.status_code, data)
+        if response.status_code != 200:
+            print(f"GitHub request {url} failed. Status: {response.status_code}, Response: {response.text}")
+        return response.status_code, data
+
+    def request(self, method, url, **kwargs):
+        for attempt in range(self.MAX_RETRIES + 1):
+            self._wait_for_rate_limit_reset()
+            with self._lock:
+                self.request_count += 1
+            response = self.session.request(method, url, timeout=self.TIMEOUT, **kwargs)
+            self._update_rate_limit(response)
+            delay = self._retry_delay(response, attempt)
+            if delay is None or attempt == self.MAX_RETRIES:
+                return response
+            print(f"GitHub returned {response.status_code}, retrying in {delay:.0f}s.")
+            time.sleep(delay)
+        return response
+
+    def _update_rate_limit(self, response):
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is not None and reset is not None:
+            self.rate_limit_remaining = int(remaining)
+            self.rate_limit_reset = int(reset)
+
+    def _wait_for_rate_limit_reset(self):
+        if self.rate_limit_remaining == 0 and self.rate_limit_reset:
+            delay = min(self.rate_limit_reset - time.time() + 1, self.MAX_BACKOFF)
+            if delay > 0:
+                print(f"GitHub rate limit reached, waiting {delay:.0f}s for the reset.")
+                time.sleep(delay)
+            self.rate_limit_remaining = None
+
+    # seconds to wait before retrying the response, or None if it should not be retried
+    def _retry_delay(self, response, attempt):
+        backoff = min(self.BASE_BACKOFF * 2 ** attempt, self.MAX_BACKOFF)
+        if response.status_code in (403, 429):
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return min(int(retry_after), self.MAX_BACKOFF)
+            if response.headers.get("X-RateLimit-Remaining") == "0":
+                return 0  # _wait_for_rate_limit_reset sleeps until the reset
+            if response.status_code == 429 or "rate limit" in response.text.lower():
+                return backoff  # secondary rate limit without a Retry-After
+            return None  # permission error, retrying will not help
+        if response.status_code >= 500:
+            return backoff
+        return None
+
+
+github = GitHubClient()
+
 # File to track processed PR numbers
 PROCESSED_PR_FILE = "processed_pr_numbers.txt"
 
@@ -46,13 +203,113 @@ def create_processed_pr_file():
 create_processed_pr_file()
 
 
+class ProcessedPRStore:
+    """Every PR merged so far, backed by the append-only PROCESSED_PR_FILE ("<pr number>,<message ts>" lines).
+
+    The file is read once, on first use, into a dict, so "already processed?" is a set lookup for any PR
+    instead of a reread of the file. New entries are appended and fsynced before they are added in memory,
+    and a PR already in the store is never written twice. A line left half-written by a crash is truncated
+    away on load.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._entries = None  # PR number -> message ts, in file order
+        self._watermark = None  # newest message ts
+
+    def __contains__(self, pr_number):
+        return str(pr_number) in self._load()
+
+    def __len__(self):
+        return len(self._load())
+
+    def watermark(self):
+        self._load()
+        return self._watermark
+
+    def latest(self):
+        entries = self._load()
+        if not entries:
+            return {}
+        pr_number = next(reversed(entries))
+        return {pr_number: entries[pr_number]}
+
+    def add(self, pr_number, message_ts):
+        pr_number = str(pr_number)
+        with self._lock:
+            entries = self._load_locked()
+            if pr_number in entries:
+                return
+            with open(self.path, "a", newline="\n") as file:
+                file.write(f"{pr_number},{message_ts}\n")
+                file.flush()
+                os.fsync(file.fileno())
+            self._remember(pr_number, message_ts)
+
+    def _load(self):
+        if self._entries is not None:
+            return self._entries
+        with self._lock:
+            return self._load_locked()
+
+    def _load_locked(self):
+        if self._entries is not None:
+            return self._entries
+
+        entries = {}
+        try:
+            with open(self.path, "rb") as file:
+                data = file.read()
+        except FileNotFoundError:
+            data = b""
+
+        lines = data.split(b"\n")
+        tail = lines.pop()  # text after the last newline, empty unless the last write was cut short
+        for line in lines:
+            entry = self._parse(line)
+            if entry:
+                entries[entry[0]] = entry[1]
+        if tail.strip():
+            # every entry is written with its newline, so an unterminated line is a write cut short by a crash;
+            # dropping it is safe because a PR that was already merged is skipped by the is_pr_merged check
+            with open(self.path, "r+b") as file:
+                file.truncate(len(data) - len(tail))
+            print(f"Dropped incomplete line {tail!r} from {self.path}.")
+
+        self._watermark = max(entries.values(), key=float, default=None)
+        self._entries = entries  # published last, so unlocked readers never see a partial dict
+        return self._entries
+
+    @staticmethod
+    def _parse(line):
+        line = line.decode(errors="replace").strip()
+        if line.endswith("%"):
+            line = line[:-1].strip()  # Remove the trailing "%" character
+        parts = line.split(',')
+        if len(parts) != 2 or not parts[0] or not parts[1]:
+            return None
+        try:
+            float(parts[1])
+        except ValueError:
+            return None
+        return parts[0], parts[1]
+
+    def _remember(self, pr_number, message_ts):
+        self._entries[pr_number] = message_ts
+        if self._watermark is None or float(message_ts) > float(self._watermark):
+            self._watermark = message_ts
+
+
+processed_prs = ProcessedPRStore(PROCESSED_PR_FILE)
+
+
 # method to check the PR mergeability state on GitHub
 def check_pr_mergeability_state_on_github(pr_number):
     # only query GitHub if the PR is not already in the file
     if pr_number and not is_pr_already_in_file(pr_number):
-        response = requests.get(f"https://api.github.com/repos/{GITHUB_REPO}/pulls/{pr_number}", headers=github_headers)
-        if response.status_code == 200:
-            pr_data = response.json()
+        status_code, pr_data = github.get_pull(pr_number)
+        if status_code == 200:
             # print(pr_data)
             if pr_data.get("merged") is True:
                 return "merged"
@@ -79,6 +336,14 @@ def is_pr_mergeable(pr_number):
     return False
 
 
+# returns True if the PR was closed (merged or not) or does not exist, so there is nothing left to merge
+def is_pr_closed(pr_number):
+    status_code, pr_data = github.get_pull(pr_number)
+    if status_code == 404:
+        return True
+    return status_code == 200 and pr_data.get("state", "open") != "open"
+
+
 # returns True if PR is already merged and False otherwise
 def is_pr_merged(pr_number):
     mergeable_state = check_pr_mergeability_state_on_github(pr_number)
@@ -89,6 +354,9 @@ def is_pr_merged(pr_number):
 
 # waits for PR to be merged and returns True if merged and False otherwise
 def wait_for_pr_to_merge(pr_number, timeout=100):  # Timeout is 120 seconds
+    if merge_notifier is not None:
+        # webhook mode: sleep until GitHub reports the merge, with one last check in case a webhook was lost
+        return merge_notifier.wait(pr_number, timeout) or check_workflow_status(pr_number)
     start_time = time.time()
     while time.time() - start_time <= timeout:
         if check_workflow_status(pr_number):
@@ -99,36 +367,32 @@ def wait_for_pr_to_merge(pr_number, timeout=100):  # Timeout is 120 seconds
 
 
 def check_workflow_status(pr_number):
-    # Get the list of workflow runs for the repository
-    response = requests.get(f"https://api.github.com/repos/{GITHUB_REPO}/actions/runs", headers=github_headers)
-    if response.status_code == 200:
-        workflow_runs = response.json()["workflow_runs"]
-        # print(workflow_runs)
-        for run in workflow_runs:
-            if f"Merge pull request #{pr_number}" in run["head_commit"]["message"] or \
-                    f"Merge pull request #{pr_number}" in run["display_title"]:
-                if run["status"] == "completed" and run["conclusion"] == "success":
-                    print(f"Workflow for PR #{pr_number} has completed.")
-                    return True  # Workflow has finished executing
+    # Get the push runs of the merge check workflow (unchanged lists come back as free 304s)
+    workflow_runs = github.get_workflow_runs(GITHUB_MERGE_CHECK_WORKFLOW, event="push")
+    for run in workflow_runs:
+        if f"Merge pull request #{pr_number}" in (run.get("head_commit") or {}).get("message", "") or \
+                f"Merge pull request #{pr_number}" in run["display_title"]:
+            if run["status"] == "completed" and run["conclusion"] == "success":
+                print(f"Workflow for PR #{pr_number} has completed.")
+                return True  # Workflow has finished executing
     return False  # Workflow execution not completed or not found
 
 
 # checks if PR is merged and returns True if merged and False otherwise
 def check_pr_merged(pr_number):
-    response = requests.get(f"https://api.github.com/repos/{GITHUB_REPO}/pulls/{pr_number}", headers=github_headers)
-    if response.status_code == 200:
-        pr_data = response.json()
+    # refresh: the state cached earlier in this cycle predates the merge
+    status_code, pr_data = github.get_pull(pr_number, refresh=True)
+    if status_code == 200:
         return pr_data.get("merged", False)
     else:
-        print(f"Failed to retrieve PR data. Status: {response.status_code}, Response: {response.text}")
+        print(f"Failed to retrieve PR data. Status: {status_code}")
         return False
 
 
 # method checks if PR is already in file (meaning merged)
 def is_pr_already_in_file(pr_number):
     # Check if the PR is already in the file
-    processed_pr_numbers = load_latest_processed_pr_data()
-    if pr_number in processed_pr_numbers:
+    if pr_number in processed_prs:
         print(f"PR #{pr_number} is already processed.")
         return True  # PR is already processed and therefore already merged
     else:
@@ -138,48 +402,52 @@ def is_pr_already_in_file(pr_number):
 # method to save the processed PR number to the file with their timestamps
 def save_processed_pr_number(pr_number, message_ts):
     print(f"local. Saving PR #{pr_number} and {message_ts} to the file.")
-    with open(PROCESSED_PR_FILE, "a", newline="\n") as file:
-        file.write(f"{pr_number},{message_ts}\n")
+    processed_prs.add(pr_number, message_ts)
 
 
-def load_latest_processed_pr_data():
-    try:
-        with open(PROCESSED_PR_FILE, "r") as file:
-            lines = file.readlines()
-            if lines:
-                last_line = lines[-1].strip()
-                if last_line.endswith("%"):
-                    last_line = last_line[:-1].strip()  # Remove the trailing "%" character
-                parts = last_line.split(',')
-                if len(parts) == 2:
-                    # Return the dictionary with the last processed PR number and its timestamp
-                    return {parts[0]: parts[1]}
-    except FileNotFoundError:
-        print("File not found.")
-        return {}
-    except OSError:
-        # Handle other file-related errors, such as the file being empty
-        return {}
-    return {}
-
-
-# Function to find the latest PR message in the channel and return it
-def find_latest_pr_opened_message(channel_id, latest_ts=None):
-    params = {"channel": channel_id, "limit": 900}
-    if latest_ts:
-        params["oldest"] = latest_ts  # Fetch messages newer than the latest_ts
+# Function to find every PR opened message newer than oldest_ts, oldest first, following Slack's cursor
+# pagination so no message is missed however many were posted since the last check
+def find_new_pr_opened_messages(channel_id, oldest_ts=None):
+    params = {"channel": channel_id, "limit": SLACK_HISTORY_PAGE_SIZE}
+    if oldest_ts:
+        params["oldest"] = oldest_ts
+    pr_messages = []
+    while True:
+        response = requests.get(CONVERSATIONS_HISTORY_URL, headers=slack_headers, params=params)
+        if response.status_code != 200:
+            print(f"Failed to retrieve messages. Status code: {response.status_code}")
+            break
+        data = response.json()
+        pr_messages.extend(message for message in data.get("messages", []) if is_pr_opened_message(message))
+        next_cursor = (data.get("response_metadata") or {}).get("next_cursor")
+        if not data.get("has_more") or not next_cursor:
+            break
+        params["cursor"] = next_cursor
+    pr_messages.sort(key=lambda message: float(message["ts"]))
+    return pr_messages
+
+
+# returns True if the message is the "Pull Request Opened" notification of a PR
+def is_pr_opened_message(message):
+    if "text" in message and "Pull Request Opened" in message["text"]:
+        return True
+    if "attachments" in message:
+        for attachment in message["attachments"]:
+            if "pretext" in attachment and "Pull Request Opened" in attachment["pretext"]:
+                return True
+    return False
+
+
+# Function to fetch a single message of a Slack channel by its timestamp
+def get_message(channel_id, message_ts):
+    params = {"channel": channel_id, "latest": message_ts, "inclusive": "true", "limit": 1}
     response = requests.get(CONVERSATIONS_HISTORY_URL, headers=slack_headers, params=params)
     if response.status_code == 200:
         messages = response.json().get("messages", [])
-        for message in messages:
-            if "text" in message and "Pull Request Opened" in message["text"]:
-                return message
-            if "attachments" in message:
-                for attachment in message["attachments"]:
-                    if "pretext" in attachment and "Pull Request Opened" in attachment["pretext"]:
-                        return message
+        if messages and messages[0].get("ts") == message_ts:
+            return messages[0]
     else:
-        print(f"Failed to retrieve messages. Status code: {response.status_code}")
+        print(f"Failed to retrieve message {message_ts}. Status code: {response.status_code}")
     return None
 
 
@@ -197,13 +465,7 @@ def get_reaction_count(message_ts, channel_id):
 
 
 def trigger_github_workflow(pr_number):
-    data = {
-        "ref": "main",
-        "inputs": {
-            "prNumber": str(pr_number)
-        }
-    }
-    response = requests.post(GITHUB_DISPATCH_URL, headers=github_headers, json=data)
+    response = github.dispatch_workflow(GITHUB_WORKFLOW_ID, "main", {"prNumber": str(pr_number)})
     if response.status_code == 204:
         print("Successfully triggered the GitHub workflow.")
     else:
@@ -218,53 +480,294 @@ def extract_pr_number(message):
     return None
 
 
+# runs the approval and merge flow for one "Pull Request Opened" message,
+# returns True once the PR needs no further checks (merged now or earlier)
+def handle_pr_message(pr_message, processed_pr_numbers, threshold=1):
+    github.new_cycle()  # PR state is fetched at most once per message unless explicitly refreshed
+    # Extract the PR number from the message
+    pr_number = extract_pr_number(pr_message)
+
+    message_ts = pr_message.get("ts")  # timestamp of the message
+
+    # check if the PR is found in messages and not processed already (not in the file)
+    if pr_number and pr_number not in processed_pr_numbers:
+        # a closed PR can no longer be merged, so it is dropped before any Slack call
+        if is_pr_closed(pr_number):
+            print(f"PR #{pr_number} is closed or was not found. It will not be checked again.")
+            return True
+        # Get the thumbs-up reaction count on the message
+        message_id = pr_message.get("ts")  # timestamp of the message
+        thumbs_up_count = get_reaction_count(message_id, SLACK_CHANNEL_ID)  # get the reaction count
+        print(f"Thumbs-up reaction count: {thumbs_up_count}")
+        # if the reaction count is greater than or equal to the threshold, trigger the GitHub workflow
+        # this means everyone has approved the PR
+        if thumbs_up_count >= threshold:
+            # if PR number is extracted successfully (redundant check but safe)
+            if pr_number and not is_pr_merged(pr_number):  # check if PR is not already merged
+                if not is_pr_mergeable(pr_number):
+                    # nothing was dispatched, so there is no merge to wait for; the next cycle checks again
+                    print(f"PR #{pr_number} is not mergeable yet.")
+                    return False
+                trigger_github_workflow(pr_number)
+                if wait_for_pr_to_merge(pr_number):  # wait for PR to be merged
+                    if check_pr_merged(pr_number):  # check if merging is completed
+                        # print saving PR number and timestamp to the file
+                        print("saving PR number and timestamp to the file")
+                        save_processed_pr_number(pr_number, message_ts)  # save the PR number to the file
+                        return True
+                    else:
+                        print(f"PR #{pr_number} merging failed.")
+                else:
+                    print(f"PR #{pr_number} timed out waiting for merge.")
+            else:
+                print(f"PR #{pr_number} is already merged. No api called made.")
+                return True
+    else:
+        print(f"PR number: {pr_number} already processed and on file.")
+        return True
+    return False
+
+
+# PR messages are evaluated and merged concurrently on this pool. in_flight_prs holds the PRs a worker is
+# currently handling, so a PR is never dispatched twice even if it is seen again while still merging.
+merge_pool = ThreadPoolExecutor(max_workers=MERGE_WORKERS, thread_name_prefix="pr-merge")
+in_flight_prs = set()
+in_flight_lock = threading.Lock()
+
+# PR messages seen in Slack and not finished yet, guarded by in_flight_lock. They are kept across polls
+# because a newer PR merging first moves the watermark past them, until they are PENDING_PR_MAX_AGE old.
+pending_pr_messages = {}
+
+
+# returns True if the message was posted too long ago for its PR to still be checked
+def is_expired_pr_message(pr_message, now=None):
+    return float(pr_message["ts"]) < (now or time.time()) - PENDING_PR_MAX_AGE
+
+
+# hands a PR message to the merge pool unless the same PR is already being handled, returns the Future
+def submit_pr_message(pr_message, threshold=1):
+    pr_number = extract_pr_number(pr_message)
+    with in_flight_lock:
+        if not pr_number or pr_number in in_flight_prs:
+            return None
+        in_flight_prs.add(pr_number)
+    return merge_pool.submit(run_pr_message, pr_message, pr_number, threshold)
+
+
+def run_pr_message(pr_message, pr_number, threshold):
+    finished = False
+    try:
+        finished = handle_pr_message(pr_message, processed_prs, threshold)
+    except Exception as error:
+        print(f"Failed to process PR #{pr_number}: {error}")
+    finally:
+        with in_flight_lock:
+            in_flight_prs.discard(pr_number)
+            if finished:
+                pending_pr_messages.pop(pr_number, None)
+
+
+# adds the new PR messages to pending_pr_messages, drops the expired ones and returns the PR messages to check
+def update_pending_pr_messages(new_pr_messages, now=None):
+    with in_flight_lock:
+        for pr_message in new_pr_messages:
+            pr_number = extract_pr_number(pr_message)
+            if pr_number and pr_number not in processed_prs and not is_expired_pr_message(pr_message, now):
+                pending_pr_messages.setdefault(pr_number, pr_message)
+        for pr_number, pr_message in list(pending_pr_messages.items()):
+            if is_expired_pr_message(pr_message, now):
+                print(f"PR #{pr_number} was not merged within {PENDING_PR_MAX_AGE}s. It will not be checked again.")
+                del pending_pr_messages[pr_number]
+        return list(pending_pr_messages.values())
+
+
 def continuously_check_reactions(threshold=1):  # Threshold is 1 thumbs-up reaction by default (can be changed)
     while True:
-        # load processed PR numbers from the file to avoid processing the same PR multiple times
-        # to prevent redundant workflow triggers
-        processed_pr_numbers = load_latest_processed_pr_data()
         # extact the latest timestamp from the processed PR numbers
-        latest_ts_from_file = max([float(ts) for ts in processed_pr_numbers.values()]) if processed_pr_numbers else None
-
-        # Find the latest PR message in the channel
-        latest_pr_message = find_latest_pr_opened_message(SLACK_CHANNEL_ID, latest_ts_from_file)
-        # print(latest_pr_message)
-        if latest_pr_message:  # If a PR message is found in the channel
-            # Extract the PR number from the message
-            pr_number = extract_pr_number(latest_pr_message)
-
-            message_ts = latest_pr_message.get("ts")  # timestamp of the message
-
-            # check if the PR is found in messages and not processed already (not in the file)
-            if pr_number and pr_number not in processed_pr_numbers:
-                # Get the thumbs-up reaction count on the message
-                message_id = latest_pr_message.get("ts")  # timestamp of the message
-                thumbs_up_count = get_reaction_count(message_id, SLACK_CHANNEL_ID)  # get the reaction count
-                print(f"Thumbs-up reaction count: {thumbs_up_count}")
-                # if the reaction count is greater than or equal to the threshold, trigger the GitHub workflow
-                # this means everyone has approved the PR
-                if thumbs_up_count >= threshold:
-                    # if PR number is extracted successfully (redundant check but safe)
-                    if pr_number and not is_pr_merged(pr_number):  # check if PR is not already merged
-                        if is_pr_mergeable(pr_number):
-                            trigger_github_workflow(pr_number)
-                        if wait_for_pr_to_merge(pr_number):  # wait for PR to be merged
-                            if check_pr_merged(pr_number):  # check if merging is completed
-                                # print saving PR number and timestamp to the file
-                                print("saving PR number and timestamp to the file")
-                                save_processed_pr_number(pr_number, message_ts)  # save the PR number to the file
-                            else:
-                                print(f"PR #{pr_number} merging failed.")
-                        else:
-                            print(f"PR #{pr_number} is not mergeable or timed out waiting for merge.")
-                    else:
-                        print(f"PR #{pr_number} is already merged. No api called made.")
-            else:
-                print(f"PR number: {pr_number} already processed and on file.")
+        latest_ts_from_file = processed_prs.watermark()
+
+        # Find every PR message posted since then
+        new_pr_messages = find_new_pr_opened_messages(SLACK_CHANNEL_ID, latest_ts_from_file)
+        pr_messages = update_pending_pr_messages(new_pr_messages)
+
+        if pr_messages:
+            for pr_message in pr_messages:
+                submit_pr_message(pr_message, threshold)
         else:
             print("No new pull requested found in the channel.")
         time.sleep(60)  # Check every minute (60 seconds)
 
 
+# ---- Webhook mode ----
+
+# Wakes up wait_for_pr_to_merge when GitHub reports that a PR was merged, set by run_webhook_receiver
+merge_notifier = None
+
+# Slack message timestamps whose reactions still have to be processed, handled one at a time in order
+reaction_queue = queue.Queue()
+queued_messages = set()
+queued_messages_lock = threading.Lock()
+
+
+class MergeNotifier:
+    """Wakes the worker waiting for a PR when the GitHub webhook reports its merge.
+
+    Most notifications are for PRs nobody waits on (every push to main completes a workflow run), so an
+    Event only exists while a worker waits. A merge reported before its worker starts waiting is kept for
+    EARLY_NOTIFY_TTL seconds and then forgotten, so the notifier never grows with the number of merges.
+    """
+
+    EARLY_NOTIFY_TTL = 300  # seconds
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._events = {}  # PR number -> Event, while a worker waits for the PR
+        self._early = {}  # PR number -> time.monotonic() of a notification nobody waited for yet
+
+    # called by the GitHub webhook, may arrive before anyone waits for the PR
+    def notify(self, pr_number):
+        pr_number = str(pr_number)
+        now = time.monotonic()
+        with self._lock:
+            event = self._events.get(pr_number)
+            if event is not None:
+                event.set()
+                return
+            for number, notified_at in list(self._early.items()):
+                if now - notified_at > self.EARLY_NOTIFY_TTL:
+                    del self._early[number]
+            self._early[pr_number] = now
+
+    def wait(self, pr_number, timeout):
+        pr_number = str(pr_number)
+        with self._lock:
+            notified_at = self._early.pop(pr_number, None)
+            if notified_at is not None and time.monotonic() - notified_at <= self.EARLY_NOTIFY_TTL:
+                return True
+            event = self._events.setdefault(pr_number, threading.Event())
+        try:
+            return event.wait(timeout)
+        finally:
+            with self._lock:
+                self._events.pop(pr_number, None)
+
+
+# checks the X-Slack-Signature header (HMAC-SHA256 of "v0:<timestamp>:<body>" with the signing secret)
+def is_valid_slack_request(headers, body):
+    timestamp = headers.get("X-Slack-Request-Timestamp", "")
+    signature = headers.get("X-Slack-Signature", "")
+    if not SLACK_SIGNING_SECRET or not timestamp.isdigit():
+        return False
+    if abs(time.time() - int(timestamp)) > SLACK_MAX_REQUEST_AGE:
+        return False
+    base = b"v0:" + timestamp.encode() + b":" + body
+    expected = "v0=" + hmac.new(SLACK_SIGNING_SECRET.encode(), base, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+# checks the X-Hub-Signature-256 header (HMAC-SHA256 of the body with the webhook secret)
+def is_valid_github_request(headers, body):
+    signature = headers.get("X-Hub-Signature-256", "")
+    if not GITHUB_WEBHOOK_SECRET:
+        return False
+    expected = "sha256=" + hmac.new(GITHUB_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(expected, signature)
+
+
+# handles a Slack Events API request and returns (status code, response body)
+def handle_slack_event(headers, body):
+    if not is_valid_slack_request(headers, body):
+        return 401, {"error": "Invalid signature"}
+
+    payload = json.loads(body)
+    if payload.get("type") == "url_verification":
+        return 200, {"challenge": payload.get("challenge")}
+
+    event = payload.get("event", {})
+    item = event.get("item", {})
+    if event.get("type") == "reaction_added" and event.get("reaction", "").startswith("+1") and \
+            item.get("type") == "message" and item.get("channel") == SLACK_CHANNEL_ID:
+        # Slack wants an answer within 3 seconds, so the merge flow runs on the worker thread
+        with queued_messages_lock:
+            if item["ts"] not in queued_messages:
+                queued_messages.add(item["ts"])
+                reaction_queue.put(item["ts"])
+    return 200, {}
+
+
+# handles a GitHub webhook delivery and returns (status code, response body)
+def handle_github_event(headers, body):
+    if not is_valid_github_request(headers, body):
+        return 401, {"error": "Invalid signature"}
+
+    event_type = headers.get("X-GitHub-Event")
+    payload = json.loads(body)
+    if event_type == "workflow_run" and payload.get("action") == "completed":
+        run = payload.get("workflow_run", {})
+        if run.get("conclusion") == "success":
+            # same matching as check_workflow_status
+            text = (run.get("head_commit") or {}).get("message", "") + "\n" + (run.get("display_title") or "")
+            if "Merge pull request #" in text:
+                pr_number = text.split("Merge pull request #", 1)[1].split()[0]
+                print(f"Workflow for PR #{pr_number} has completed.")
+                merge_notifier.notify(pr_number)
+    elif event_type == "pull_request" and payload.get("action") == "closed":
+        pull_request = payload.get("pull_request", {})
+        if pull_request.get("merged"):
+            merge_notifier.notify(pull_request.get("number"))
+    return 200, {}
+
+
+class WebhookHandler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        try:
+            if self.path == SLACK_EVENTS_PATH:
+                status, response = handle_slack_event(self.headers, body)
+            elif self.path == GITHUB_WEBHOOK_PATH:
+                status, response = handle_github_event(self.headers, body)
+            else:
+                status, response = 404, {"error": "Not found"}
+        except ValueError:
+            status, response = 400, {"error": "Invalid JSON"}
+
+        data = json.dumps(response).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+
+# worker thread of webhook mode: hands every PR message that received a thumbs-up to the merge pool
+def process_reaction_events(threshold=1):
+    while True:
+        message_ts = reaction_queue.get()
+        try:
+            message = get_message(SLACK_CHANNEL_ID, message_ts)
+            if message and is_pr_opened_message(message):
+                submit_pr_message(message, threshold)
+        except Exception as error:
+            print(f"Failed to process reaction on message {message_ts}: {error}")
+        finally:
+            with queued_messages_lock:
+                queued_messages.discard(message_ts)
+
+
+def run_webhook_receiver(threshold=1, host=WEBHOOK_HOST, port=WEBHOOK_PORT):
+    global merge_notifier
+    if not SLACK_SIGNING_SECRET or not GITHUB_WEBHOOK_SECRET:
+        raise RuntimeError("SLACK_SIGNING_SECRET and GITHUB_WEBHOOK_SECRET are required in webhook mode")
+
+    merge_notifier = MergeNotifier()
+    threading.Thread(target=process_reaction_events, args=(threshold,), daemon=True).start()
+    server = ThreadingHTTPServer((host, port), WebhookHandler)
+    print(f"Listening for Slack and GitHub webhooks on {host}:{port}")
+    server.serve_forever()
+
+
 if __name__ == "__main__":
-    continuously_check_reactions()
+    if TRIGGER_MODE == "webhook":
+        run_webhook_receiver()
+    else:
+        continuously_check_reactions()
@@ -0,0 +1,84 @@
+# user_loader.py
+# Request-scoped batching loader for the user fields serializers need (username and avatar). Serializers
+# prime() every id they will need, and the first get() resolves all of them with a single
+# "WHERE id IN (...)" query, after checking a small cross-request LRU.
+
+import os
+from collections import namedtuple
+
+from flask import g
+
+from caching import LRUCache
+from extensions import db, primary_reads
+from models import User
+
+UserSummary = namedtuple('UserSummary', 'id username profile_picture')
+
+user_summary_cache = LRUCache(max_size=int(os.getenv('USER_CACHE_SIZE', 10000)), max_age=300)
+
+
+class UserLoader:
+    def __init__(self):
+        self._pending = set()
+        self._loaded = {}
+
+    def prime(self, user_ids):
+        for user_id in user_ids:
+            if user_id is not None and user_id not in self._loaded:
+                self._pending.add(int(user_id))
+
+    def get(self, user_id):
+        """Returns the UserSummary for user_id, or None if the user does not exist."""
+        if user_id is None:
+            return None
+        user_id = int(user_id)
+        if user_id not in self._loaded:
+            self._pending.add(user_id)
+            self._resolve()
+        return self._loaded.get(user_id)
+
+    def load_many(self, user_ids):
+        self.prime(user_ids)
+        self._resolve()
+        return {int(user_id): self._loaded.get(int(user_id)) for user_id in user_ids if user_id is not None}
+
+    def username(self, user_id):
+        user = self.get(user_id)
+        return user.username if user else None
+
+    def _resolve(self):
+        if not self._pending:
+            return
+
+        missing = []
+        for user_id in self._pending:
+            user = user_summary_cache.get(user_id)
+            if user is None:
+                missing.append(user_id)
+            else:
+                self._loaded[user_id] = user
+        self._pending.clear()
+
+        if missing:
+            versions = {user_id: user_summary_cache.current_version(user_id) for user_id in missing}
+            for user_id in missing:
+                self._loaded[user_id] = None
+            # From the primary: the summaries are shared across requests, see challenge_cache
+            with primary_reads():
+                rows = db.session.query(User.id, User.username, User.profile_picture) \
+                    .filter(User.id.in_(missing)).all()
+            for user_id, username, profile_picture in rows:
+                user = UserSummary(user_id, username, profile_picture)
+                self._loaded[user_id] = user
+                user_summary_cache.set(user_id, user, versions[user_id])
+
+
+def get_user_loader():
+    """Returns the UserLoader of the current request, creating it on first use."""
+    if 'user_loader' not in g:
+        g.user_loader = UserLoader()
+    return g.user_loader
+
+
+def invalidate_user(user_id):
+    user_summary_cache.invalidate(int(user_id))
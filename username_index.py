@@ -0,0 +1,300 @@
+# username_index.py
+# In-memory prefix index for username autocomplete. Lowercased usernames are kept in one sorted list, so
+# the usernames starting with a prefix are a contiguous range found with two bisects, without touching
+# the database. Short ranges are ranked by scanning them; prefixes matching more than
+# AUTOCOMPLETE_SCAN_LIMIT usernames (typically one or two letters) have their top matches precomputed at
+# load time, so every query is ranked over all of its matches at a bounded cost. The index is loaded from
+# User on first use, extended by /register, and reloaded on a background thread every
+# USERNAME_INDEX_MAX_AGE seconds so eco points and users registered through other workers catch up.
+#
+# Typo-tolerant lookups (/search?fuzzy=1) use a BK-tree over the same lowercase usernames, built in the
+# background after the first fuzzy query and kept up to date by the same additions and reloads. Fuzzy
+# queries compare against every username until it is ready.
+
+import heapq
+import logging
+import os
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+import jellyfish
+from flask import current_app
+
+from extensions import db, primary_reads
+from models import User
+
+logger = logging.getLogger(__name__)
+
+USERNAME_INDEX_MAX_AGE = float(os.getenv('USERNAME_INDEX_MAX_AGE', 300))
+
+# Most results one autocomplete query returns, and so the length of the precomputed top match lists
+AUTOCOMPLETE_MAX_LIMIT = 50
+# Prefixes matching up to this many usernames are ranked by scanning their matches; longer ranges get a
+# precomputed top list
+AUTOCOMPLETE_SCAN_LIMIT = 1000
+
+# Sorts after every character, so prefix + PREFIX_END is an upper bound for all keys starting with prefix
+PREFIX_END = chr(0x10FFFF)
+
+# Default edit distance of fuzzy searches, by query length, and the largest distance a client may ask for
+FUZZY_SHORT_QUERY_LENGTH = 4
+FUZZY_MAX_DISTANCE = 3
+
+
+class BKTree:
+    """Burkhard-Keller tree under Damerau-Levenshtein distance. Each child hangs off its parent under
+    its distance to it, and by the triangle inequality a search within distance k of a word w only has to
+    visit the children of a node n whose distance lies in [d(w, n) - k, d(w, n) + k], which skips most
+    of the tree for small k."""
+
+    def __init__(self, distance=jellyfish.damerau_levenshtein_distance):
+        self.distance = distance
+        self._root = None  # (word, {distance: child node})
+
+    def add(self, word):
+        if self._root is None:
+            self._root = (word, {})
+            return
+        node = self._root
+        while True:
+            node_word, children = node
+            distance = self.distance(word, node_word)
+            if distance == 0:
+                return
+            child = children.get(distance)
+            if child is None:
+                # Only ever adds a child, so searches running on other threads need no lock
+                children[distance] = (word, {})
+                return
+            node = child
+
+    def search(self, word, max_distance):
+        """Returns [(distance, word)] for every word within max_distance of `word`."""
+        if self._root is None:
+            return []
+        matches = []
+        stack = [self._root]
+        while stack:
+            node_word, children = stack.pop()
+            distance = self.distance(word, node_word)
+            if distance <= max_distance:
+                matches.append((distance, node_word))
+            for child_distance in range(max(1, distance - max_distance), distance + max_distance + 1):
+                child = children.get(child_distance)
+                if child is not None:
+                    stack.append(child)
+        return matches
+
+
+class UsernameIndex:
+    def __init__(self, max_age=USERNAME_INDEX_MAX_AGE):
+        self.max_age = max_age
+        # Parallel arrays ordered by lowercase username
+        self._keys = []
+        self._names = []
+        self._ids = array('q')
+        self._points = array('q')
+        self._top = {}  # prefix -> best AUTOCOMPLETE_MAX_LIMIT candidates, for prefixes with long ranges
+        self._loaded_at = None
+        self._lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self._added_during_reload = None
+        self._reloader = None
+        self._fuzzy_tree = None
+        self._fuzzy_builder = None
+
+    def complete(self, prefix, limit=10):
+        """Returns up to `limit` (id, username, eco_points) tuples for the usernames starting with `prefix`
+        (case-insensitive): exact matches first, then by eco points, highest first, then by username."""
+        self._ensure_loaded()
+        prefix = prefix.lower()
+        limit = min(limit, AUTOCOMPLETE_MAX_LIMIT)
+        with self._lock:
+            start = bisect_left(self._keys, prefix)
+            exact_end = bisect_right(self._keys, prefix, start)
+            top = self._top.get(prefix)
+            if top is not None:
+                others = [candidate for candidate in top if candidate[1] != prefix][:limit]
+            else:
+                end = bisect_right(self._keys, prefix + PREFIX_END, exact_end)
+                others = heapq.nsmallest(limit, map(self._candidate, range(exact_end, end)))
+            ranked = (sorted(map(self._candidate, range(start, exact_end))) + others)[:limit]
+        return [(user_id, username, -negated_points) for negated_points, _, user_id, username in ranked]
+
+    def _candidate(self, position):
+        # Sorts in ranking order: eco points (highest first), lowercase username, id
+        return -self._points[position], self._keys[position], self._ids[position], self._names[position]
+
+    def fuzzy_search(self, query, max_distance=None):
+        """Returns (id, username, eco_points, distance) tuples for the usernames within `max_distance`
+        edits (insertions, deletions, substitutions or swaps of adjacent letters, ignoring case) of
+        `query`, closest first, then by eco points. The distance defaults to 1 for short queries and 2
+        otherwise."""
+        if max_distance is None:
+            max_distance = 1 if len(query) <= FUZZY_SHORT_QUERY_LENGTH else 2
+        max_distance = max(0, min(max_distance, FUZZY_MAX_DISTANCE))
+        self._ensure_loaded()
+        query = query.lower()
+
+        tree = self._fuzzy_tree
+        if tree is not None:
+            found = tree.search(query, max_distance)
+        else:
+            # Until the tree is ready: compare against every username
+            self._start_fuzzy_tree()
+            with self._lock:
+                keys = set(self._keys)
+            distances = ((jellyfish.damerau_levenshtein_distance(query, key), key) for key in keys)
+            found = [(distance, key) for distance, key in distances if distance <= max_distance]
+
+        matches = []
+        for distance, key in found:
+            with self._lock:
+                start = bisect_left(self._keys, key)
+                end = bisect_right(self._keys, key, start)
+                matches.extend((self._ids[i], self._names[i], self._points[i], distance) for i in range(start, end))
+        matches.sort(key=lambda match: (match[3], -match[2], match[1]))
+        return matches
+
+    def add(self, user_id, username, eco_points=0):
+        """Adds a newly registered user. Users added while a reload is running are re-added after it."""
+        with self._lock:
+            if self._added_during_reload is not None:
+                self._added_during_reload.append((user_id, username, eco_points))
+            if self._loaded_at is not None:
+                self._insert(user_id, username, eco_points)
+            if self._fuzzy_tree is not None:
+                self._fuzzy_tree.add(_key(username))
+
+    def _insert(self, user_id, username, eco_points):
+        key = _key(username)
+        # eco_points may come in as a float or Decimal, which array('q') rejects
+        eco_points = int(eco_points or 0)
+        position = bisect_left(self._keys, key)
+        end = bisect_right(self._keys, key, position)
+        if user_id in self._ids[position:end]:
+            return
+        self._keys.insert(position, key)
+        self._names.insert(position, username)
+        self._ids.insert(position, user_id)
+        self._points.insert(position, eco_points)
+        candidate = (-eco_points, key, user_id, username)
+        for length in range(1, len(key) + 1):
+            top = self._top.get(key[:length])
+            if top is not None:
+                insort(top, candidate)
+                del top[AUTOCOMPLETE_MAX_LIMIT:]
+
+    def _start_fuzzy_tree(self):
+        # Building the tree takes seconds for a large user base, so it is built in the background
+        with self._lock:
+            if self._fuzzy_builder is not None:
+                return
+            self._fuzzy_builder = threading.Thread(target=self._build_fuzzy_tree, name='username-bktree',
+                                                   daemon=True)
+        self._fuzzy_builder.start()
+
+    def _build_fuzzy_tree(self):
+        with self._reload_lock:
+            with self._lock:
+                keys = set(self._keys)
+            tree = BKTree()
+            # Set order is effectively random, which keeps the tree from degenerating as sorted insertion would
+            for key in keys:
+                tree.add(key)
+            with self._lock:
+                # Users registered while the tree was being built
+                for key in set(self._keys).difference(keys):
+                    tree.add(key)
+                self._fuzzy_tree = tree
+
+    def _ensure_loaded(self):
+        loaded_at = self._loaded_at
+        if loaded_at is not None and time.monotonic() - loaded_at < self.max_age:
+            return
+        if loaded_at is None:
+            # The first load makes every caller wait for it
+            with self._reload_lock:
+                if self._loaded_at is None:
+                    self._reload()
+            return
+        # Later reloads run on a background thread while requests keep answering from the current data
+        if self._reload_lock.acquire(blocking=False):
+            self._reloader = threading.Thread(target=self._reload_in_background,
+                                              args=(current_app._get_current_object(),),
+                                              name='username-index-reload', daemon=True)
+            self._reloader.start()
+
+    def _reload_in_background(self, app):
+        try:
+            with app.app_context():
+                self._reload()
+        except Exception:
+            # The current data stays in place and the next request past max_age tries again
+            logger.exception("Reloading the username index failed")
+        finally:
+            self._reload_lock.release()
+
+    def _reload(self):
+        with self._lock:
+            self._added_during_reload = []
+        try:
+            self._load()
+        finally:
+            self._added_during_reload = None
+
+    def _load(self):
+        with primary_reads():
+            rows = db.session.query(User.id, User.username, User.eco_points).all()
+        rows = sorted(((_key(username), username, user_id, int(eco_points or 0))
+                       for user_id, username, eco_points in rows), key=lambda row: row[0])
+
+        keys = [row[0] for row in rows]
+        names = [row[1] for row in rows]
+        ids = array('q', (row[2] for row in rows))
+        points = array('q', (row[3] for row in rows))
+        top = _top_candidates(keys, names, ids, points)
+        # Usernames never change, so the fuzzy tree only needs the users registered through other workers
+        new_keys = set(keys).difference(self._keys) if self._fuzzy_tree is not None else ()
+        with self._lock:
+            for key in new_keys:
+                self._fuzzy_tree.add(key)
+            self._keys, self._names, self._ids, self._points, self._top = keys, names, ids, points, top
+            self._loaded_at = time.monotonic()
+            for user in self._added_during_reload:
+                self._insert(*user)
+
+
+def _top_candidates(keys, names, ids, points):
+    """{prefix: its best AUTOCOMPLETE_MAX_LIMIT candidates, in ranking order} for every prefix of the sorted
+    `keys` matching more than AUTOCOMPLETE_SCAN_LIMIT of them. A prefix never matches more keys than its
+    parent does, so only the children of such long ranges are examined."""
+    top = {}
+    pending = [('', 0, len(keys))]
+    while pending:
+        prefix, start, end = pending.pop()
+        length = len(prefix) + 1
+        position = start
+        while position < end:
+            if len(keys[position]) < length:
+                position += 1  # the prefix itself, sorted before the longer keys
+                continue
+            child = keys[position][:length]
+            child_end = bisect_right(keys, child + PREFIX_END, position, end)
+            if child_end - position > AUTOCOMPLETE_SCAN_LIMIT:
+                top[child] = heapq.nsmallest(AUTOCOMPLETE_MAX_LIMIT, (
+                    (-points[i], keys[i], ids[i], names[i]) for i in range(position, child_end)))
+                pending.append((child, position, child_end))
+            position = child_end
+    return top
+
+
+def _key(username):
+    key = username.lower()
+    # Most usernames are already lowercase; share the string instead of storing it twice
+    return username if key == username else key
+
+
+username_index = UsernameIndex()
@@ -2,9 +2,32 @@
 
 from flask import Flask
 
+from extensions import init_read_routing
+from logging_config import init_request_logging
+from metrics import init_metrics
+from profiling import init_profiling
+from rate_limiting import init_rate_limiting
+from serialization import FastJSONProvider
+
 
 def create_app():
     app = Flask(__name__)
+    app.json = FastJSONProvider(app)
+
+    # Request ids for log records
+    init_request_logging(app)
+
+    # Request, latency and DB metrics served from /metrics
+    init_metrics(app)
+
+    # Send read-only requests to the read replicas, if any are configured
+    init_read_routing(app)
+
+    # Per-client token buckets on the write endpoints, checked before any database work
+    init_rate_limiting(app)
+
+    # Opt-in per-route profiling (no hooks are installed unless enabled)
+    init_profiling(app)
 
     # Register environment routes
     from .environment_views import register_environment_routes
@@ -26,4 +49,24 @@ def create_app():
     from .utility_views import register_utility_routes
     register_utility_routes(app)
 
+    # Register export routes
+    from .export_views import register_export_routes
+    register_export_routes(app)
+
+    # Register import routes
+    from .import_views import register_import_routes
+    register_import_routes(app)
+
+    # Register dashboard routes
+    from .dashboard_views import register_dashboard_routes
+    register_dashboard_routes(app)
+
+    # Register batch routes
+    from .batch_views import register_batch_routes
+    register_batch_routes(app)
+
+    # Register event stream routes
+    from .event_views import register_event_routes
+    register_event_routes(app)
+
     return app
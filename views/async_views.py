@@ -0,0 +1,148 @@
+# async_views.py
+# Async versions of the heaviest read-only endpoints, served by asgi.py. Every handler returns
+# (payload, status) with the same JSON shape as its Flask counterpart.
+
+import asyncio
+
+from sqlalchemy import select, case, desc
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from models import User, Challenge, PersonalChallengeParticipant, CommunityChallenge, \
+    CommunityChallengeParticipant, EnvironmentalImpact, Friendship, MessagesInbox
+
+# Sync drivers used by the Flask app and their asyncio equivalents
+ASYNC_DRIVERS = {
+    'mysql+pymysql': 'mysql+aiomysql',
+    'mysql': 'mysql+aiomysql',
+    'sqlite': 'sqlite+aiosqlite',
+}
+
+
+def to_async_database_uri(database_uri):
+    scheme, separator, rest = database_uri.partition('://')
+    return ASYNC_DRIVERS.get(scheme, scheme) + separator + rest
+
+
+def make_async_engine(database_uri, pool_size=10):
+    options = {} if database_uri.startswith('sqlite') else {'pool_size': pool_size, 'pool_recycle': 280}
+    return create_async_engine(to_async_database_uri(database_uri), **options)
+
+
+class AsyncReadHandlers:
+    """Read-only queries run on an AsyncEngine. Independent queries inside one request each take their own
+    pooled connection so they can run concurrently with asyncio.gather."""
+
+    def __init__(self, engine):
+        self.engine = engine
+
+    async def _all(self, statement):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(statement)
+            return result.all()
+
+    async def _first(self, statement):
+        async with self.engine.connect() as connection:
+            result = await connection.execute(statement)
+            return result.first()
+
+    def _user_exists(self, user_id):
+        return self._first(select(User.id).where(User.id == user_id))
+
+    async def user_exists(self, user_id):
+        return await self._user_exists(user_id) is not None
+
+    async def user_challenge_status(self, user_id):
+        personal_impact = select(EnvironmentalImpact.impact_score) \
+            .where(EnvironmentalImpact.user_id == user_id,
+                   EnvironmentalImpact.personal_challenge_id == PersonalChallengeParticipant.id) \
+            .order_by(EnvironmentalImpact.id).limit(1).scalar_subquery()
+        personal = select(Challenge.id, Challenge.name, PersonalChallengeParticipant.start_date,
+                          PersonalChallengeParticipant.end_date, personal_impact) \
+            .join(Challenge, Challenge.id == PersonalChallengeParticipant.challenge_id) \
+            .where(PersonalChallengeParticipant.user_id == user_id) \
+            .order_by(PersonalChallengeParticipant.id)
+
+        community_impact = select(EnvironmentalImpact.impact_score) \
+            .where(EnvironmentalImpact.user_id == user_id,
+                   EnvironmentalImpact.community_challenge_id == CommunityChallengeParticipant.community_challenge_id) \
+            .order_by(EnvironmentalImpact.id).limit(1).scalar_subquery()
+        community = select(CommunityChallenge.id, Challenge.id, Challenge.name, CommunityChallengeParticipant.status,
+                           CommunityChallengeParticipant.start_date, CommunityChallengeParticipant.end_date,
+                           community_impact) \
+            .join(CommunityChallenge, CommunityChallenge.id == CommunityChallengeParticipant.community_challenge_id) \
+            .join(Challenge, Challenge.id == CommunityChallenge.challenge_id) \
+            .where(CommunityChallengeParticipant.participant_id == user_id) \
+            .order_by(CommunityChallengeParticipant.community_challenge_id)
+
+        user, personal_rows, community_rows = await asyncio.gather(
+            self._user_exists(user_id), self._all(personal), self._all(community))
+        if not user:
+            return {"error": "User not found"}, 404
+
+        challenges_status = [{
+            "challenge_id": challenge_id,
+            "name": name,
+            "status": "Participating",
+            "type": "Personal",
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat() if end_date else None,
+            "impact_score": impact_score or 0
+        } for challenge_id, name, start_date, end_date, impact_score in personal_rows]
+        challenges_status += [{
+            "community_challenge_id": community_challenge_id,
+            "challenge_id": challenge_id,
+            "name": name,
+            "status": status,
+            "type": "Community",
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat() if end_date else None,
+            "impact_score": impact_score or 0
+        } for community_challenge_id, challenge_id, name, status, start_date, end_date, impact_score
+            in community_rows]
+        return challenges_status, 200
+
+    async def friendships(self, user_id):
+        friend_id = case((Friendship.user_id == user_id, Friendship.friend_id), else_=Friendship.user_id)
+        statement = select(Friendship.id, Friendship.user_id, friend_id, User.username, Friendship.status,
+                           Friendship.created_at, Friendship.updated_at) \
+            .outerjoin(User, User.id == friend_id) \
+            .where((Friendship.user_id == user_id) | (Friendship.friend_id == user_id)) \
+            .order_by(Friendship.id)
+
+        return [{
+            'id': friendship_id,
+            'user_id': user_id,
+            'friend_id': other_id,
+            'friend_name': friend_name,
+            'status': status,
+            'request_type': 'outgoing' if initiator_id == user_id else 'incoming',
+            'created_at': created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            'updated_at': updated_at.strftime("%Y-%m-%d %H:%M:%S")
+        } for friendship_id, initiator_id, other_id, friend_name, status, created_at, updated_at
+            in await self._all(statement)], 200
+
+    async def received_messages(self, user_id):
+        statement = select(MessagesInbox.id, MessagesInbox.sender_id, User.username, MessagesInbox.content,
+                           MessagesInbox.timestamp, MessagesInbox.is_read) \
+            .join(User, User.id == MessagesInbox.sender_id) \
+            .where(MessagesInbox.user_id == user_id) \
+            .order_by(MessagesInbox.id)
+
+        user, rows = await asyncio.gather(self._user_exists(user_id), self._all(statement))
+        if not user:
+            return {'message': 'User not found'}, 404
+
+        return {'received_messages': [{
+            'id': message_id,
+            'sender_id': sender_id,
+            'sender_name': sender_name,
+            'content': content,
+            'timestamp': timestamp.isoformat(),
+            'message_type': 'received',
+            'is_read': is_read
+        } for message_id, sender_id, sender_name, content, timestamp, is_read in rows]}, 200
+
+    async def leaderboards(self):
+        statement = select(User.username, User.eco_points).order_by(desc(User.eco_points)).limit(10)
+        return {"leaderboard": [{"username": username, "eco_points": eco_points}
+                                for username, eco_points in await self._all(statement)]}, 200
@@ -0,0 +1,117 @@
+# batch_views.py
+
+import json
+import os
+import time
+
+from flask import request, jsonify, g
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from extensions import db, STICKY_HEADER, STICKY_SECONDS, READ_METHODS
+
+BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
+# Sub-requests are not started once the batch has run this long; the rest are answered with 503
+BATCH_MAX_SECONDS = float(os.getenv('BATCH_MAX_SECONDS', 5))
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'PATCH', 'DELETE')
+# Endpoints that cannot be batched: batches themselves, streaming and bulk endpoints and admin/monitoring routes
+BATCH_EXCLUDED_PREFIXES = ('/batch', '/export', '/import', '/events', '/metrics', '/admin')
+
+
+def _validate(item):
+    if not isinstance(item, dict):
+        return "Each request must be an object"
+    method = str(item.get('method', 'GET')).upper()
+    path = item.get('path')
+    if method not in BATCH_METHODS:
+        return f"Unsupported method {method}"
+    if not isinstance(path, str) or not path.startswith('/'):
+        return "path must be an absolute path such as /get_friendships/1"
+    if path.split('?', 1)[0].startswith(BATCH_EXCLUDED_PREFIXES):
+        return f"{path} cannot be batched"
+    return None
+
+
+def _dispatch(app, item, headers):
+    """Runs one sub-request through the full WSGI stack (before/after_request hooks, error handlers,
+    teardown) and returns (status code, body). The sub-request reuses the batch's app context, and with it
+    the batch's database session, but gets a fresh `g` so request-scoped state such as metrics timers,
+    request ids and the user loader never leaks between sub-requests or into the batch itself."""
+    builder = EnvironBuilder(path=item['path'], method=str(item.get('method', 'GET')).upper(),
+                             json=item.get('body'), headers=headers,
+                             environ_overrides={'REMOTE_ADDR': request.remote_addr})
+    environ = builder.get_environ()
+    builder.close()
+
+    batch_globals = g._get_current_object().__dict__
+    saved = dict(batch_globals)
+    batch_globals.clear()
+    try:
+        app_iter, status, response_headers = run_wsgi_app(app.wsgi_app, environ, buffered=True)
+        data = b''.join(app_iter)
+    except Exception:
+        # With PROPAGATE_EXCEPTIONS (debug or testing) Flask re-raises instead of answering 500; one
+        # failing sub-request must still not abort the rest of the batch
+        app.logger.exception("Batch sub-request %s %s failed", environ['REQUEST_METHOD'], item['path'])
+        db.session.rollback()
+        return 500, {"error": "Internal server error"}
+    finally:
+        batch_globals.clear()
+        batch_globals.update(saved)
+
+    status_code = int(status.split(' ', 1)[0])
+    if status_code >= 500:
+        # A failed sub-request must not leave a broken transaction behind for the next one
+        db.session.rollback()
+
+    if response_headers.get('Content-Type', '').startswith('application/json'):
+        try:
+            return status_code, json.loads(data)
+        except ValueError:
+            pass
+    return status_code, data.decode(errors='replace')
+
+
+def register_batch_routes(app):
+    @app.route('/batch', methods=['POST'])
+    def batch():
+        """
+        Runs several independent API calls in one HTTP request:
+
+            {"requests": [{"method": "POST", "path": "/like_post/3/1"},
+                          {"method": "POST", "path": "/add_comment", "body": {...}},
+                          {"method": "GET", "path": "/get_friendships/1"}]}
+
+        Sub-requests run in order, in-process, on one database session; each still commits its own
+        changes, so one failing call does not undo the others. Responses are returned in the same order as
+        {"responses": [{"status": 200, "body": ...}, ...]}.
+        """
+        data = request.get_json(silent=True) or {}
+        items = data.get('requests')
+        if not isinstance(items, list) or not items:
+            return jsonify({"error": "requests must be a non-empty list"}), 400
+        if len(items) > BATCH_MAX_REQUESTS:
+            return jsonify({"error": f"A batch can contain at most {BATCH_MAX_REQUESTS} requests"}), 400
+        for index, item in enumerate(items):
+            error = _validate(item)
+            if error:
+                return jsonify({"error": f"Request {index}: {error}"}), 400
+
+        # X-Forwarded-For keeps sub-requests in the rate-limit bucket of the client behind our proxies
+        headers = {name: value for name, value in request.headers.items()
+                   if name.lower() in ('cookie', 'authorization', 'x-request-id', 'x-profile-token',
+                                       'x-forwarded-for', STICKY_HEADER.lower())}
+        started = time.perf_counter()
+        responses = []
+        for item in items:
+            if time.perf_counter() - started > BATCH_MAX_SECONDS:
+                responses.append({"status": 503, "body": {"error": "Batch time budget exceeded, not run"}})
+                continue
+
+            status_code, body = _dispatch(app, item, headers)
+            responses.append({"status": status_code, "body": body})
+
+            if str(item.get('method', 'GET')).upper() not in READ_METHODS and status_code < 400:
+                # Later reads in the batch must see this write even when reads go to a replica
+                headers[STICKY_HEADER] = f'{time.time() + STICKY_SECONDS:.3f}'
+
+        return jsonify({"responses": responses}), 200
@@ -1,12 +1,140 @@
 # challenge_views.py
 
+import threading
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime, timezone
 
 from flask import request, jsonify
-
-from extensions import db
+from sqlalchemy import func
+from sqlalchemy.orm import aliased
+
+from caching import community_ranking_cache
+from user_loader import get_user_loader
+from challenge_cache import get_challenge, get_challenges, get_community_challenge, invalidate_challenge, \
+    invalidate_community_challenge
+from archiving import include_archived
+from extensions import db, primary_reads
 from models import Challenge, PersonalChallengeParticipant, User, CommunityChallenge, Badge, \
-    CommunityChallengeParticipant, ChallengesInbox, EnvironmentalImpact
+    CommunityChallengeParticipant, ChallengesInbox, EnvironmentalImpact, CommunityChallengeImpactTotals, \
+    ChallengesInboxArchive
+
+
+INBOX_DIRECTIONS = ('received', 'sent')
+INBOX_TYPES = ('personal', 'community', 'all')
+INBOX_DEFAULT_LIMIT = 50
+INBOX_MAX_LIMIT = 200
+
+
+def query_challenge_inbox(user_id, direction, kind, status=None, before_id=None, limit=None, model=ChallengesInbox,
+                          newest_first=True):
+    """
+    Returns a user's challenge invites, newest first (or oldest first, as the legacy inbox routes list
+    them, with newest_first=False), as rows carrying the sender and recipient usernames and the challenge
+    name. Everything is filtered and joined in SQL, so this is a single query whatever the size of the
+    inbox. Pages are keyed on the invite id (before_id), not an offset. Pass model=ChallengesInboxArchive
+    to query the archived invites.
+    """
+    sender = aliased(User)
+    recipient = aliased(User)
+    query = db.session.query(
+        model.id, model.user_id, model.sender_id, model.challenge_id, model.community_challenge_id, model.timestamp,
+        model.status,
+        sender.username.label('sender_username'), recipient.username.label('recipient_username'),
+        Challenge.name.label('challenge_name')
+    ).join(sender, sender.id == model.sender_id) \
+        .join(recipient, recipient.id == model.user_id) \
+        .outerjoin(CommunityChallenge, CommunityChallenge.id == model.community_challenge_id) \
+        .outerjoin(Challenge, Challenge.id == func.coalesce(model.challenge_id, CommunityChallenge.challenge_id))
+
+    if direction == 'sent':
+        query = query.filter(model.sender_id == user_id)
+    else:
+        query = query.filter(model.user_id == user_id)
+    if kind == 'personal':
+        query = query.filter(model.challenge_id.isnot(None))
+    elif kind == 'community':
+        query = query.filter(model.community_challenge_id.isnot(None))
+    if status:
+        query = query.filter(model.status == status)
+    if before_id is not None:
+        query = query.filter(model.id < before_id)
+
+    query = query.order_by(model.id.desc() if newest_first else model.id)
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
+
+
+class CommunityRanking:
+    """Every participant of a community challenge as (-summed impact score, user id), in ranking order.
+    Computed with one grouped query and kept in community_ranking_cache, so ranking pages only slice it,
+    and log_water_usage moves the participant it scored instead of invalidating the whole ranking."""
+
+    def __init__(self, scores):
+        self._scores = scores
+        self._ordering = sorted((-score, user_id) for user_id, score in scores.items())
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._ordering)
+
+    def page(self, after, per_page):
+        """Returns (rank of the first entry - 1, [(-score, user id)]) for the page after cursor `after`."""
+        with self._lock:
+            start = bisect_right(self._ordering, (-after[0], after[1])) if after else 0
+            return start, self._ordering[start:start + per_page]
+
+    def add_score(self, user_id, delta):
+        """Adds delta to a participant's score. Returns False if the user is not in this ranking."""
+        with self._lock:
+            score = self._scores.get(user_id)
+            if score is None:
+                return False
+            del self._ordering[bisect_left(self._ordering, (-score, user_id))]
+            self._scores[user_id] = score + delta
+            insort(self._ordering, (-(score + delta), user_id))
+            return True
+
+
+def community_challenge_ranking(community_challenge_id):
+    ranking = community_ranking_cache.get((community_challenge_id,))
+    if ranking is None:
+        impact_score = func.coalesce(func.sum(EnvironmentalImpact.impact_score), 0)
+        # From the primary: the ranking is shared by every request, see challenge_cache
+        with primary_reads():
+            ranking = CommunityRanking(dict(db.session.query(
+                CommunityChallengeParticipant.participant_id, impact_score)
+                .outerjoin(EnvironmentalImpact,
+                           (EnvironmentalImpact.user_id == CommunityChallengeParticipant.participant_id) &
+                           (EnvironmentalImpact.community_challenge_id ==
+                            CommunityChallengeParticipant.community_challenge_id))
+                .filter(CommunityChallengeParticipant.community_challenge_id == community_challenge_id)
+                .group_by(CommunityChallengeParticipant.participant_id)
+                .all()))
+        community_ranking_cache.set((community_challenge_id,), ranking)
+    return ranking
+
+
+def update_community_ranking(community_challenge_id, user_id, impact_score_delta):
+    """Called after a committed change of a participant's impact score in the challenge."""
+    ranking = community_ranking_cache.get((community_challenge_id,))
+    if ranking is not None and not ranking.add_score(user_id, impact_score_delta):
+        community_ranking_cache.invalidate(community_challenge_id)
+
+
+def invalidate_community_ranking(community_challenge_id):
+    """Called after a committed change of a challenge's participants, which add_score cannot follow."""
+    community_ranking_cache.invalidate(int(community_challenge_id))
+
+
+def ranking_cursor(score, user_id):
+    # The (score, user id) of the last participant on a page; repr() round-trips the float exactly
+    return f"{float(score)!r}:{user_id}"
+
+
+def parse_ranking_cursor(cursor):
+    score, user_id = cursor.split(':')
+    return float(score), int(user_id)
 
 
 def register_challenge_routes(app):
@@ -64,7 +192,7 @@ def register_challenge_routes(app):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        challenge = Challenge.query.get(challenge_id)
+        challenge = get_challenge(challenge_id)
         if not challenge:
             return jsonify({"error": "Challenge not found"}), 404
 
@@ -180,6 +308,10 @@ def register_challenge_routes(app):
 
         new_community_challenge = CommunityChallenge(challenge_id=new_challenge.id, created_by=created_by)
         db.session.add(new_community_challenge)
+        db.session.flush()
+
+        # Create the impact totals row up front so logging only ever has to UPDATE it
+        db.session.add(CommunityChallengeImpactTotals(community_challenge_id=new_community_challenge.id))
         db.session.commit()
 
         return jsonify({"message": "Community challenge created successfully",
@@ -198,7 +330,7 @@ def register_challenge_routes(app):
             return jsonify({"error": "User not found"}), 404
 
         # Ensure community challenge exists
-        community_challenge = CommunityChallenge.query.get(community_challenge_id)
+        community_challenge = get_community_challenge(community_challenge_id)
         if not community_challenge:
             return jsonify({"error": "Community challenge not found"}), 404
 
@@ -219,6 +351,7 @@ def register_challenge_routes(app):
         )
         db.session.add(new_participant)
         db.session.commit()
+        invalidate_community_ranking(community_challenge_id)
 
         return jsonify({"message": "Successfully joined the community challenge"}), 200
 
@@ -273,11 +406,17 @@ def register_challenge_routes(app):
             return jsonify({"error": "User is not the creator of the community challenge"}), 403
 
         # Check if there are other participants
-        if community_challenge.participants.count() > 1:  # Count includes the creator as a participant
+        if len(community_challenge.participants) > 1:  # Count includes the creator as a participant
             return jsonify({"error": "Community challenge has other participants"}), 403
 
+        CommunityChallengeImpactTotals.query.filter_by(community_challenge_id=community_challenge_id).delete()
+        # The creator's own participation goes with the challenge
+        for participant in community_challenge.participants:
+            db.session.delete(participant)
         db.session.delete(community_challenge)
         db.session.commit()
+        invalidate_community_challenge(community_challenge_id)
+        invalidate_community_ranking(community_challenge_id)
 
         return jsonify({"message": "Community challenge deleted successfully"}), 200
 
@@ -291,7 +430,7 @@ def register_challenge_routes(app):
             return jsonify({"error": "User is not the creator of the community challenge"}), 403
 
         data = request.get_json()
-        challenge = community_challenge.challenge
+        challenge = Challenge.query.get(community_challenge.challenge_id)
         new_start_date = datetime.fromisoformat(data.get('start_date'))
         new_end_date = datetime.fromisoformat(data.get('end_date'))
 
@@ -305,6 +444,7 @@ def register_challenge_routes(app):
         challenge.end_date = new_end_date
 
         db.session.commit()
+        invalidate_challenge(challenge.id)
         return jsonify({"message": "Community challenge updated successfully"}), 200
 
     @app.route('/get_badges/<int:user_id>', methods=['GET'])
@@ -328,9 +468,10 @@ def register_challenge_routes(app):
         if not personal_challenges:
             return jsonify({"message": "No personal challenges found for this user"}), 200
 
+        challenges = get_challenges(part.challenge_id for part in personal_challenges)
         challenge_details = []
         for part in personal_challenges:
-            challenge = Challenge.query.get(part.challenge_id)
+            challenge = challenges.get(part.challenge_id)
             if not challenge:
                 continue
 
@@ -407,10 +548,11 @@ def register_challenge_routes(app):
     @app.route('/get_community_challenges', methods=['GET'])
     def get_community_challenges():
         community_challenges = CommunityChallenge.query.all()
+        challenges = get_challenges(community_challenge.challenge_id for community_challenge in community_challenges)
 
         challenges_data = []
         for community_challenge in community_challenges:
-            challenge = Challenge.query.get(community_challenge.challenge_id)
+            challenge = challenges[community_challenge.challenge_id]
             challenge_data = {
                 "id": community_challenge.id,
                 "name": challenge.name,
@@ -424,97 +566,140 @@ def register_challenge_routes(app):
 
         return jsonify(challenges_data)
 
-    @app.route('/get_sent_personal_challenges/<int:user_id>', methods=['GET'])
-    def get_sent_personal_challenges(user_id):
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+    @app.route('/community_challenge_ranking/<int:community_challenge_id>', methods=['GET'])
+    def get_community_challenge_ranking(community_challenge_id):
+        """
+        Participants ranked by summed impact score, highest first (ties by user id). Pages are keyset
+        paginated: pass the previous page's next_cursor as ?after= to get the next one.
+        """
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        if per_page < 1:
+            return jsonify({"error": "Invalid pagination parameters"}), 400
+        try:
+            after = parse_ranking_cursor(request.args['after']) if 'after' in request.args else None
+        except ValueError:
+            return jsonify({"error": "Invalid cursor"}), 400
+
+        ranking = community_challenge_ranking(community_challenge_id)
+        if not len(ranking) and not get_community_challenge(community_challenge_id):
+            return jsonify({"error": "Community challenge not found"}), 404
 
-        sent_challenges = [challenge for challenge in user.sent_challenges if challenge.challenge_id is not None]
-        if not sent_challenges:
-            return jsonify({"error": "No sent personal challenges found for this user"}), 404
+        start, page = ranking.page(after, per_page)
+        details = {}
+        if page:
+            # The ranking comes from the primary, so a participant who just joined may not be on a replica yet
+            with primary_reads():
+                details = {user_id: (username, profile_picture, status)
+                           for user_id, username, profile_picture, status in
+                           db.session.query(User.id, User.username, User.profile_picture,
+                                            CommunityChallengeParticipant.status)
+                           .join(CommunityChallengeParticipant,
+                                 CommunityChallengeParticipant.participant_id == User.id)
+                           .filter(CommunityChallengeParticipant.community_challenge_id == community_challenge_id,
+                                   User.id.in_([user_id for _, user_id in page]))}
+
+        has_more = start + per_page < len(ranking)
+        return jsonify({
+            "community_challenge_id": community_challenge_id,
+            "per_page": per_page,
+            "has_more": has_more,
+            "next_cursor": ranking_cursor(-page[-1][0], page[-1][1]) if has_more else None,
+            "participants": [{
+                "rank": start + position + 1,
+                "user_id": user_id,
+                "username": details[user_id][0],
+                "profile_picture": details[user_id][1],
+                "status": details[user_id][2],
+                "impact_score": -negated_score
+            } for position, (negated_score, user_id) in enumerate(page) if user_id in details]
+        }), 200
 
-        challenge_details = [{
-            'id': challenge.id,
-            'recipient_id': challenge.user_id,
-            'recipient_username': challenge.user.username,
-            'challenge_id': challenge.challenge_id,
-            'challenge_name': challenge.challenge.name,
-            'timestamp': challenge.timestamp.isoformat(),
-            'status': challenge.status
-        } for challenge in sent_challenges]
+    @app.route('/challenge_inbox/<int:user_id>', methods=['GET'])
+    def get_challenge_inbox(user_id):
+        """
+        Query parameters: direction ('received' or 'sent', default received), type ('personal',
+        'community' or 'all', default all), status (optional), limit (default 50, max 200), before_id
+        (the next_cursor of the previous page) and include_archived.
+        """
+        direction = request.args.get('direction', 'received')
+        kind = request.args.get('type', 'all')
+        status = request.args.get('status')
+        limit = request.args.get('limit', INBOX_DEFAULT_LIMIT, type=int)
+        before_id = request.args.get('before_id', type=int)
+
+        if direction not in INBOX_DIRECTIONS or kind not in INBOX_TYPES:
+            return jsonify({"error": "Invalid direction or type"}), 400
+        if limit < 1 or limit > INBOX_MAX_LIMIT:
+            return jsonify({"error": f"limit must be between 1 and {INBOX_MAX_LIMIT}"}), 400
+
+        if get_user_loader().get(user_id) is None:
+            return jsonify({"error": "User not found"}), 404
 
-        return jsonify(challenge_details), 200
+        rows = query_challenge_inbox(user_id, direction, kind, status, before_id, limit + 1)
+        if include_archived(request.args):
+            # Pending invites are never archived, so the two tables interleave by id: merge their pages
+            archived = query_challenge_inbox(user_id, direction, kind, status, before_id, limit + 1,
+                                             model=ChallengesInboxArchive)
+            rows = sorted(rows + archived, key=lambda row: row.id, reverse=True)[:limit + 1]
+        return jsonify({
+            "items": [{
+                'id': row.id,
+                'type': 'community' if row.community_challenge_id is not None else 'personal',
+                'sender_id': row.sender_id,
+                'sender_username': row.sender_username,
+                'recipient_id': row.user_id,
+                'recipient_username': row.recipient_username,
+                'challenge_id': row.challenge_id,
+                'community_challenge_id': row.community_challenge_id,
+                'challenge_name': row.challenge_name,
+                'timestamp': row.timestamp.isoformat(),
+                'status': row.status
+            } for row in rows[:limit]],
+            "next_cursor": rows[limit - 1].id if len(rows) > limit else None
+        }), 200
 
-    @app.route('/get_sent_community_challenges/<int:user_id>', methods=['GET'])
-    def get_sent_community_challenges(user_id):
-        user = User.query.get(user_id)
-        if not user:
+    def legacy_inbox_response(user_id, direction, kind):
+        if get_user_loader().get(user_id) is None:
             return jsonify({"error": "User not found"}), 404
 
-        sent_challenges = [challenge for challenge in user.sent_challenges if
-                           challenge.community_challenge_id is not None]
-        if not sent_challenges:
-            return jsonify({"error": "No sent community challenges found for this user"}), 404
-
-        challenge_details = [{
-            'id': challenge.id,
-            'recipient_id': challenge.user_id,
-            'recipient_username': challenge.user.username,
-            'community_challenge_id': challenge.community_challenge_id,
-            'community_challenge_name': Challenge.query.get(challenge.community_challenge.challenge_id).name,
-            'timestamp': challenge.timestamp.isoformat(),
-            'status': challenge.status
-        } for challenge in sent_challenges]
+        # Same ascending id order as the user.sent_challenges/received_challenges lists these routes returned
+        rows = query_challenge_inbox(user_id, direction, kind, newest_first=False)
+        if not rows:
+            return jsonify({"error": f"No {direction} {kind} challenges found for this user"}), 404
+
+        counterpart = 'recipient' if direction == 'sent' else 'sender'
+        challenge_details = []
+        for row in rows:
+            details = {
+                'id': row.id,
+                f'{counterpart}_id': row.user_id if direction == 'sent' else row.sender_id,
+                f'{counterpart}_username': row.recipient_username if direction == 'sent' else row.sender_username,
+            }
+            if kind == 'personal':
+                details.update(challenge_id=row.challenge_id, challenge_name=row.challenge_name)
+            else:
+                details.update(community_challenge_id=row.community_challenge_id,
+                               community_challenge_name=row.challenge_name)
+            details.update(timestamp=row.timestamp.isoformat(), status=row.status)
+            challenge_details.append(details)
 
         return jsonify(challenge_details), 200
 
-    @app.route('/get_received_personal_challenges/<int:user_id>', methods=['GET'])
-    def get_received_personal_challenges(user_id):
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
+    @app.route('/get_sent_personal_challenges/<int:user_id>', methods=['GET'])
+    def get_sent_personal_challenges(user_id):
+        return legacy_inbox_response(user_id, 'sent', 'personal')
 
-        received_challenges = [challenge for challenge in user.received_challenges if
-                               challenge.challenge_id is not None]
-        if not received_challenges:
-            return jsonify({"error": "No received personal challenges found for this user"}), 404
-
-        challenge_details = [{
-            'id': challenge.id,
-            'sender_id': challenge.sender_id,
-            'sender_username': challenge.sender.username,
-            'challenge_id': challenge.challenge_id,
-            'challenge_name': challenge.challenge.name,
-            'timestamp': challenge.timestamp.isoformat(),
-            'status': challenge.status
-        } for challenge in received_challenges]
+    @app.route('/get_sent_community_challenges/<int:user_id>', methods=['GET'])
+    def get_sent_community_challenges(user_id):
+        return legacy_inbox_response(user_id, 'sent', 'community')
 
-        return jsonify(challenge_details), 200
+    @app.route('/get_received_personal_challenges/<int:user_id>', methods=['GET'])
+    def get_received_personal_challenges(user_id):
+        return legacy_inbox_response(user_id, 'received', 'personal')
 
     @app.route('/get_received_community_challenges/<int:user_id>', methods=['GET'])
     def get_received_community_challenges(user_id):
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({"error": "User not found"}), 404
-
-        received_challenges = [challenge for challenge in user.received_challenges if
-                               challenge.community_challenge_id is not None]
-        if not received_challenges:
-            return jsonify({"error": "No received community challenges found for this user"}), 404
-
-        challenge_details = [{
-            'id': challenge.id,
-            'sender_id': challenge.sender_id,
-            'sender_username': challenge.sender.username,
-            'community_challenge_id': challenge.community_challenge_id,
-            'community_challenge_name': Challenge.query.get(
-                CommunityChallenge.query.get(challenge.community_challenge_id).challenge_id).name,
-            'timestamp': challenge.timestamp.isoformat(),
-            'status': challenge.status
-        } for challenge in received_challenges]
-
-        return jsonify(challenge_details), 200
+        return legacy_inbox_response(user_id, 'received', 'community')
 
     @app.route('/send_personal_challenge', methods=['POST'])
     def send_personal_challenge():
@@ -525,7 +710,7 @@ def register_challenge_routes(app):
 
         sender = User.query.get(sender_id)
         recipient = User.query.get(recipient_id)
-        challenge = Challenge.query.get(challenge_id)
+        challenge = get_challenge(challenge_id)
 
         if not sender or not recipient or not challenge:
             return jsonify({"error": "Invalid sender, recipient, or challenge"}), 400
@@ -551,7 +736,7 @@ def register_challenge_routes(app):
 
         sender = User.query.get(sender_id)
         recipient = User.query.get(recipient_id)
-        community_challenge = CommunityChallenge.query.get(community_challenge_id)
+        community_challenge = get_community_challenge(community_challenge_id)
 
         if not sender or not recipient or not community_challenge:
             return jsonify({"error": "Invalid sender, recipient, or community challenge"}), 400
@@ -616,6 +801,8 @@ def register_challenge_routes(app):
 
         challenge_inbox.status = "accepted"
         db.session.commit()
+        if challenge_type == 'community':
+            invalidate_community_ranking(challenge_inbox.community_challenge_id)
 
         return jsonify({"message": "Challenge accepted successfully"}), 200
 
@@ -0,0 +1,206 @@
+# dashboard_views.py
+
+import os
+
+from flask import request, jsonify
+
+from caching import TTLCache
+from challenge_cache import get_challenges, get_community_challenges
+from extensions import db, primary_reads, READ_METHODS
+from models import User, UserPreference, Badge, PersonalChallengeParticipant, CommunityChallengeParticipant, \
+    EnvironmentalImpact, Notification
+from models.challenge_models import user_badges
+
+DASHBOARD_FIELDS = ('profile', 'eco_points', 'badges', 'challenges', 'notifications', 'leaderboard')
+
+# Sections are cached per user under (user_id, section), so every field selection shares the same entries
+# and a write can drop all of a user's sections at once. The leaderboard is shared by all users and only
+# expires.
+#
+# The cache lives in each worker process and a write only drops the entries of the worker that handled it.
+# The other workers keep serving their copy until it expires, so after a write a dashboard can be up to
+# DASHBOARD_CACHE_TTL seconds (default 10) stale, and so can anything changed outside a request (Celery
+# tasks, the CLI). Keep the TTL short or set it to 0 where that matters.
+dashboard_cache = TTLCache(ttl=float(os.getenv('DASHBOARD_CACHE_TTL', 10)), max_entries=4096)
+LEADERBOARD_KEY = ('leaderboard', None)
+
+# Request fields naming the users a write may have changed, in the URL or the JSON body
+USER_ID_FIELDS = ('user_id', 'sender_id', 'recipient_id', 'participant_id', 'friend_id', 'created_by')
+
+
+def load_profile(user_id):
+    row = db.session.query(User.username, User.email, User.profile_picture, User.eco_points, UserPreference.id,
+                           UserPreference.receive_notifications, UserPreference.privacy_settings) \
+        .outerjoin(UserPreference, UserPreference.user_id == User.id) \
+        .filter(User.id == user_id) \
+        .order_by(UserPreference.id) \
+        .first()
+    if row is None:
+        return None
+
+    username, email, profile_picture, eco_points, preference_id, receive_notifications, privacy_settings = row
+    profile = {
+        "username": username,
+        "email": email,
+        "profile_picture": profile_picture,
+        "eco_points": eco_points
+    }
+    if preference_id is not None:
+        profile["preferences"] = {
+            "receive_notifications": receive_notifications,
+            "privacy_settings": privacy_settings
+        }
+    return profile
+
+
+def load_badges(user_id):
+    return [name for (name,) in db.session.query(Badge.name)
+            .join(user_badges, user_badges.c.badge_id == Badge.id)
+            .filter(user_badges.c.user_id == user_id)]
+
+
+def load_challenge_status(user_id):
+    """The /user_challenge_status payload, built with three queries whatever the number of challenges
+    (challenge names come from the challenge cache)."""
+    personal_challenges = PersonalChallengeParticipant.query.filter_by(user_id=user_id).all()
+    community_challenges = CommunityChallengeParticipant.query.filter_by(participant_id=user_id).all()
+
+    # First impact record of every challenge, matching the per-challenge .first() lookups this replaces
+    personal_scores, community_scores = {}, {}
+    for personal_challenge_id, community_challenge_id, impact_score in db.session.query(
+            EnvironmentalImpact.personal_challenge_id, EnvironmentalImpact.community_challenge_id,
+            EnvironmentalImpact.impact_score) \
+            .filter(EnvironmentalImpact.user_id == user_id,
+                    (EnvironmentalImpact.personal_challenge_id.isnot(None)) |
+                    (EnvironmentalImpact.community_challenge_id.isnot(None))) \
+            .order_by(EnvironmentalImpact.id):
+        if personal_challenge_id is not None:
+            personal_scores.setdefault(personal_challenge_id, impact_score)
+        if community_challenge_id is not None:
+            community_scores.setdefault(community_challenge_id, impact_score)
+
+    challenges = get_challenges(pc.challenge_id for pc in personal_challenges)
+    community_challenges_by_id = get_community_challenges(cc.community_challenge_id for cc in community_challenges)
+    challenges.update(get_challenges(
+        community_challenge.challenge_id for community_challenge in community_challenges_by_id.values()))
+
+    personal_challenge_status = []
+    for pc in personal_challenges:
+        challenge = challenges.get(pc.challenge_id)
+        if not challenge:
+            continue
+
+        personal_challenge_status.append({
+            "challenge_id": challenge.id,
+            "name": challenge.name,
+            "status": "Participating",
+            "type": "Personal",
+            "start_date": pc.start_date.isoformat(),
+            "end_date": pc.end_date.isoformat() if pc.end_date else None,
+            "impact_score": personal_scores.get(pc.id, 0)
+        })
+
+    community_challenge_status = []
+    for cc in community_challenges:
+        community_challenge = community_challenges_by_id.get(cc.community_challenge_id)
+        if not community_challenge:
+            continue
+
+        challenge = challenges.get(community_challenge.challenge_id)
+        if not challenge:
+            continue
+
+        community_challenge_status.append({
+            "community_challenge_id": community_challenge.id,
+            "challenge_id": challenge.id,
+            "name": challenge.name,
+            "status": cc.status,
+            "type": "Community",
+            "start_date": cc.start_date.isoformat(),
+            "end_date": cc.end_date.isoformat() if cc.end_date else None,
+            "impact_score": community_scores.get(cc.community_challenge_id, 0)
+        })
+
+    return personal_challenge_status + community_challenge_status
+
+
+def load_notifications(user_id):
+    return [{"id": notification_id, "content": content, "is_read": is_read,
+             "timestamp": timestamp.strftime('%Y-%m-%d %H:%M:%S')}
+            for notification_id, content, is_read, timestamp in db.session.query(
+                Notification.id, Notification.content, Notification.is_read, Notification.timestamp)
+            .filter(Notification.user_id == user_id)
+            .order_by(Notification.id)]
+
+
+def load_leaderboard():
+    return [{"username": username, "eco_points": eco_points} for username, eco_points in db.session.query(
+        User.username, User.eco_points).order_by(User.eco_points.desc()).limit(10)]
+
+
+def cached(key, loader):
+    value = dashboard_cache.get(key)
+    if value is None:
+        # From the primary: the entry is shared by every request for TTL seconds, see challenge_cache
+        with primary_reads():
+            value = loader()
+        if value is not None:
+            dashboard_cache.set(key, value)
+    return value
+
+
+def invalidate_dashboard(user_id):
+    dashboard_cache.invalidate(int(user_id))
+
+
+def _user_ids_in_request():
+    user_ids = set()
+    for field in USER_ID_FIELDS:
+        if request.view_args and field in request.view_args:
+            user_ids.add(request.view_args[field])
+    data = request.get_json(silent=True)
+    if isinstance(data, dict):
+        user_ids.update(data[field] for field in USER_ID_FIELDS if data.get(field) is not None)
+    return user_ids
+
+
+def register_dashboard_routes(app):
+    @app.route('/dashboard/<int:user_id>', methods=['GET'])
+    def get_dashboard(user_id):
+        """
+        Everything the app's home screen needs in one call: the responses of /view_profile,
+        /get_eco_points, /get_badges, /user_challenge_status, /get_notifications and /leaderboards.
+        ?fields=profile,badges,... limits the response to those sections (default: all of them).
+        """
+        fields = request.args.get('fields')
+        fields = [field.strip() for field in fields.split(',') if field.strip()] if fields else DASHBOARD_FIELDS
+        unknown = [field for field in fields if field not in DASHBOARD_FIELDS]
+        if unknown:
+            return jsonify({"error": f"Unknown fields: {', '.join(unknown)}"}), 400
+
+        # The profile doubles as the existence check, so it is always loaded
+        profile = cached((user_id, 'profile'), lambda: load_profile(user_id))
+        if profile is None:
+            return jsonify({"error": "User not found"}), 404
+
+        loaders = {
+            'profile': lambda: profile,
+            'eco_points': lambda: profile["eco_points"],
+            'badges': lambda: cached((user_id, 'badges'), lambda: load_badges(user_id)),
+            'challenges': lambda: cached((user_id, 'challenges'), lambda: load_challenge_status(user_id)),
+            'notifications': lambda: cached((user_id, 'notifications'), lambda: load_notifications(user_id)),
+            'leaderboard': lambda: cached(LEADERBOARD_KEY, load_leaderboard),
+        }
+        return jsonify({field: loaders[field]() for field in fields}), 200
+
+    @app.after_request
+    def invalidate_dashboards_after_write(response):
+        # Drop this worker's cached sections of every user a successful write names (see dashboard_cache
+        # for the staleness window of the other workers)
+        if request.method not in READ_METHODS and response.status_code < 400:
+            for user_id in _user_ids_in_request():
+                try:
+                    invalidate_dashboard(user_id)
+                except (TypeError, ValueError):
+                    continue
+        return response
@@ -2,10 +2,222 @@
 
 import math
 
+import click
 from flask import request, jsonify
+from sqlalchemy import func, update
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 
+from challenge_cache import get_community_challenge
 from extensions import db
-from models import EnvironmentalImpact, UserAction, User, PersonalChallengeParticipant, CommunityChallengeParticipant
+from serialization import RowSerializer, rows_response
+from models import EnvironmentalImpact, UserAction, User, PersonalChallengeParticipant, CommunityChallengeParticipant, \
+    CommunityChallenge, ImpactTotals, CommunityChallengeImpactTotals, IMPACT_TOTAL_FIELDS
+from .challenge_views import update_community_ranking
+
+IMPACT_COLUMNS = ('id', 'user_id', 'impact_score', 'water_saved', 'plastic_waste_reduced', 'co2_emissions_prevented',
+                  'money_saved', 'recycled_bottles', 'single_use_bottles', 'refillable_bottles')
+impact_serializer = RowSerializer(*IMPACT_COLUMNS)
+
+# Primary key of the single ImpactTotals row. Every impact write updates this row, so writers queue on its
+# row lock for the (short) rest of their transaction
+GLOBAL_IMPACT_TOTALS_ID = 1
+
+
+def _increment_totals(model, key_column, key_value, deltas):
+    """Adds the deltas to one totals row, creating the row if it does not exist yet. This is a single
+    upsert, so two requests creating the same row at once cannot collide on its primary key."""
+    values = {field: deltas.get(field, 0) for field in IMPACT_TOTAL_FIELDS}
+    increments = [field for field, delta in values.items() if delta]
+    if not increments:
+        return
+
+    table = model.__table__
+    row = {key_column.key: key_value, **values}
+    dialect = db.session.get_bind(mapper=model.__mapper__, clause=table.insert()).dialect.name
+    if dialect == 'mysql':
+        statement = mysql_insert(table).values(row)
+        statement = statement.on_duplicate_key_update(
+            {field: table.c[field] + statement.inserted[field] for field in increments})
+    elif dialect in ('sqlite', 'postgresql'):
+        statement = (sqlite_insert if dialect == 'sqlite' else postgresql_insert)(table).values(row)
+        statement = statement.on_conflict_do_update(
+            index_elements=[key_column.key],
+            set_={field: table.c[field] + statement.excluded[field] for field in increments})
+    else:
+        result = db.session.execute(update(table).where(table.c[key_column.key] == key_value)
+                                    .values({field: table.c[field] + values[field] for field in increments}))
+        if result.rowcount:
+            return
+        statement = table.insert().values(row)
+    db.session.execute(statement)
+
+
+def apply_impact_totals_deltas(deltas, community_challenge_id=None):
+    """Applies environmental impact deltas to the global and community challenge totals in the current
+    transaction, so they are committed (or rolled back) together with the impact record itself."""
+    _increment_totals(ImpactTotals, ImpactTotals.id, GLOBAL_IMPACT_TOTALS_ID, deltas)
+    if community_challenge_id:
+        _increment_totals(CommunityChallengeImpactTotals, CommunityChallengeImpactTotals.community_challenge_id,
+                          community_challenge_id, deltas)
+
+
+def serialize_impact_totals(totals):
+    return {field: (getattr(totals, field) or 0) if totals else 0 for field in IMPACT_TOTAL_FIELDS}
+
+
+def rebuild_impact_totals(dry_run=False):
+    """Recomputes every totals row from EnvironmentalImpact and returns the drift found as a list of
+    (scope, field, stored, actual) tuples. Rows are rewritten unless dry_run is set."""
+    sums = [func.coalesce(func.sum(getattr(EnvironmentalImpact, field)), 0) for field in IMPACT_TOTAL_FIELDS]
+
+    expected = {('global', GLOBAL_IMPACT_TOTALS_ID): db.session.query(*sums).one()}
+    for community_challenge_id, in db.session.query(CommunityChallenge.id):
+        expected[('community', community_challenge_id)] = (0,) * len(IMPACT_TOTAL_FIELDS)
+    community_sums = db.session.query(EnvironmentalImpact.community_challenge_id, *sums) \
+        .filter(EnvironmentalImpact.community_challenge_id.isnot(None)) \
+        .group_by(EnvironmentalImpact.community_challenge_id)
+    for community_challenge_id, *values in community_sums:
+        expected[('community', community_challenge_id)] = values
+
+    drift = []
+    for (scope, key), values in expected.items():
+        if scope == 'global':
+            row = ImpactTotals.query.get(key) or ImpactTotals(id=key)
+        else:
+            row = CommunityChallengeImpactTotals.query.get(key) or \
+                  CommunityChallengeImpactTotals(community_challenge_id=key)
+        for field, actual in zip(IMPACT_TOTAL_FIELDS, values):
+            stored = getattr(row, field) or 0
+            if stored != actual:
+                drift.append((f"{scope}:{key}", field, stored, actual))
+            setattr(row, field, actual)
+        if not dry_run:
+            db.session.add(row)
+
+    if dry_run:
+        db.session.rollback()
+    else:
+        db.session.commit()
+    return drift
+
+
+# The impact of each bottle type on environmental savings, shared by
+# update_environmental_impact and the bulk importer
+CO2_SAVINGS_FACTOR = {
+    'recycled': 0.1,  # Example factor: Recycled bottles save 10% of baseline CO2 savings per use
+    'single-use': 0,  # Single-use bottles do not save CO2
+    'refillable': 0.3,  # Refillable bottles save 30% of baseline CO2 savings per use
+}
+WATER_SAVINGS_FACTOR = 1  # Assuming using a refillable bottle saves all the baseline water per use
+PLASTIC_WASTE_FACTOR = {
+    'recycled': 0.02,  # Recycled bottles reduce 2% of baseline plastic waste per use
+    'single-use': -0.03,  # Single-use bottles add 3% of baseline plastic waste per use
+    'refillable': 0,  # Refillable bottles do not directly reduce additional plastic waste per use
+}
+MONEY_SAVINGS_FACTOR = 0.15  # Assuming using a refillable bottle saves 15% of baseline money savings per use
+
+
+def get_baseline_values():
+    """Calculates and returns baseline values for each environmental metric."""
+    co2_saved_per_year = 156  # kg CO2 savings per person per year using a reusable bottle
+    plastic_saved_per_year = 1.5  # kg plastic waste saved per person per year
+    money_saved_per_year = 308.88  # dollars saved per person per year
+    water_saved_per_use = 0.83  # liters of water saved per use
+
+    # Calculate baseline values based on daily usage
+    baseline_co2_saved_per_action = co2_saved_per_year / 365
+    baseline_plastic_saved_per_action = plastic_saved_per_year / 365
+    baseline_money_saved_per_action = money_saved_per_year / 365
+    baseline_water_saved_per_action = water_saved_per_use
+
+    return {
+        'co2_saved_per_action': baseline_co2_saved_per_action,
+        'plastic_saved_per_action': baseline_plastic_saved_per_action,
+        'money_saved_per_action': baseline_money_saved_per_action,
+        'water_saved_per_action': baseline_water_saved_per_action,
+    }
+
+
+def calculate_impact_score(baseline_values, co2_saved, water_saved, plastic_waste_reduced, money_saved):
+    """Calculates the overall impact score based on normalized and weighted contributions of different
+    environmental savings."""
+    weights = {'co2_saved': 1, 'water_saved': 1, 'plastic_waste_reduced': 1, 'money_saved': 1}
+
+    normalized_co2_saved = co2_saved / baseline_values['co2_saved_per_action']
+    normalized_water_saved = water_saved / baseline_values['water_saved_per_action']
+    normalized_plastic_waste_reduced = plastic_waste_reduced / baseline_values['plastic_saved_per_action']
+    normalized_money_saved = money_saved / baseline_values['money_saved_per_action']
+
+    impact_score = (
+            normalized_co2_saved * weights['co2_saved'] +
+            normalized_water_saved * weights['water_saved'] +
+            normalized_plastic_waste_reduced * weights['plastic_waste_reduced'] +
+            normalized_money_saved * weights['money_saved']
+    )
+    return math.ceil(impact_score)
+
+
+def update_environmental_impact(impact_record, bottle_type, count):
+    baseline_values = get_baseline_values()
+
+    # Initialize impact record fields if they are None
+    impact_record.co2_emissions_prevented = impact_record.co2_emissions_prevented or 0
+    impact_record.water_saved = impact_record.water_saved or 0
+    impact_record.plastic_waste_reduced = impact_record.plastic_waste_reduced or 0
+    impact_record.money_saved = impact_record.money_saved or 0
+    impact_record.refillable_bottles = impact_record.refillable_bottles or 0
+    impact_record.recycled_bottles = impact_record.recycled_bottles or 0
+    impact_record.single_use_bottles = impact_record.single_use_bottles or 0
+
+    # Calculate the environmental impact based on the type of bottle and count
+    co2_emissions_saved = math.ceil(
+        CO2_SAVINGS_FACTOR.get(bottle_type, 0) * baseline_values['co2_saved_per_action'] * count)
+    water_saved = math.ceil(WATER_SAVINGS_FACTOR * baseline_values[
+        'water_saved_per_action'] * count) if bottle_type == 'refillable' else 0
+    plastic_waste_reduced = math.ceil(
+        PLASTIC_WASTE_FACTOR.get(bottle_type, 0) * baseline_values['plastic_saved_per_action'] * count)
+    money_saved = math.ceil(MONEY_SAVINGS_FACTOR * baseline_values[
+        'money_saved_per_action'] * count) if bottle_type == 'refillable' else 0
+
+    # Track what this call adds so the aggregate totals can be updated with the same deltas
+    deltas = {
+        'co2_emissions_prevented': co2_emissions_saved,
+        'water_saved': water_saved,
+        'plastic_waste_reduced': plastic_waste_reduced,
+        'money_saved': money_saved,
+    }
+
+    # Increment counts based on bottle type
+    if bottle_type == 'recycled':
+        impact_record.recycled_bottles += count
+        deltas['recycled_bottles'] = count
+    elif bottle_type == 'single-use':
+        impact_record.single_use_bottles += count
+        deltas['single_use_bottles'] = count
+    elif bottle_type == 'refillable':
+        impact_record.refillable_bottles += count
+        deltas['refillable_bottles'] = count
+
+    # Update the environmental impact record
+    impact_record.co2_emissions_prevented += co2_emissions_saved
+    impact_record.water_saved += water_saved
+    impact_record.plastic_waste_reduced += plastic_waste_reduced
+    impact_record.money_saved += money_saved
+
+    # Recalculate the impact score with updated values
+    new_impact_score = calculate_impact_score(
+        baseline_values,
+        impact_record.co2_emissions_prevented,
+        impact_record.water_saved,
+        impact_record.plastic_waste_reduced,
+        impact_record.money_saved
+    )
+    deltas['impact_score'] = new_impact_score - (impact_record.impact_score or 0)
+    impact_record.impact_score = new_impact_score
+
+    return deltas
 
 
 def register_environment_routes(app):
@@ -36,24 +248,10 @@ def register_environment_routes(app):
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        impacts = EnvironmentalImpact.query.filter_by(user_id=user_id).all()
-
-        impact_details = [
-            {
-                "id": impact.id,
-                "user_id": impact.user_id,
-                "impact_score": impact.impact_score,
-                "water_saved": impact.water_saved,
-                "plastic_waste_reduced": impact.plastic_waste_reduced,
-                "co2_emissions_prevented": impact.co2_emissions_prevented,
-                "money_saved": impact.money_saved,
-                "recycled_bottles": impact.recycled_bottles,
-                "single_use_bottles": impact.single_use_bottles,
-                "refillable_bottles": impact.refillable_bottles,
-            } for impact in impacts
-        ]
-
-        return jsonify(impact_details), 200
+        impacts = db.session.query(*[getattr(EnvironmentalImpact, column) for column in IMPACT_COLUMNS]) \
+            .filter(EnvironmentalImpact.user_id == user_id).all()
+
+        return rows_response(impact_serializer, impacts)
 
     @app.route('/get_eco_points/<int:user_id>', methods=['GET'])
     def get_eco_points(user_id):
@@ -79,43 +277,29 @@ def register_environment_routes(app):
 
         return jsonify({"message": "User impact score updated successfully", "eco_points": user.eco_points}), 200
 
-    def get_baseline_values():
-        """Calculates and returns baseline values for each environmental metric."""
-        co2_saved_per_year = 156  # kg CO2 savings per person per year using a reusable bottle
-        plastic_saved_per_year = 1.5  # kg plastic waste saved per person per year
-        money_saved_per_year = 308.88  # dollars saved per person per year
-        water_saved_per_use = 0.83  # liters of water saved per use
-
-        # Calculate baseline values based on daily usage
-        baseline_co2_saved_per_action = co2_saved_per_year / 365
-        baseline_plastic_saved_per_action = plastic_saved_per_year / 365
-        baseline_money_saved_per_action = money_saved_per_year / 365
-        baseline_water_saved_per_action = water_saved_per_use
-
-        return {
-            'co2_saved_per_action': baseline_co2_saved_per_action,
-            'plastic_saved_per_action': baseline_plastic_saved_per_action,
-            'money_saved_per_action': baseline_money_saved_per_action,
-            'water_saved_per_action': baseline_water_saved_per_action,
-        }
-
-    def calculate_impact_score(baseline_values, co2_saved, water_saved, plastic_waste_reduced, money_saved):
-        """Calculates the overall impact score based on normalized and weighted contributions of different
-        environmental savings."""
-        weights = {'co2_saved': 1, 'water_saved': 1, 'plastic_waste_reduced': 1, 'money_saved': 1}
-
-        normalized_co2_saved = co2_saved / baseline_values['co2_saved_per_action']
-        normalized_water_saved = water_saved / baseline_values['water_saved_per_action']
-        normalized_plastic_waste_reduced = plastic_waste_reduced / baseline_values['plastic_saved_per_action']
-        normalized_money_saved = money_saved / baseline_values['money_saved_per_action']
-
-        impact_score = (
-                normalized_co2_saved * weights['co2_saved'] +
-                normalized_water_saved * weights['water_saved'] +
-                normalized_plastic_waste_reduced * weights['plastic_waste_reduced'] +
-                normalized_money_saved * weights['money_saved']
-        )
-        return math.ceil(impact_score)
+    @app.route('/impact_totals', methods=['GET'])
+    def get_impact_totals():
+        totals = ImpactTotals.query.get(GLOBAL_IMPACT_TOTALS_ID)
+        return jsonify(serialize_impact_totals(totals)), 200
+
+    @app.route('/impact_totals/community/<int:community_challenge_id>', methods=['GET'])
+    def get_community_challenge_impact_totals(community_challenge_id):
+        totals = CommunityChallengeImpactTotals.query.get(community_challenge_id)
+        if not totals and not get_community_challenge(community_challenge_id):
+            return jsonify({"error": "Community challenge not found"}), 404
+
+        impact_totals = serialize_impact_totals(totals)
+        impact_totals["community_challenge_id"] = community_challenge_id
+        return jsonify(impact_totals), 200
+
+    @app.cli.command('reconcile-impact-totals')
+    @click.option('--dry-run', is_flag=True, help="Report drift without rewriting the totals.")
+    def reconcile_impact_totals(dry_run):
+        """Rebuild the impact totals tables from EnvironmentalImpact and report any drift."""
+        drift = rebuild_impact_totals(dry_run=dry_run)
+        for scope, field, stored, actual in drift:
+            click.echo(f"{scope} {field}: stored={stored} actual={actual}")
+        click.echo(f"{len(drift)} drifted value(s) found" + (" (dry run, nothing written)" if dry_run else ""))
 
     @app.route('/log_water_usage', methods=['POST'])
     def log_water_usage():
@@ -169,71 +353,15 @@ def register_environment_routes(app):
             db.session.add(impact_record)
 
         try:
-            update_environmental_impact(impact_record, bottle_type, count)
+            deltas = update_environmental_impact(impact_record, bottle_type, count)
+            apply_impact_totals_deltas(deltas, impact_record.community_challenge_id)
             user.eco_points += impact_record.impact_score
             db.session.commit()
         except Exception as e:
             db.session.rollback()
             return jsonify({"error": "An error occurred while updating the environmental impact"}), 500
 
-        return jsonify({"message": "Water usage logged successfully"}), 200
+        if challenge_type == 'community':
+            update_community_ranking(int(challenge_id), int(user_id), deltas.get('impact_score', 0))
 
-    def update_environmental_impact(impact_record, bottle_type, count):
-        baseline_values = get_baseline_values()
-
-        # Initialize impact record fields if they are None
-        impact_record.co2_emissions_prevented = impact_record.co2_emissions_prevented or 0
-        impact_record.water_saved = impact_record.water_saved or 0
-        impact_record.plastic_waste_reduced = impact_record.plastic_waste_reduced or 0
-        impact_record.money_saved = impact_record.money_saved or 0
-        impact_record.refillable_bottles = impact_record.refillable_bottles or 0
-        impact_record.recycled_bottles = impact_record.recycled_bottles or 0
-        impact_record.single_use_bottles = impact_record.single_use_bottles or 0
-
-        # Define the impact of each bottle type on environmental savings
-        CO2_SAVINGS_FACTOR = {
-            'recycled': 0.1,  # Example factor: Recycled bottles save 10% of baseline CO2 savings per use
-            'single-use': 0,  # Single-use bottles do not save CO2
-            'refillable': 0.3,  # Refillable bottles save 30% of baseline CO2 savings per use
-        }
-        WATER_SAVINGS_FACTOR = 1  # Assuming using a refillable bottle saves all the baseline water per use
-        PLASTIC_WASTE_FACTOR = {
-            'recycled': 0.02,  # Recycled bottles reduce 2% of baseline plastic waste per use
-            'single-use': -0.03,  # Single-use bottles add 3% of baseline plastic waste per use
-            'refillable': 0,  # Refillable bottles do not directly reduce additional plastic waste per use
-        }
-        MONEY_SAVINGS_FACTOR = 0.15  # Assuming using a refillable bottle saves 15% of baseline money savings per use
-
-        # Calculate the environmental impact based on the type of bottle and count
-        co2_emissions_saved = math.ceil(
-            CO2_SAVINGS_FACTOR.get(bottle_type, 0) * baseline_values['co2_saved_per_action'] * count)
-        water_saved = math.ceil(WATER_SAVINGS_FACTOR * baseline_values[
-            'water_saved_per_action'] * count) if bottle_type == 'refillable' else 0
-        plastic_waste_reduced = math.ceil(
-            PLASTIC_WASTE_FACTOR.get(bottle_type, 0) * baseline_values['plastic_saved_per_action'] * count)
-        money_saved = math.ceil(MONEY_SAVINGS_FACTOR * baseline_values[
-            'money_saved_per_action'] * count) if bottle_type == 'refillable' else 0
-
-        # Increment counts based on bottle type
-        if bottle_type == 'recycled':
-            impact_record.recycled_bottles += count
-        elif bottle_type == 'single-use':
-            impact_record.single_use_bottles += count
-        elif bottle_type == 'refillable':
-            impact_record.refillable_bottles += count
-
-        # Update the environmental impact record
-        impact_record.co2_emissions_prevented += co2_emissions_saved
-        impact_record.water_saved += water_saved
-        impact_record.plastic_waste_reduced += plastic_waste_reduced
-        impact_record.money_saved += money_saved
-
-        # Recalculate the impact score with updated values
-        new_impact_score = calculate_impact_score(
-            baseline_values,
-            impact_record.co2_emissions_prevented,
-            impact_record.water_saved,
-            impact_record.plastic_waste_reduced,
-            impact_record.money_saved
-        )
-        impact_record.impact_score = new_impact_score
+        return jsonify({"message": "Water usage logged successfully"}), 200
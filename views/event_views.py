@@ -0,0 +1,61 @@
+# event_views.py
+
+import os
+import queue
+
+from flask import Response, jsonify
+
+from events import event_bus, format_sse
+from extensions import db
+from models import User
+
+# A comment line is sent after this many idle seconds so proxies and load balancers keep the stream open
+SSE_HEARTBEAT_SECONDS = float(os.getenv('SSE_HEARTBEAT_SECONDS', 15))
+# Reconnect delay, in milliseconds, suggested to EventSource clients
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', 5000))
+# Events buffered for a slow client before newer ones are dropped
+SSE_QUEUE_SIZE = 100
+
+SSE_HEADERS = {'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+
+# An open stream holds its worker for as long as the client stays connected, which would take a sync
+# gunicorn worker (the Procfile default) out of service. The Flask route therefore answers 501 unless this
+# is set, which is only safe with a threaded or async worker class (e.g. -k gthread --threads 100);
+# otherwise streams are served by asgi.py.
+EVENTS_WSGI_STREAMING = os.getenv('EVENTS_WSGI_STREAMING', '').lower() in ('1', 'true', 'yes')
+
+
+def register_event_routes(app):
+    @app.route('/events/<int:user_id>', methods=['GET'])
+    def stream_events(user_id):
+        """
+        Server-sent events for a user: 'message', 'challenge_invite' and 'notification' events carrying the new
+        row, so clients can drop their polling of /received_messages, /get_notifications and the challenge
+        inboxes and only refetch when told to. Served natively by asgi.py; here only with
+        EVENTS_WSGI_STREAMING, since each open stream holds a worker thread.
+        """
+        if not EVENTS_WSGI_STREAMING:
+            return jsonify({"error": "Event streams are served by the async mode (gunicorn asgi:app "
+                                     "-k uvicorn.workers.UvicornWorker)"}), 501
+        if db.session.get(User, user_id) is None:
+            return jsonify({"error": "User not found"}), 404
+        # The stream can stay open for hours; it must not keep a pooled connection checked out
+        db.session.close()
+
+        def stream():
+            # Subscribed inside the generator so the finally below always runs for a live subscription
+            events = queue.Queue(maxsize=SSE_QUEUE_SIZE)
+            token = event_bus.subscribe(user_id, events.put_nowait)
+            try:
+                yield f"retry: {SSE_RETRY_MS}\n\n"
+                while True:
+                    try:
+                        event_data = events.get(timeout=SSE_HEARTBEAT_SECONDS)
+                    except queue.Empty:
+                        yield ": keepalive\n\n"
+                        continue
+                    yield format_sse(event_data)
+            finally:
+                event_bus.unsubscribe(user_id, token)
+
+        return Response(stream(), mimetype='text/event-stream', headers=SSE_HEADERS)
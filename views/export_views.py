@@ -0,0 +1,185 @@
+# export_views.py
+
+import csv
+import io
+import json
+import sys
+import zlib
+from datetime import datetime
+
+import click
+from flask import request, jsonify, Response, stream_with_context
+from sqlalchemy import select, literal
+
+from extensions import db
+from models import EnvironmentalImpact, UserAction, Post, User, Challenge, PersonalChallengeParticipant, \
+    CommunityChallenge, CommunityChallengeParticipant
+
+# Rows fetched per round trip from the server-side cursor
+EXPORT_BATCH_ROWS = 1000
+# Encoded output is buffered up to this size before it is handed to the response or written to the file
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _impact_queries(user_id):
+    query = select(EnvironmentalImpact.id, EnvironmentalImpact.user_id, EnvironmentalImpact.impact_score,
+                   EnvironmentalImpact.water_saved, EnvironmentalImpact.plastic_waste_reduced,
+                   EnvironmentalImpact.co2_emissions_prevented, EnvironmentalImpact.money_saved,
+                   EnvironmentalImpact.recycled_bottles, EnvironmentalImpact.single_use_bottles,
+                   EnvironmentalImpact.refillable_bottles, EnvironmentalImpact.personal_challenge_id,
+                   EnvironmentalImpact.community_challenge_id).order_by(EnvironmentalImpact.id)
+    if user_id is not None:
+        query = query.where(EnvironmentalImpact.user_id == user_id)
+    return [query]
+
+
+def _action_queries(user_id):
+    query = select(UserAction.id, UserAction.user_id, UserAction.action_type, UserAction.date) \
+        .order_by(UserAction.id)
+    if user_id is not None:
+        query = query.where(UserAction.user_id == user_id)
+    return [query]
+
+
+def _post_queries(user_id):
+    query = select(Post.id.label('post_id'), Post.user_id, User.username, Post.content, Post.created_at,
+                   Post.updated_at).join(User, User.id == Post.user_id).order_by(Post.id)
+    if user_id is not None:
+        query = query.where(Post.user_id == user_id)
+    return [query]
+
+
+def _challenge_queries(user_id):
+    # Personal and community participations are exported one after the other with the same columns
+    personal = select(literal('personal').label('type'), PersonalChallengeParticipant.user_id,
+                      PersonalChallengeParticipant.challenge_id, literal(None).label('community_challenge_id'),
+                      Challenge.name, literal(None).label('status'), PersonalChallengeParticipant.start_date,
+                      PersonalChallengeParticipant.end_date) \
+        .join(Challenge, Challenge.id == PersonalChallengeParticipant.challenge_id) \
+        .order_by(PersonalChallengeParticipant.id)
+    community = select(literal('community').label('type'),
+                       CommunityChallengeParticipant.participant_id.label('user_id'),
+                       CommunityChallenge.challenge_id, CommunityChallengeParticipant.community_challenge_id,
+                       Challenge.name, CommunityChallengeParticipant.status, CommunityChallengeParticipant.start_date,
+                       CommunityChallengeParticipant.end_date) \
+        .join(CommunityChallenge, CommunityChallenge.id == CommunityChallengeParticipant.community_challenge_id) \
+        .join(Challenge, Challenge.id == CommunityChallenge.challenge_id) \
+        .order_by(CommunityChallengeParticipant.community_challenge_id, CommunityChallengeParticipant.participant_id)
+    if user_id is not None:
+        personal = personal.where(PersonalChallengeParticipant.user_id == user_id)
+        community = community.where(CommunityChallengeParticipant.participant_id == user_id)
+    return [personal, community]
+
+
+EXPORT_KINDS = {
+    'impacts': _impact_queries,
+    'actions': _action_queries,
+    'posts': _post_queries,
+    'challenges': _challenge_queries,
+}
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _stream_rows(queries):
+    """Yields (columns, row) pairs, reading each query through a server-side cursor in fixed-size batches
+    so memory stays constant regardless of how many rows are exported."""
+    for query in queries:
+        result = db.session.execute(query.execution_options(yield_per=EXPORT_BATCH_ROWS))
+        columns = list(result.keys())
+        for row in result:
+            yield columns, row
+        result.close()
+
+
+def generate_export(kind, export_format, user_id=None, compress=False):
+    """Yields the export as encoded byte chunks of roughly EXPORT_CHUNK_BYTES, gzip-compressed on the fly
+    when compress is set."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS) if compress else None
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if export_format == 'csv' else None
+    header_written = False
+
+    def drain():
+        data = buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+        return compressor.compress(data) if compressor else data
+
+    for columns, row in _stream_rows(EXPORT_KINDS[kind](user_id)):
+        if writer:
+            if not header_written:
+                writer.writerow(columns)
+                header_written = True
+            writer.writerow(value.isoformat() if isinstance(value, datetime) else value for value in row)
+        else:
+            buffer.write(json.dumps(dict(zip(columns, row)), default=_json_default))
+            buffer.write('\n')
+
+        if buffer.tell() >= EXPORT_CHUNK_BYTES:
+            chunk = drain()
+            if chunk:
+                yield chunk
+
+    chunk = drain()
+    if compressor:
+        chunk += compressor.flush()
+    if chunk:
+        yield chunk
+
+
+def register_export_routes(app):
+    @app.route('/export/<int:user_id>/<kind>', methods=['GET'])
+    def export_user_data(user_id, kind):
+        export_format = request.args.get('format', 'csv')
+        if kind not in EXPORT_KINDS:
+            return jsonify({"error": f"Unknown export type, expected one of: {', '.join(EXPORT_KINDS)}"}), 400
+        if export_format not in EXPORT_FORMATS:
+            return jsonify({"error": f"Unknown export format, expected one of: {', '.join(EXPORT_FORMATS)}"}), 400
+
+        if not User.query.get(user_id):
+            return jsonify({"error": "User not found"}), 404
+
+        # ?gzip=1 downloads a .gz file; otherwise a client accepting gzip gets the plain file compressed in
+        # transit (Content-Encoding), which it decompresses itself before saving
+        filename = f"{kind}_{user_id}.{export_format}"
+        mimetype = EXPORT_FORMATS[export_format]
+        headers = {"Vary": "Accept-Encoding"}
+        if request.args.get('gzip') == '1':
+            compress = True
+            filename += '.gz'
+            mimetype = 'application/gzip'
+        else:
+            compress = 'gzip' in request.headers.get('Accept-Encoding', '')
+            if compress:
+                headers["Content-Encoding"] = "gzip"
+        headers["Content-Disposition"] = f"attachment; filename={filename}"
+
+        # stream_with_context keeps the app context (and its DB session) alive while the body is generated
+        return Response(stream_with_context(generate_export(kind, export_format, user_id, compress)),
+                        mimetype=mimetype, headers=headers)
+
+    @app.cli.command('export-data')
+    @click.argument('kind', type=click.Choice(list(EXPORT_KINDS)))
+    @click.option('--user-id', type=int, default=None, help="Only export rows for this user (default: all users).")
+    @click.option('--format', 'export_format', type=click.Choice(list(EXPORT_FORMATS)), default='csv')
+    @click.option('--output', default='-', help="File to write to, '-' for stdout.")
+    @click.option('--gzip', 'compress', is_flag=True, help="Gzip the output on the fly.")
+    def export_data(kind, user_id, export_format, output, compress):
+        """Stream impacts, actions, posts or challenge history to a CSV/NDJSON file with constant memory."""
+        stream = sys.stdout.buffer if output == '-' else open(output, 'wb')
+        try:
+            for chunk in generate_export(kind, export_format, user_id, compress):
+                stream.write(chunk)
+        finally:
+            if stream is not sys.stdout.buffer:
+                stream.close()
@@ -0,0 +1,221 @@
+# import_views.py
+
+from collections import defaultdict
+
+import click
+import numpy as np
+import pandas as pd
+from flask import request, jsonify
+from sqlalchemy import bindparam, func, update
+
+from extensions import db
+from models import EnvironmentalImpact, User, IMPACT_TOTAL_FIELDS
+from .environment_views import CO2_SAVINGS_FACTOR, WATER_SAVINGS_FACTOR, PLASTIC_WASTE_FACTOR, \
+    MONEY_SAVINGS_FACTOR, get_baseline_values, apply_impact_totals_deltas
+
+# CSV rows processed (and committed) per chunk
+IMPORT_CHUNK_ROWS = 50000
+
+# Columns of EnvironmentalImpact carried from chunk to chunk while importing
+IMPACT_STATE_FIELDS = ('co2_emissions_prevented', 'water_saved', 'plastic_waste_reduced', 'money_saved',
+                       'recycled_bottles', 'single_use_bottles', 'refillable_bottles', 'impact_score')
+
+BOTTLE_COUNT_FIELDS = {
+    'recycled': 'recycled_bottles',
+    'single-use': 'single_use_bottles',
+    'refillable': 'refillable_bottles',
+}
+
+
+def _load_impact_state(user_ids):
+    """Returns {user_id: row} for the impact record log_water_usage would update for each user (its first
+    EnvironmentalImpact row), locked for the rest of the chunk's transaction."""
+    first_ids = db.session.query(func.min(EnvironmentalImpact.id)) \
+        .filter(EnvironmentalImpact.user_id.in_(user_ids)) \
+        .group_by(EnvironmentalImpact.user_id)
+    records = db.session.query(EnvironmentalImpact.id, EnvironmentalImpact.user_id,
+                               EnvironmentalImpact.community_challenge_id,
+                               *[getattr(EnvironmentalImpact, field) for field in IMPACT_STATE_FIELDS]) \
+        .filter(EnvironmentalImpact.id.in_(first_ids)) \
+        .with_for_update() \
+        .all()
+    return {record.user_id: record for record in records}
+
+
+def compute_chunk_impacts(chunk, initial_state):
+    """Vectorised equivalent of calling update_environmental_impact once per row, in row order.
+
+    `chunk` holds user_id, bottle_type and count columns; `initial_state` is a DataFrame indexed by user_id
+    with IMPACT_STATE_FIELDS. Returns (final_state, eco_points) where eco_points is what log_water_usage
+    would have added to each user: the running impact score after every event, summed."""
+    baseline_values = get_baseline_values()
+    bottle_type = chunk['bottle_type'].astype(object)
+    count = chunk['count'].to_numpy(dtype=np.float64)
+    refillable = (bottle_type == 'refillable').to_numpy(dtype=bool)
+
+    # Same factors and operation order as update_environmental_impact so the floats match exactly
+    events = pd.DataFrame({
+        'user_id': chunk['user_id'].to_numpy(),
+        'co2_emissions_prevented': np.ceil(
+            bottle_type.map(CO2_SAVINGS_FACTOR).fillna(0).to_numpy(dtype=np.float64)
+            * baseline_values['co2_saved_per_action'] * count),
+        'water_saved': np.where(refillable, np.ceil(
+            WATER_SAVINGS_FACTOR * baseline_values['water_saved_per_action'] * count), 0),
+        'plastic_waste_reduced': np.ceil(
+            bottle_type.map(PLASTIC_WASTE_FACTOR).fillna(0).to_numpy(dtype=np.float64)
+            * baseline_values['plastic_saved_per_action'] * count),
+        'money_saved': np.where(refillable, np.ceil(
+            MONEY_SAVINGS_FACTOR * baseline_values['money_saved_per_action'] * count), 0),
+    })
+    for bottle, field in BOTTLE_COUNT_FIELDS.items():
+        events[field] = np.where((bottle_type == bottle).to_numpy(dtype=bool), count, 0)
+
+    # Running totals per user starting from the stored record. Every delta is a whole number, so adding
+    # the starting value after the cumulative sum gives the same floats as adding one event at a time
+    accumulated = [field for field in IMPACT_STATE_FIELDS if field != 'impact_score']
+    start = initial_state.loc[events['user_id'], accumulated].to_numpy()
+    running = events.groupby('user_id', sort=False)[accumulated].cumsum().to_numpy() + start
+    events[accumulated] = running
+
+    # calculate_impact_score after every event
+    events['impact_score'] = np.ceil(
+        events['co2_emissions_prevented'] / baseline_values['co2_saved_per_action'] +
+        events['water_saved'] / baseline_values['water_saved_per_action'] +
+        events['plastic_waste_reduced'] / baseline_values['plastic_saved_per_action'] +
+        events['money_saved'] / baseline_values['money_saved_per_action'])
+
+    grouped = events.groupby('user_id', sort=False)
+    final_state = grouped[list(IMPACT_STATE_FIELDS)].last()
+    return final_state, grouped['impact_score'].sum()
+
+
+def import_chunk(chunk):
+    """Applies one chunk of bottle logs and commits it. Returns the number of rows imported."""
+    chunk = chunk.dropna(subset=['user_id', 'bottle_type'])
+    chunk = chunk.assign(user_id=chunk['user_id'].astype(np.int64),
+                         count=chunk['count'].fillna(1).astype(np.int64) if 'count' in chunk else 1)
+
+    user_ids = [int(user_id) for user_id in chunk['user_id'].unique()]
+    known_user_ids = {user_id for user_id, in db.session.query(User.id).filter(User.id.in_(user_ids))}
+    chunk = chunk[chunk['user_id'].isin(known_user_ids)]
+    if chunk.empty:
+        return 0
+
+    records = _load_impact_state(list(known_user_ids))
+    initial_state = pd.DataFrame(
+        [[(getattr(records[user_id], field) or 0) if user_id in records else 0 for field in IMPACT_STATE_FIELDS]
+         for user_id in known_user_ids],
+        index=list(known_user_ids), columns=IMPACT_STATE_FIELDS, dtype=np.float64)
+
+    final_state, eco_points = compute_chunk_impacts(chunk, initial_state)
+
+    updates, inserts = [], []
+    totals_deltas = defaultdict(lambda: defaultdict(float))
+    for user_id, state in final_state.iterrows():
+        values = {field: state[field].item() for field in IMPACT_STATE_FIELDS}
+        for field in BOTTLE_COUNT_FIELDS.values():
+            values[field] = int(values[field])
+        record = records.get(user_id)
+        if record:
+            updates.append(dict(values, id=record.id))
+            community_challenge_id = record.community_challenge_id
+        else:
+            inserts.append(dict(values, user_id=int(user_id)))
+            community_challenge_id = None
+        for field in IMPACT_TOTAL_FIELDS:
+            totals_deltas[community_challenge_id][field] += values[field] - initial_state.at[user_id, field]
+
+    if updates:
+        db.session.bulk_update_mappings(EnvironmentalImpact, updates)
+    if inserts:
+        db.session.bulk_insert_mappings(EnvironmentalImpact, inserts)
+
+    # eco_points are incremented in SQL so concurrent log_water_usage calls are not lost
+    user_table = User.__table__
+    db.session.execute(
+        update(user_table).where(user_table.c.id == bindparam('user_id_'))
+        .values(eco_points=func.coalesce(user_table.c.eco_points, 0) + bindparam('points')),
+        [{'user_id_': int(user_id), 'points': int(points)} for user_id, points in eco_points.items()])
+
+    for community_challenge_id, deltas in totals_deltas.items():
+        apply_impact_totals_deltas(deltas, community_challenge_id)
+
+    db.session.commit()
+    return len(chunk)
+
+
+class BottleLogImportError(ValueError):
+    """A chunk of the CSV could not be imported. The chunks before it are committed and stay imported."""
+
+    def __init__(self, cause, imported, skipped, first_row, last_row):
+        super().__init__(str(cause))
+        self.imported = imported
+        self.skipped = skipped
+        # 1-based data rows (header excluded) of the chunk that failed
+        self.first_row = first_row
+        self.last_row = last_row
+
+
+def import_bottle_logs(source, chunk_size=IMPORT_CHUNK_ROWS):
+    """Imports a CSV of historical bottle logs (user_id, bottle_type[, count]) in row order, one committed
+    chunk at a time. Returns (imported, skipped) row counts, or raises BottleLogImportError if a chunk is
+    invalid."""
+    imported = skipped = rows_read = 0
+    reader = pd.read_csv(source, chunksize=chunk_size,
+                         usecols=lambda column: column in ('user_id', 'bottle_type', 'count'),
+                         dtype={'bottle_type': 'string'})
+    chunks = iter(reader)
+    while True:
+        try:
+            chunk = next(chunks)
+        except StopIteration:
+            break
+        except (ValueError, KeyError) as e:
+            raise BottleLogImportError(e, imported, skipped, rows_read + 1, rows_read + chunk_size) from e
+
+        try:
+            rows = import_chunk(chunk)
+        except (ValueError, KeyError) as e:
+            db.session.rollback()
+            raise BottleLogImportError(e, imported, skipped, rows_read + 1, rows_read + len(chunk)) from e
+        except Exception:
+            db.session.rollback()
+            raise
+        rows_read += len(chunk)
+        imported += rows
+        skipped += len(chunk) - rows
+    return imported, skipped
+
+
+def register_import_routes(app):
+    @app.route('/import_bottle_logs', methods=['POST'])
+    def import_bottle_logs_upload():
+        upload = request.files.get('file')
+        if not upload:
+            return jsonify({"error": "A CSV file is required"}), 400
+
+        try:
+            imported, skipped = import_bottle_logs(upload.stream, IMPORT_CHUNK_ROWS)
+        except BottleLogImportError as e:
+            if not e.imported and not e.skipped:
+                return jsonify({"error": "Invalid bottle log CSV", "details": str(e)}), 400
+            # Earlier chunks are committed: report what was imported and where the import stopped
+            return jsonify({"error": "Invalid bottle log CSV, import stopped part way", "details": str(e),
+                            "imported": e.imported, "skipped": e.skipped,
+                            "failed_rows": {"first": e.first_row, "last": e.last_row}}), 422
+
+        return jsonify({"message": "Bottle logs imported successfully", "imported": imported,
+                        "skipped": skipped}), 200
+
+    @app.cli.command('import-bottle-logs')
+    @click.argument('path', type=click.Path(exists=True, dir_okay=False))
+    @click.option('--chunk-size', type=int, default=IMPORT_CHUNK_ROWS, show_default=True)
+    def import_bottle_logs_command(path, chunk_size):
+        """Bulk import historical bottle usage (user_id, bottle_type[, count]) from a CSV file."""
+        try:
+            imported, skipped = import_bottle_logs(path, chunk_size)
+        except BottleLogImportError as e:
+            raise click.ClickException(
+                f"Rows {e.first_row}-{e.last_row} are invalid ({e}). Imported {e.imported} bottle log(s) before "
+                f"them and skipped {e.skipped}; re-run with the remaining rows once they are fixed.")
+        click.echo(f"Imported {imported} bottle log(s), skipped {skipped}.")
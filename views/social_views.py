@@ -1,8 +1,14 @@
 # social_views.py
 from flask import request, jsonify
 
+from archiving import include_archived
 from extensions import db
-from models import Post, Like, Comment, Friendship, User, MessagesInbox
+from models import Post, Like, Comment, Friendship, User, MessagesInbox, MessagesInboxArchive
+from serialization import RowSerializer, rows_response, format_timestamp
+from user_loader import get_user_loader
+
+post_serializer = RowSerializer('post_id', 'username', 'content', 'created_at', 'updated_at')
+user_serializer = RowSerializer('user_id', 'username', 'email')
 
 
 def register_social_routes(app):
@@ -123,17 +129,13 @@ def register_social_routes(app):
 
     @app.route('/view_posts', methods=['GET'])
     def view_posts():
-        # Fetch all posts along with user details via a join (this avoids an N+1 query problem)
-        posts = Post.query.join(User).all()
-        post_list = [{
-            'post_id': post.id,
-            'username': post.user.username,  # Accessing the username from the User model
-            'content': post.content,
-            'created_at': post.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-            'updated_at': post.updated_at.strftime("%Y-%m-%d %H:%M:%S")
-        } for post in posts]
+        # Fetch only the needed columns of all posts joined to their users (avoids N+1 queries and ORM objects)
+        posts = db.session.query(Post.id, User.username, Post.content, Post.created_at, Post.updated_at) \
+            .join(User, User.id == Post.user_id).all()
+        post_list = [(post_id, username, content, format_timestamp(created_at), format_timestamp(updated_at))
+                     for post_id, username, content, created_at, updated_at in posts]
 
-        return jsonify(post_list), 200
+        return rows_response(post_serializer, post_list)
 
     @app.route('/view_my_posts/<int:user_id>', methods=['GET'])
     def view_my_posts(user_id):
@@ -155,14 +157,8 @@ def register_social_routes(app):
 
     @app.route('/get_users', methods=['GET'])
     def get_all_users():
-        users = User.query.all()
-        user_list = [{
-            'user_id': user.id,
-            'username': user.username,
-            'email': user.email,
-        } for user in users]
-
-        return jsonify(user_list), 200
+        users = db.session.query(User.id, User.username, User.email).all()
+        return rows_response(user_serializer, users)
 
     @app.route('/get_friendships/<int:user_id>', methods=['GET'])
     def get_user_friendships(user_id):
@@ -170,9 +166,14 @@ def register_social_routes(app):
             (Friendship.user_id == user_id) | (Friendship.friend_id == user_id)
         ).all()
 
+        # Resolve every friend with one batched query instead of one query per friendship
+        users = get_user_loader()
+        users.prime(friendship.friend_id if friendship.user_id == user_id else friendship.user_id
+                    for friendship in friendships)
+
         friendship_list = []
         for friendship in friendships:
-            friend = User.query.get(friendship.friend_id if friendship.user_id == user_id else friendship.user_id)
+            friend = users.get(friendship.friend_id if friendship.user_id == user_id else friendship.user_id)
             friendship_data = {
                 'id': friendship.id,
                 'user_id': user_id,
@@ -223,17 +224,21 @@ def register_social_routes(app):
     # View sent messages
     @app.route('/sent_messages/<int:user_id>', methods=['GET'])
     def view_sent_messages(user_id):
-        # Check if the user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         try:
             messages = MessagesInbox.query.filter_by(sender_id=user_id).all()
-            sent_messages = []
+            if include_archived(request.args):
+                messages = MessagesInboxArchive.query.filter_by(sender_id=user_id) \
+                    .order_by(MessagesInboxArchive.id).all() + messages
 
+            # The user and every recipient are loaded with a single batched query
+            users = get_user_loader()
+            users.prime(message.user_id for message in messages)
+            if not users.get(user_id):
+                return jsonify({'message': 'User not found'}), 404
+
+            sent_messages = []
             for message in messages:
-                recipient = User.query.get(message.user_id)
+                recipient = users.get(message.user_id)
                 sent_messages.append({
                     'id': message.id,
                     'recipient_id': message.user_id,
@@ -251,17 +256,21 @@ def register_social_routes(app):
     # View received messages
     @app.route('/received_messages/<int:user_id>', methods=['GET'])
     def view_received_messages(user_id):
-        # Check if the user exists
-        user = User.query.get(user_id)
-        if not user:
-            return jsonify({'message': 'User not found'}), 404
-
         try:
             messages = MessagesInbox.query.filter_by(user_id=user_id).all()
-            received_messages = []
+            if include_archived(request.args):
+                messages = MessagesInboxArchive.query.filter_by(user_id=user_id) \
+                    .order_by(MessagesInboxArchive.id).all() + messages
 
+            # The user and every sender are loaded with a single batched query
+            users = get_user_loader()
+            users.prime(message.sender_id for message in messages)
+            if not users.get(user_id):
+                return jsonify({'message': 'User not found'}), 404
+
+            received_messages = []
             for message in messages:
-                sender = User.query.get(message.sender_id)
+                sender = users.get(message.sender_id)
                 received_messages.append({
                     'id': message.id,
                     'sender_id': message.sender_id,
@@ -2,8 +2,11 @@
 from flask import request, jsonify
 from werkzeug.security import generate_password_hash, check_password_hash
 
+from archiving import include_archived
 from extensions import db
-from models import UserPreference, Notification, User
+from models import UserPreference, Notification, User, NotificationArchive
+from user_loader import invalidate_user
+from username_index import username_index
 
 
 def register_user_routes(app):
@@ -23,6 +26,7 @@ def register_user_routes(app):
 
         db.session.add(new_user)
         db.session.commit()
+        username_index.add(new_user.id, new_user.username, new_user.eco_points)
 
         return jsonify({"message": "Registration successful"}), 201
 
@@ -100,6 +104,10 @@ def register_user_routes(app):
     @app.route('/get_notifications/<int:user_id>', methods=['GET'])
     def get_notifications(user_id):
         notifications = Notification.query.filter_by(user_id=user_id).all()
+        if include_archived(request.args):
+            # Archived notifications are older, so they come first like they did before being archived
+            notifications = NotificationArchive.query.filter_by(user_id=user_id) \
+                .order_by(NotificationArchive.id).all() + notifications
         notifications_data = [{"id": n.id, "content": n.content, "is_read": n.is_read,
                                "timestamp": n.timestamp.strftime('%Y-%m-%d %H:%M:%S')} for n in notifications]
         return jsonify(notifications_data), 200
@@ -138,5 +146,6 @@ def register_user_routes(app):
         # Update additional fields as needed
 
         db.session.commit()
+        invalidate_user(user_id)
 
         return jsonify({"message": "User profile updated successfully"}), 200
@@ -1,10 +1,16 @@
 # utility_views.py
 
 from flask import request, jsonify
-from models import User, CommunityChallenge, Challenge, PersonalChallengeParticipant, CommunityChallengeParticipant, \
-    EnvironmentalImpact
+from challenge_cache import get_challenge, get_community_challenge, cache_stats
+from models import User, CommunityChallenge, Challenge
 from extensions import db
 from sqlalchemy import desc
+from user_loader import invalidate_user
+from username_index import username_index, AUTOCOMPLETE_MAX_LIMIT
+from .dashboard_views import load_challenge_status
+
+
+AUTOCOMPLETE_DEFAULT_LIMIT = 10
 
 
 def register_utility_routes(app):
@@ -17,14 +23,39 @@ def register_utility_routes(app):
     @app.route('/search', methods=['GET'])
     def search():
         query = request.args.get('query', '')
-        users = User.query.filter(User.username.ilike('%{}%'.format(query))).all()
-        challenges = CommunityChallenge.query.filter(CommunityChallenge.name.ilike('%{}%'.format(query))).all()
 
-        users_result = [{"id": user.id, "username": user.username} for user in users]
-        challenges_result = [{"id": challenge.id, "name": challenge.name} for challenge in challenges]
+        if request.args.get('fuzzy', type=int) and query.strip():
+            # Typo-tolerant: usernames within a few edits of the query (see username_index.fuzzy_search)
+            max_distance = request.args.get('max_distance', type=int)
+            if max_distance is not None and max_distance < 0:
+                return jsonify({"error": "max_distance must not be negative"}), 400
+            users_result = [{"id": user_id, "username": username, "distance": distance}
+                            for user_id, username, _, distance in
+                            username_index.fuzzy_search(query.strip(), max_distance)]
+        else:
+            users = User.query.filter(User.username.ilike('%{}%'.format(query))).all()
+            users_result = [{"id": user.id, "username": user.username} for user in users]
+        # Community challenges take their name from the challenge they wrap
+        challenges = db.session.query(CommunityChallenge.id, Challenge.name) \
+            .join(Challenge, Challenge.id == CommunityChallenge.challenge_id) \
+            .filter(Challenge.name.ilike('%{}%'.format(query))).all()
+
+        challenges_result = [{"id": challenge_id, "name": name} for challenge_id, name in challenges]
 
         return jsonify({"users": users_result, "challenges": challenges_result})
 
+    @app.route('/autocomplete', methods=['GET'])
+    def autocomplete():
+        # As-you-type username completion for the friend and challenge screens, served from memory
+        prefix = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', AUTOCOMPLETE_DEFAULT_LIMIT, type=int), AUTOCOMPLETE_MAX_LIMIT)
+        if not prefix or limit < 1:
+            return jsonify({"users": []})
+
+        users = [{"id": user_id, "username": username, "eco_points": eco_points}
+                 for user_id, username, eco_points in username_index.complete(prefix, limit)]
+        return jsonify({"users": users})
+
     @app.route('/report', methods=['POST'])
     def report():
         # Here you'd handle user reports, maybe saving them to a database or sending them to admins
@@ -51,12 +82,15 @@ def register_utility_routes(app):
             user.profile_picture = updates['profile_picture']
         # Other profile customizations can be handled here
         db.session.commit()
+        invalidate_user(user_id)
         return jsonify({"status": "success", "message": "Profile updated successfully"})
 
     @app.route('/community_challenge_details/<int:community_challenge_id>', methods=['GET'])
     def get_community_challenge_details(community_challenge_id):
-        community_challenge = CommunityChallenge.query.get_or_404(community_challenge_id)
-        challenge = Challenge.query.get(community_challenge.challenge_id)
+        community_challenge = get_community_challenge(community_challenge_id)
+        if not community_challenge:
+            return jsonify({"error": "Community challenge not found"}), 404
+        challenge = get_challenge(community_challenge.challenge_id)
         details = {
             "name": challenge.name,
             "description": challenge.description,
@@ -68,64 +102,15 @@ def register_utility_routes(app):
         }
         return jsonify(details)
 
+    @app.route('/cache_stats', methods=['GET'])
+    def get_cache_stats():
+        return jsonify(cache_stats()), 200
+
     @app.route('/user_challenge_status/<int:user_id>', methods=['GET'])
     def get_user_challenge_status(user_id):
         user = User.query.get(user_id)
         if not user:
             return jsonify({"error": "User not found"}), 404
 
-        personal_challenges = PersonalChallengeParticipant.query.filter_by(user_id=user_id).all()
-        community_challenges = CommunityChallengeParticipant.query.filter_by(participant_id=user_id).all()
-
-        personal_challenge_status = []
-        for pc in personal_challenges:
-            challenge = Challenge.query.get(pc.challenge_id)
-            if not challenge:
-                continue
-
-            impact_record = EnvironmentalImpact.query.filter_by(
-                user_id=user_id,
-                personal_challenge_id=pc.id
-            ).first()
-            impact_score = impact_record.impact_score if impact_record else 0
-
-            personal_challenge_status.append({
-                "challenge_id": challenge.id,
-                "name": challenge.name,
-                "status": "Participating",
-                "type": "Personal",
-                "start_date": pc.start_date.isoformat(),
-                "end_date": pc.end_date.isoformat() if pc.end_date else None,
-                "impact_score": impact_score
-            })
-
-        community_challenge_status = []
-        for cc in community_challenges:
-            community_challenge = CommunityChallenge.query.get(cc.community_challenge_id)
-            if not community_challenge:
-                continue
-
-            challenge = Challenge.query.get(community_challenge.challenge_id)
-            if not challenge:
-                continue
-
-            impact_record = EnvironmentalImpact.query.filter_by(
-                user_id=user_id,
-                community_challenge_id=cc.community_challenge_id
-            ).first()
-            impact_score = impact_record.impact_score if impact_record else 0
-
-            community_challenge_status.append({
-                "community_challenge_id": community_challenge.id,
-                "challenge_id": challenge.id,
-                "name": challenge.name,
-                "status": cc.status,
-                "type": "Community",
-                "start_date": cc.start_date.isoformat(),
-                "end_date": cc.end_date.isoformat() if cc.end_date else None,
-                "impact_score": impact_score
-            })
-
-        challenges_status = personal_challenge_status + community_challenge_status
-        return jsonify(challenges_status)
+        return jsonify(load_challenge_status(user_id))
 